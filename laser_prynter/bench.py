@@ -29,12 +29,13 @@ from itertools import chain
 import operator
 import pickle
 import time
+import shutil
 import sys
 import os
-from typing import Callable, Any
+from typing import Callable, Any, ClassVar, TextIO
 import statistics
 
-from laser_prynter import pp
+from laser_prynter import pp, term, text
 
 Test = namedtuple('Test', 'args kwargs expected n')
 class NoExpectation:
@@ -93,17 +94,13 @@ def _avg_times(times: Counter[float]) -> float:
 def _median_times(times: Counter[float]) -> float:
     return statistics.median(list(times.elements()))
 
-TEST_STATUS = {
-    False: pp.ps('fail', 'red'),
-    True:  pp.ps('pass', 'green'),
-}
 TRUNCATE = 40
 
 def _truncate(s: str, n: int=TRUNCATE) -> str:
-    'Truncate a string to n characters'
-    if len(s) <= n:
+    'Truncate a string to a display width of n, keeping the start & end'
+    if text.width(s) <= n:
         return s
-    return s[:n-10] + '...' + str(s)[-10:]
+    return text.truncate(s, n-10, '...') + text.tail(s, 10)
 
 def _format_time(i: float) -> str:
     '''
@@ -119,13 +116,21 @@ def _format_time(i: float) -> str:
         i = i*10**3
     return f'{i:7.03f} {unit}'
 
+def _terminal_width() -> int:
+    '''
+    Get the terminal width, without raising when there is no terminal attached
+    (e.g. when output is piped, under CI, or inside a process pool)
+    '''
+    return shutil.get_terminal_size().columns
+
 RECORD_SEP = '│'
 BORDER_SEP = '─'
 HEADER_SEP = '┆'
 BORDER_END, BORDER_PATTERN = '★', '-⎽__⎽-⎻⎺⎺⎻'
 
-def gen_border() -> str:
-    w = os.get_terminal_size().columns
+def gen_border(w: int | None = None) -> str:
+    if w is None:
+        w = _terminal_width()
     n = int(w/len(BORDER_PATTERN))
     r = max(int(n%len(BORDER_PATTERN)/2)-1, 0)
     b = (f'{BORDER_END}{" "*r}{BORDER_PATTERN*n}{" "*r}{BORDER_END}'
@@ -133,49 +138,144 @@ def gen_border() -> str:
     return b
 
 
-def _print_header(s: str, test: Test) -> None:
-    'Print the result of a timed test'
-    print('\n{s:s}{border:s}\n\n{n_s:s}: {n:,d}, {args_s:s}: {args:20s}{kwargs_s:s}: {kwargs:20s}\n'.format(**{
-        's':        s,
-        'border':   pp.ps(gen_border(), 'brightyellow'),
-        'n_s':      pp.ps('n', 'bold'),
-        'n':        test.n,
-        'args_s':   pp.ps('args', 'bold'),
-        'args':     _truncate(str(test.args)+', '),
-        'kwargs_s': pp.ps('kwargs', 'bold'),
-        'kwargs':   _truncate(str(test.kwargs)),
-    }))
-
-def _print_result_header(width: int=1) -> None:
-    msg = '{funcs:s}{status:<5s} {sep:s} {total:^10s} {sep:s} {median:^10s}'.format(**{
-        'funcs':  f'{"function":<{width}s}'.format('function'),
-        'status': 'status',
-        'total':  'Σ ',
-        'median': 'x̄',
-        'sep':     HEADER_SEP,
-    })
-    border = BORDER_SEP*len(msg)
-    print(msg, border, sep='\n')
-
-def _print_result(func: Callable, result: Any, correct: bool, times: Counter, width: int=1, colour: str='', extra: Any='') -> None:
-    fail_sep, status_msg = '\n', ''
-    if not correct:
-        if os.get_terminal_size().columns >= 100:
-            fail_sep = ' '
-        result = _truncate(str(result))
-        status_msg = pp.ps(f'{fail_sep}>> {result=}', 'yellow')
-
-    msg = '{func_name:s}{status:<s}   {sep:s} {total:s} {sep:s} {median:s} {extra:s}{status_msg:s}'.format(**{
-        'func_name':  pp.ps(f'{func.__module__+"."+func.__name__+", ":<{width}s}', style=colour),
-        'total':      _format_time(_sum_times(times)),
-        'median':     _format_time(_median_times(times)),
-        'status':     TEST_STATUS[correct],
-        'extra':      extra,
-        'status_msg': status_msg,
-        'width':      width+2,
-        'sep':        RECORD_SEP,
-    })
-    print(msg)
+class Renderer:
+    '''
+    Renders bench results as plain text.
+    All rows are buffered, and written to the output stream in a single call by `flush`
+    '''
+    status: ClassVar[dict[bool, str]] = {False: 'fail', True: 'pass'}
+
+    def __init__(self, file: TextIO | None = None, width: int | None = None) -> None:
+        self.file = file if file is not None else sys.stdout
+        self.width = width if width is not None else _terminal_width()
+        self.rows: list[str] = []
+
+    def style(self, s: str, style: str) -> str:
+        'Apply a style to a string (a no-op for plain text)'
+        return s
+
+    def title(self, s: str) -> None:
+        self.rows.append(self.style(s, 'bold'))
+
+    def header(self, s: str, test: Test) -> None:
+        'Render the header for a timed test'
+        self.rows.append('\n{s:s}{border:s}\n\n{n_s:s}: {n:,d}, {args_s:s}: {args:s}{kwargs_s:s}: {kwargs:s}\n'.format(**{
+            's':        s,
+            'border':   self.style(gen_border(self.width), 'brightyellow'),
+            'n_s':      self.style('n', 'bold'),
+            'n':        test.n,
+            'args_s':   self.style('args', 'bold'),
+            'args':     text.ljust(_truncate(str(test.args)+', '), 20),
+            'kwargs_s': self.style('kwargs', 'bold'),
+            'kwargs':   text.ljust(_truncate(str(test.kwargs)), 20),
+        }))
+
+    def result_header(self, width: int=1) -> None:
+        msg = '{funcs:s}{status:<5s} {sep:s} {total:s} {sep:s} {median:s}'.format(**{
+            'funcs':  f'{"function":<{width}s}',
+            'status': 'status',
+            'total':  text.center('Σ ', 10),
+            'median': text.center('x̄', 10),
+            'sep':     HEADER_SEP,
+        })
+        self.rows.extend((msg, BORDER_SEP*text.width(msg)))
+
+    def result(self, func: Callable, result: Any, correct: bool, times: Counter, width: int=1, colour: str='', extra: str='') -> None:
+        fail_sep, status_msg = '\n', ''
+        if not correct:
+            if self.width >= 100:
+                fail_sep = ' '
+            result = _truncate(str(result))
+            status_msg = self.style(f'{fail_sep}>> {result=}', 'yellow')
+
+        self.rows.append('{func_name:s}{status:<s}   {sep:s} {total:s} {sep:s} {median:s} {extra:s}{status_msg:s}'.format(**{
+            'func_name':  self.style(text.ljust(f'{func.__module__}.{func.__name__}, ', width), colour),
+            'total':      _format_time(_sum_times(times)),
+            'median':     _format_time(_median_times(times)),
+            'status':     self.status[correct],
+            'extra':      extra,
+            'status_msg': status_msg,
+            'sep':        RECORD_SEP,
+        }))
+
+    def flush(self) -> None:
+        'Write all buffered rows to the output stream in a single call'
+        if not self.rows:
+            return
+        self.file.write('\n'.join(self.rows) + '\n')
+        self.file.flush()
+        self.rows.clear()
+
+PlainRenderer = Renderer
+
+TEST_STATUS = {
+    False: pp.ps('fail', 'red'),
+    True:  pp.ps('pass', 'green'),
+}
+
+class ANSIRenderer(Renderer):
+    'Renders bench results with ANSI colours, for an interactive terminal'
+    status: ClassVar[dict[bool, str]] = TEST_STATUS
+
+    def style(self, s: str, style: str) -> str:
+        if not style:
+            return s
+        return str(pp.ps(s, style))
+
+class MarkdownRenderer(Renderer):
+    'Renders bench results as markdown tables, e.g. for CI job summaries'
+
+    @staticmethod
+    def _cell(s: str) -> str:
+        return s.strip().replace('|', '\\|')
+
+    def title(self, s: str) -> None:
+        self.rows.append(f'\n**{s.strip()}**\n')
+
+    def header(self, s: str, test: Test) -> None:
+        args, kwargs = _truncate(str(test.args)), _truncate(str(test.kwargs))
+        self.rows.append(f'\n### n: {test.n:,d}, args: `{args}`, kwargs: `{kwargs}`')
+
+    def result_header(self, width: int=1) -> None:
+        self.rows.extend((
+            '| function | status | Σ | x̄ | |',
+            '|:---|:---|---:|---:|:---|',
+        ))
+
+    def result(self, func: Callable, result: Any, correct: bool, times: Counter, width: int=1, colour: str='', extra: str='') -> None:
+        status_msg = '' if correct else f'>> result={_truncate(str(result))!r}'
+        cells = map(self._cell, (
+            f'`{func.__module__}.{func.__name__}`',
+            self.status[correct],
+            _format_time(_sum_times(times)),
+            _format_time(_median_times(times)),
+            f'{extra} {status_msg}',
+        ))
+        self.rows.append(f'| {" | ".join(cells)} |')
+
+RENDERERS: dict[str, type[Renderer]] = {
+    'plain':    PlainRenderer,
+    'ansi':     ANSIRenderer,
+    'markdown': MarkdownRenderer,
+}
+
+def get_renderer(fmt: str | None = None, file: TextIO | None = None) -> Renderer:
+    '''
+    Get a renderer for bench results.
+    - `fmt` is one of the keys of `RENDERERS`, defaulting to the `BENCH_FORMAT` env var if set
+    - otherwise, ANSI is used for a terminal, and plain text when output is redirected
+      or colour is disabled (see `term.colour_depth`)
+    Raises a ValueError for an unknown format.
+    '''
+    if file is None:
+        file = sys.stdout
+    if fmt is None:
+        fmt = os.environ.get('BENCH_FORMAT')
+    if fmt is None:
+        fmt = 'plain' if term.colour_depth(file) == term.ColourDepth.NONE else 'ansi'
+    if fmt not in RENDERERS:
+        raise ValueError(f'unknown bench format: {fmt!r}, expected one of {sorted(RENDERERS)}')
+    return RENDERERS[fmt](file)
 
 
 def timeit(n: int=10_000) -> Callable[[Callable], Callable]:
@@ -184,21 +284,25 @@ def timeit(n: int=10_000) -> Callable[[Callable], Callable]:
         @wraps(func)
         def wrapper(*args: tuple, **kwargs: dict) -> None:
             result, correct, times = timeit_func(func, args, kwargs, NoExpectation, n)
-            _print_result(func, result, correct, times)
+            renderer = get_renderer()
+            renderer.result(func, result, correct, times)
+            renderer.flush()
         return wrapper
     return decorator_with_args
 
 
-def bench(tests: list, func_groups: list, n: int=10_000, sort: bool=False) -> None:
+def bench(tests: list, func_groups: list, n: int=10_000, sort: bool=False, renderer: Renderer | None = None) -> None:
     'Run a series of timed tests on a list of functions'
     s, group_colours = '', ['yellow', 'brightred', 'cyan', 'bold']
+    if renderer is None:
+        renderer = get_renderer()
 
     if os.environ.get('DEBUG'):
         pp.ppd({'tests': tests, 'func_groups': func_groups, 'n': n, 'sort': sort}, indent=None)
     for func_group in func_groups:
         for func in func_group:
             set_function_module(func)
-    width = max(len(func.__module__)+len(func.__name__)+3 for func in chain.from_iterable(func_groups))
+    width = max(text.width(f'{func.__module__}.{func.__name__}, ') for func in chain.from_iterable(func_groups))
 
     if 'BENCH_SORT' in os.environ:
         sort = True
@@ -206,17 +310,17 @@ def bench(tests: list, func_groups: list, n: int=10_000, sort: bool=False) -> No
     for test_data in tests:
         test = Test(test_data[0], test_data[1], test_data[2], n=n)
         results = []
-        _print_header(s, test)
-        pp.pps('results:', 'bold')
-        _print_result_header(width)
+        renderer.header(s, test)
+        renderer.title('results:')
+        renderer.result_header(width)
         for funcs, group_colour in zip(func_groups, group_colours):
             for func in funcs:
                 result, correct, times = timeit_func(func, test.args, test.kwargs, test.expected)
-                _print_result(func, result, correct, times, width, group_colour)
+                renderer.result(func, result, correct, times, width, group_colour)
                 results.append((func, result, correct, times, width, group_colour))
         if sort:
-            pp.pps('\nsorted by time:', 'bold')
-            _print_result_header(width)
+            renderer.title('\nsorted by time:')
+            renderer.result_header(width)
             base = 0.0
             extra = ''
 
@@ -227,6 +331,8 @@ def bench(tests: list, func_groups: list, n: int=10_000, sort: bool=False) -> No
                     base = _median_times(result_tuple[3])
                 else:
                     x = _median_times(result_tuple[3]) / base
-                    extra = pp.ps(f' ↓ x{x:.2f}', 'bold')
-                _print_result(result_tuple[0], result_tuple[1], result_tuple[2], result_tuple[3], result_tuple[4], result_tuple[5], extra=extra)
+                    extra = renderer.style(f' ↓ x{x:.2f}', 'bold')
+                renderer.result(result_tuple[0], result_tuple[1], result_tuple[2], result_tuple[3], result_tuple[4], result_tuple[5], extra=extra)
+        # write the whole test block at once
+        renderer.flush()
         s = '\n'
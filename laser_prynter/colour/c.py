@@ -2,10 +2,22 @@
 
 from __future__ import annotations
 
+import math
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
 from random import randint
 from types import MappingProxyType
 from typing import Any, Literal, NamedTuple, Tuple, TypeAlias
 
+from laser_prynter.term import ColourDepth, env_colour_depth
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:  # numpy is optional, and only used to speed up the batch conversions
+    HAS_NUMPY = False
+
 # Valid components of an RGB tuple.
 _RGB_COMPONENT: TypeAlias = Literal['r', 'g', 'b']
 _RGB_COMPONENTS: Tuple[_RGB_COMPONENT, _RGB_COMPONENT, _RGB_COMPONENT] = ('r', 'g', 'b')
@@ -42,8 +54,14 @@ def _ansi_to_rgb_component(n: int, component: _RGB_COMPONENT) -> int:
     return (14135 + (10280 * i)) // 256
 
 
-def ansi_to_rgb(n: int) -> tuple[int, int, int]:
-    'Reverses the rgb_to_ansi formula to calculate an RGB tuple given an ANSI colour code.'
+# The value of each of the 24 levels in the greyscale ramp (ANSI colour codes 232-255).
+GREYSCALE_LEVELS: tuple[int, ...] = tuple(8 + (10 * i) for i in range(24))
+
+
+def _ansi_to_rgb(n: int) -> tuple[int, int, int]:
+    if 232 <= n < 256:
+        grey = GREYSCALE_LEVELS[n - 232]
+        return (grey, grey, grey)
     return (
         _ansi_to_rgb_component(n, 'r'),
         _ansi_to_rgb_component(n, 'g'),
@@ -51,6 +69,17 @@ def ansi_to_rgb(n: int) -> tuple[int, int, int]:
     )
 
 
+# Lookup table of the RGB tuple for each ANSI colour code.
+ANSI_TO_RGB: tuple[tuple[int, int, int], ...] = tuple(_ansi_to_rgb(n) for n in range(256))
+
+
+def ansi_to_rgb(n: int) -> tuple[int, int, int]:
+    'Reverses the rgb_to_ansi formula to calculate an RGB tuple given an ANSI colour code.'
+    if 0 <= n < 256:
+        return ANSI_TO_RGB[n]
+    return _ansi_to_rgb(n)
+
+
 def cube_coords_to_ansi(r: int, g: int, b: int) -> int:
     ''' '
     The golden formula. Via https://en.wikipedia.org/wiki/ANSI_escape_code#8-bit:
@@ -66,43 +95,331 @@ def cube_coords_to_ansi(r: int, g: int, b: int) -> int:
     )
 
 
+# The value of each of the 6 levels of an RGB component in the 6x6x6 colour cube.
+CUBE_LEVELS: tuple[int, ...] = (0, 95, 135, 175, 215, 255)
+# Lookup table of the nearest cube level (0-5) for each RGB component value (0-255).
+_CUBE_INDEX: bytes = bytes(
+    min(range(6), key=lambda i: abs(CUBE_LEVELS[i] - v)) for v in range(256)
+)
+# Lookup tables of each component's contribution to the ANSI colour code, so that
+# code = _CUBE_R[r] + _CUBE_G[g] + _CUBE_B[b]
+_CUBE_R = tuple(16 + _RGB_COMPONENT_MULTIPLIER['r'] * i for i in _CUBE_INDEX)
+_CUBE_G = tuple(_RGB_COMPONENT_MULTIPLIER['g'] * i for i in _CUBE_INDEX)
+_CUBE_B = tuple(_RGB_COMPONENT_MULTIPLIER['b'] * i for i in _CUBE_INDEX)
+
+
+def rgb_to_cube_coords(r: int, g: int, b: int) -> tuple[int, int, int]:
+    'Quantises an RGB tuple (0-255) to the coordinates (0-5) of the nearest colour cube level.'
+    return (_CUBE_INDEX[r], _CUBE_INDEX[g], _CUBE_INDEX[b])
+
+
+def rgb_to_ansi_cube(r: int, g: int, b: int) -> int:
+    'Quantises an RGB tuple (0-255) to the ANSI colour code of the nearest colour cube level.'
+    return _CUBE_R[r] + _CUBE_G[g] + _CUBE_B[b]
+
+
+# Lookup table of the nearest greyscale ramp level (0-23) for each sum of RGB components (0-765).
+# The nearest grey to a colour is the one nearest to the exact mean of its components, i.e. sum / 3
+_GREY_INDEX: bytes = bytes(
+    min(range(24), key=lambda i: abs(3 * GREYSCALE_LEVELS[i] - v)) for v in range(766)
+)
+
+
+def _distance(rgb1: tuple[int, int, int], rgb2: tuple[int, int, int]) -> int:
+    'Returns the squared euclidean distance between two RGB tuples.'
+    return (rgb1[0] - rgb2[0]) ** 2 + (rgb1[1] - rgb2[1]) ** 2 + (rgb1[2] - rgb2[2]) ** 2
+
+
+# Lookup table of the linear-light value (0-1) for each sRGB component value (0-255).
+_SRGB_TO_LINEAR: tuple[float, ...] = tuple(
+    v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+    for v in (i / 255 for i in range(256))
+)
+
+
+def rgb_to_oklab(r: int, g: int, b: int) -> tuple[float, float, float]:
+    'Converts an RGB tuple to OKLab (via https://bottosson.github.io/posts/oklab/).'
+    lr, lg, lb = _SRGB_TO_LINEAR[r], _SRGB_TO_LINEAR[g], _SRGB_TO_LINEAR[b]
+    l = (0.4122214708 * lr + 0.5363325363 * lg + 0.0514459929 * lb) ** (1 / 3)
+    m = (0.2119034982 * lr + 0.6806995451 * lg + 0.1073969566 * lb) ** (1 / 3)
+    s = (0.0883024619 * lr + 0.2817188376 * lg + 0.6299787005 * lb) ** (1 / 3)
+    return (
+        0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+        1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+        0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s,
+    )
+
+
+def _linear_to_srgb(v: float) -> int:
+    'Converts a linear-light value (0-1) to an sRGB component value (0-255), clamped to 0-255.'
+    v = 12.92 * v if v <= 0.0031308 else 1.055 * max(v, 0.0) ** (1 / 2.4) - 0.055
+    return min(max(math.floor(v * 255 + 0.5), 0), 255)
+
+
+def oklab_to_rgb(L: float, A: float, B: float) -> tuple[int, int, int]:
+    'Converts an OKLab colour to an RGB tuple, the inverse of `rgb_to_oklab`.'
+    l = (L + 0.3963377774 * A + 0.2158037573 * B) ** 3
+    m = (L - 0.1055613458 * A - 0.0638541728 * B) ** 3
+    s = (L - 0.0894841775 * A - 1.2914855480 * B) ** 3
+    return (
+        _linear_to_srgb(4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s),
+        _linear_to_srgb(-1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s),
+        _linear_to_srgb(-0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s),
+    )
+
+
+# Lookup table of the OKLab value for each ANSI colour code.
+_ANSI_TO_OKLAB: tuple[tuple[float, float, float], ...] = tuple(
+    rgb_to_oklab(*rgb) for rgb in ANSI_TO_RGB
+)
+
+
+@lru_cache(maxsize=65536)
+def _rgb_to_ansi256_oklab(r: int, g: int, b: int) -> int:
+    '''
+    Finds the perceptually nearest ANSI colour code for an RGB tuple.
+    Rather than scanning the whole palette, this only compares
+    - the cube colours within one level of the nearest cube colour (up to 27)
+    - the greys within three steps of the nearest grey (up to 7)
+    '''
+    L, A, B = rgb_to_oklab(r, g, b)
+
+    def _candidates(v: int) -> range:
+        return range(max(0, _CUBE_INDEX[v] - 1), min(6, _CUBE_INDEX[v] + 2))
+
+    grey = _GREY_INDEX[r + g + b]
+    candidates = [
+        cube_coords_to_ansi(i, j, k)
+        for i in _candidates(r) for j in _candidates(g) for k in _candidates(b)
+    ]
+    candidates.extend(range(232 + max(0, grey - 3), 232 + min(24, grey + 4)))
+
+    def _oklab_distance(n: int) -> float:
+        l2, a2, b2 = _ANSI_TO_OKLAB[n]
+        return (L - l2) ** 2 + (A - a2) ** 2 + (B - b2) ** 2
+
+    return min(candidates, key=_oklab_distance)
+
+
+def rgb_to_ansi256(r: int, g: int, b: int, perceptual: bool = False) -> int:
+    '''
+    Finds the nearest ANSI colour code (16-255) for an RGB tuple, including the greyscale ramp.
+    The standard colours (0-15) are never returned, as they vary between terminal themes.
+    - by default, the distance is euclidean in RGB: the nearest cube colour and nearest grey are
+      found with lookup tables and the closer of the two is returned
+    - if `perceptual` is set, the distance is euclidean in OKLab
+    '''
+    if perceptual:
+        return _rgb_to_ansi256_oklab(r, g, b)
+    cube = _CUBE_R[r] + _CUBE_G[g] + _CUBE_B[b]
+    grey = 232 + _GREY_INDEX[r + g + b]
+    rgb = (r, g, b)
+    if _distance(rgb, ANSI_TO_RGB[grey]) < _distance(rgb, ANSI_TO_RGB[cube]):
+        return grey
+    return cube
+
+
+# Batch conversions. These take either
+# - a sequence of ANSI codes/RGB tuples, and return a list
+# - a buffer of ANSI codes/packed RGB bytes (e.g. bytes, bytearray or memoryview), and return bytes
+# - a numpy array of codes/(N, 3) RGB values, and return a numpy array
+# and use numpy lookup tables when it is available.
+
+_ANSI_TO_RGB_BYTES: tuple[bytes, ...] = tuple(bytes(rgb) for rgb in ANSI_TO_RGB)
+if HAS_NUMPY:
+    _NP_ANSI_TO_RGB = np.array(ANSI_TO_RGB, dtype=np.uint8)
+    _NP_CUBE_R = np.array(_CUBE_R, dtype=np.uint8)
+    _NP_CUBE_G = np.array(_CUBE_G, dtype=np.uint8)
+    _NP_CUBE_B = np.array(_CUBE_B, dtype=np.uint8)
+    _NP_GREY = np.array([232 + i for i in _GREY_INDEX], dtype=np.uint8)
+
+_Buffer: TypeAlias = bytes | bytearray | memoryview
+
+
+def ansi_to_rgb_batch(codes: Iterable[int] | _Buffer | Any) -> Any:
+    'Converts many ANSI colour codes to RGB, see `ANSI_TO_RGB`.'
+    if HAS_NUMPY and isinstance(codes, np.ndarray):
+        return _NP_ANSI_TO_RGB[codes]
+    if isinstance(codes, (bytes, bytearray, memoryview)):
+        if HAS_NUMPY:
+            return _NP_ANSI_TO_RGB[np.frombuffer(codes, dtype=np.uint8)].tobytes()
+        return b''.join(map(_ANSI_TO_RGB_BYTES.__getitem__, codes))
+    return list(map(ansi_to_rgb, codes))
+
+
+def rgb_to_ansi_batch(rgbs: Sequence[tuple[int, int, int]] | _Buffer | Any) -> Any:
+    'Quantises many RGB tuples to the ANSI colour codes of the nearest colour cube level.'
+    if HAS_NUMPY and isinstance(rgbs, np.ndarray):
+        r, g, b = rgbs[..., 0], rgbs[..., 1], rgbs[..., 2]
+        return _NP_CUBE_R[r] + _NP_CUBE_G[g] + _NP_CUBE_B[b]
+    if isinstance(rgbs, (bytes, bytearray, memoryview)):
+        if HAS_NUMPY:
+            return rgb_to_ansi_batch(np.frombuffer(rgbs, dtype=np.uint8).reshape(-1, 3)).tobytes()
+        view = memoryview(rgbs).cast('B')
+        return bytes(map(rgb_to_ansi_cube, view[0::3], view[1::3], view[2::3]))
+    return [rgb_to_ansi_cube(r, g, b) for r, g, b in rgbs]
+
+
+def _rgb_to_ansi256_np(rgbs: Any, perceptual: bool) -> Any:
+    if perceptual:
+        # only convert each distinct colour once
+        wide = rgbs.astype(np.uint32)
+        packed = (wide[..., 0] << 16) | (wide[..., 1] << 8) | wide[..., 2]
+        unique, inverse = np.unique(packed, return_inverse=True)
+        codes = np.fromiter(
+            (_rgb_to_ansi256_oklab(int(p) >> 16, (int(p) >> 8) & 0xFF, int(p) & 0xFF) for p in unique),
+            dtype=np.uint8,
+            count=len(unique),
+        )
+        return codes[inverse].reshape(packed.shape)
+
+    rgbs = rgbs.astype(np.int32)
+    r, g, b = rgbs[..., 0], rgbs[..., 1], rgbs[..., 2]
+    cube = _NP_CUBE_R[r] + _NP_CUBE_G[g] + _NP_CUBE_B[b]
+    grey = _NP_GREY[r + g + b]
+    cube_distance = ((_NP_ANSI_TO_RGB[cube] - rgbs) ** 2).sum(-1)
+    grey_distance = ((_NP_ANSI_TO_RGB[grey] - rgbs) ** 2).sum(-1)
+    return np.where(grey_distance < cube_distance, grey, cube)
+
+
+def rgb_to_ansi256_batch(
+    rgbs: Sequence[tuple[int, int, int]] | _Buffer | Any, perceptual: bool = False
+) -> Any:
+    'Finds the nearest ANSI colour codes (16-255) for many RGB tuples, see `rgb_to_ansi256`.'
+    if HAS_NUMPY and isinstance(rgbs, np.ndarray):
+        return _rgb_to_ansi256_np(rgbs, perceptual)
+    if isinstance(rgbs, (bytes, bytearray, memoryview)):
+        if HAS_NUMPY:
+            return _rgb_to_ansi256_np(
+                np.frombuffer(rgbs, dtype=np.uint8).reshape(-1, 3), perceptual
+            ).tobytes()
+        view = memoryview(rgbs).cast('B')
+        return bytes(
+            rgb_to_ansi256(r, g, b, perceptual) for r, g, b in zip(view[0::3], view[1::3], view[2::3])
+        )
+    return [rgb_to_ansi256(r, g, b, perceptual) for r, g, b in rgbs]
+
+
 # Valid (supported) ANSI styles.
 _ANSI_STYLES: TypeAlias = Literal['fg', 'bg']
 _ANSI_ESCAPE_CODES: MappingProxyType[_ANSI_STYLES, str] = MappingProxyType({
     'fg': '38;5',
     'bg': '48;5',
 })
+_TRUECOLOUR_ESCAPE_CODES: MappingProxyType[_ANSI_STYLES, str] = MappingProxyType({
+    'fg': '38;2',
+    'bg': '48;2',
+})
 
 RESET: str = '\033[0m'
 
+# The RGB value of each of the 16 standard colours (0-15), as in the default xterm palette.
+# Terminal themes often change these, so they are only used when nothing better is supported.
+ANSI16_RGB: tuple[tuple[int, int, int], ...] = (
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+)
+# Lookup table of the nearest standard colour (0-15) for each ANSI colour code.
+ANSI_TO_ANSI16: bytes = bytes(range(16)) + bytes(
+    min(range(16), key=lambda i: _distance(ANSI_TO_RGB[n], ANSI16_RGB[i])) for n in range(16, 256)
+)
+
+# Lookup tables of the escape code for each ANSI colour code, by style,
+# - using the 256 colour palette
+_ANSI256_ESCAPES: MappingProxyType[_ANSI_STYLES, tuple[str, ...]] = MappingProxyType({
+    style: tuple(f'\033[{code};{n}m' for n in range(256))
+    for style, code in _ANSI_ESCAPE_CODES.items()
+})
+# - using the nearest standard colour (30-37/90-97 for fg, 40-47/100-107 for bg)
+_ANSI16_ESCAPES: MappingProxyType[_ANSI_STYLES, tuple[str, ...]] = MappingProxyType({
+    'fg': tuple(f'\033[{30 + i if i < 8 else 82 + i}m' for i in ANSI_TO_ANSI16),
+    'bg': tuple(f'\033[{40 + i if i < 8 else 92 + i}m' for i in ANSI_TO_ANSI16),
+})
+
+
+# Lookup tables of the escape code for each ANSI colour code, by colour depth and style
+_ESCAPES: MappingProxyType[int, MappingProxyType[_ANSI_STYLES, tuple[str, ...]]] = MappingProxyType({
+    ColourDepth.NONE:       MappingProxyType({'fg': ('',) * 256, 'bg': ('',) * 256}),
+    ColourDepth.ANSI16:     _ANSI16_ESCAPES,
+    ColourDepth.ANSI256:    _ANSI256_ESCAPES,
+    ColourDepth.TRUECOLOUR: _ANSI256_ESCAPES,
+})
+
+
+def ansi_escape(n: int, style: _ANSI_STYLES, depth: int) -> str:
+    '''
+    Returns the escape code for setting ANSI colour `n`, at a colour depth from `term.ColourDepth`.
+    - at 256 colours or more, this is the colour itself
+    - at 16 colours, this is the nearest standard colour
+    - with no colour, this is an empty string
+    '''
+    if 0 <= n < 256:
+        return _ESCAPES[depth][style][n]
+    if depth >= ColourDepth.ANSI256:
+        return f'\033[{_ANSI_ESCAPE_CODES[style]};{n}m'
+    return ''
+
+
+def rgb_escape(r: int, g: int, b: int, style: _ANSI_STYLES, depth: int) -> str:
+    '''
+    Returns the escape code for setting an RGB colour, at a colour depth from `term.ColourDepth`.
+    Below 24-bit colour, the nearest colour in the palette is used (see `rgb_to_ansi256`).
+    '''
+    if depth >= ColourDepth.TRUECOLOUR:
+        return f'\033[{_TRUECOLOUR_ESCAPE_CODES[style]};{r};{g};{b}m'
+    return ansi_escape(rgb_to_ansi256(r, g, b), style, depth)
+
 
 class ANSIColour(NamedTuple):
-    'Represents a terminal colour in both RGB and ANSI formats.'
+    '''
+    Represents a terminal colour in both RGB and ANSI formats.
+    Escape codes are for the colour depth of the environment (see `term.env_colour_depth`),
+    and are looked up from precomputed tables rather than formatted on each call.
+    '''
 
     ansi_n: int
     rgb: tuple[int, int, int]
 
-    def __escape(self, escape: str) -> str:
-        'Returns an ANSI escape code for setting the colour.'
-        return f'\033[{escape};{self.ansi_n}m'
+    @property
+    def fg(self) -> str:
+        'The ANSI escape code for setting the foreground colour.'
+        return self.escape_code('fg')
+
+    @property
+    def bg(self) -> str:
+        'The ANSI escape code for setting the background colour.'
+        return self.escape_code('bg')
 
     def escape_code(self, style: _ANSI_STYLES) -> str:
         'Returns the ANSI escape code for setting the colour.'
-        return self.__escape(_ANSI_ESCAPE_CODES[style])
+        return ansi_escape(self.ansi_n, style, env_colour_depth())
 
     def colorise(self, text: Any, style: _ANSI_STYLES = 'bg') -> str:
         'Returns the text with the colour applied.'
-        return f'{self.escape_code(style)}{text}{RESET}'
+        escape = self.escape_code(style)
+        if not escape:
+            return str(text)
+        return f'{escape}{text}{RESET}'
+
+
+# The ANSIColour for each ANSI colour code. As only 256 can exist, these are shared
+# (see `from_ansi`) rather than creating a new one for every cell.
+ANSI_COLOURS: tuple[ANSIColour, ...] = tuple(
+    ANSIColour(ansi_n=n, rgb=ANSI_TO_RGB[n]) for n in range(256)
+)
 
 
 def from_cube_coords(r: int, g: int, b: int) -> ANSIColour:
-    'Creates an ANSIColour from an RGB tuple.'
-    ansi = cube_coords_to_ansi(r, g, b)
-    return ANSIColour(rgb=ansi_to_rgb(ansi), ansi_n=ansi)
+    'Returns the ANSIColour for cube coordinates (0-5).'
+    return from_ansi(cube_coords_to_ansi(r, g, b))
 
 
 def from_ansi(n: int) -> ANSIColour:
-    'Creates an ANSIColour from an ANSI colour code.'
+    'Returns the ANSIColour for an ANSI colour code, which is shared for codes 0-255.'
+    if 0 <= n < 256:
+        return ANSI_COLOURS[n]
     return ANSIColour(ansi_n=n, rgb=ansi_to_rgb(n))
 
 
@@ -1,70 +1,207 @@
 from __future__ import annotations
 
+import colorsys
+import math
 import operator
-import os
 import re
+import shutil
+import sys
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from functools import partial
+from functools import cache, lru_cache
 from itertools import chain, repeat, starmap
-from typing import Dict, Iterable, Iterator, List, Literal, TypeAlias
+from typing import Any, Dict, Iterable, Iterator, List, Literal, TextIO, TypeAlias
 
+from laser_prynter import screen, text
 from laser_prynter.colour import c
 
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:  # numpy is optional, and only used to speed up building gradients
+    HAS_NUMPY = False
+
 Cell: TypeAlias = c.ANSIColour
 Row = List[Cell]
+Side: TypeAlias = Literal['top', 'bottom', 'left', 'right']
+# An edge of a face, as the side it's on and the ANSI colour codes along it
+Edge: TypeAlias = tuple[Side, tuple[int, ...]]
+
+# For each edge type, the side of a face, and the side of another face that it joins onto
+# e.g. the top side ('ts') of a face joins onto the bottom side of the face above it
+_EDGE_SIDES: dict[str, tuple[Side, Side]] = {
+    'ts':  ('top', 'bottom'),
+    'bs':  ('bottom', 'top'),
+    'lhs': ('left', 'right'),
+    'rhs': ('right', 'left'),
+}
+
+
+@cache
+def _cell_label(n: int) -> str:
+    'The label of a cell with ANSI colour code n, i.e. its RGB value'
+    return str(c.ansi_to_rgb(n))
+
+
+@cache
+def _rot90_index(width: int, n: int, flip: bool) -> tuple[int, ...]:
+    '''
+    For a face rotated 90 degrees n times (optionally flipped), the index of each of its cells
+    (in row-major order) in the original face
+    '''
+    rows = [list(range(r * width, (r + 1) * width)) for r in range(width)]
+    if flip:
+        rows = list(reversed(rows))
+    for _ in range(n):
+        rows = list(map(list, zip(*rows[::-1])))
+    return tuple(chain.from_iterable(rows))
 
 
-@dataclass
 class Face:
-    rows: List[Row]
-    with_rotations: bool = True
-    rotations: List[Face] = field(default_factory=list)
-    flipped_rotations: List[Face] = field(default_factory=list)
+    '''
+    A square grid of cells, stored as a flat array of ANSI colour codes in row-major order.
+    Rotations & flips are views of the same array through an index mapping, which are only
+    created when first used (so `with_rotations` is only accepted for compatibility, and ignored).
+    '''
+
+    __slots__ = ('_index', '_lines', '_views', 'codes', 'width')
+
+    def __init__(self, rows: Sequence[Sequence[Cell]], with_rotations: bool = True) -> None:
+        self.codes = array('H', [cell.ansi_n for row in rows for cell in row])
+        self.width = len(rows)
+        self._index: tuple[int, ...] | None = None
+        self._views: dict[tuple[int, bool], Face] = {}
+        self._lines: dict[tuple[int, int, int, int], tuple[str, ...]] = {}
+
+    @classmethod
+    def _view(cls, codes: array[int], width: int, index: tuple[int, ...] | None) -> Face:
+        face = cls.__new__(cls)
+        face.codes, face.width, face._index, face._views, face._lines = codes, width, index, {}, {}
+        return face
+
+    def cell_codes(self) -> tuple[int, ...]:
+        'The ANSI colour code of each cell, in row-major order'
+        if self._index is None:
+            return tuple(self.codes)
+        return tuple(self.codes[i] for i in self._index)
 
-    def __post_init__(self) -> None:
-        if self.with_rotations:
-            self.rotations = [Face._rot90(self.rows, n, flip=False) for n in range(4)]
-            self.flipped_rotations = [Face._rot90(self.rows, n, flip=True) for n in range(4)]
-
-    @staticmethod
-    def _rot90(rows: List[Row], n: int = 1, flip: bool = False) -> Face:
-        'Rotate a matrix 90 degrees, n times, optionally flipped'
-        if flip:
-            rows = list(reversed(rows))
-        for _ in range(n):
-            rows = list(map(list, zip(*rows[::-1])))
-        return Face(rows, with_rotations=False)
+    @property
+    def rows(self) -> List[Row]:
+        return list(self)
+
+    def edge(self, side: Side) -> tuple[int, ...]:
+        'The ANSI colour codes along one side of the face, top-to-bottom or left-to-right'
+        codes, w = self.cell_codes(), self.width
+        if side == 'top':
+            return codes[:w]
+        if side == 'bottom':
+            return codes[-w:]
+        if side == 'left':
+            return codes[::w]
+        return codes[w - 1 :: w]
 
     def rot90(self, n: int = 1, flip: bool = False) -> Face:
         'Rotate a matrix 90 degrees, n times, optionally flipped'
-        if flip:
-            return self.flipped_rotations[n]
-        return self.rotations[n]
+        n %= 4
+        if (n, flip) not in self._views:
+            index = _rot90_index(self.width, n, flip)
+            if self._index is not None:
+                index = tuple(self._index[i] for i in index)
+            self._views[n, flip] = Face._view(self.codes, self.width, index)
+        return self._views[n, flip]
+
+    @property
+    def rotations(self) -> list[Face]:
+        'The 4 rotations of the face (the 1st is a copy of it)'
+        return [self.rot90(n) for n in range(4)]
+
+    @property
+    def flipped_rotations(self) -> list[Face]:
+        'The 4 rotations of the face, flipped vertically'
+        return [self.rot90(n, flip=True) for n in range(4)]
 
     def __iter__(self) -> Iterator[Row]:
-        yield from self.rows
+        for i in range(self.width):
+            yield self[i]
 
     def __next__(self) -> Row:
         return next(self.__iter__())
 
     def __getitem__(self, i: int) -> Row:
-        return self.rows[i]
+        if i < 0:
+            i += self.width
+        if not 0 <= i < self.width:
+            raise IndexError(f'row index out of range: {i}')
+        start = i * self.width
+        if self._index is None:
+            return [c.from_ansi(n) for n in self.codes[start : start + self.width]]
+        return [c.from_ansi(self.codes[j]) for j in self._index[start : start + self.width]]
+
+    def __len__(self) -> int:
+        return self.width
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Face):
+            return NotImplemented
+        return self.width == other.width and self.cell_codes() == other.cell_codes()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f'Face(width={self.width}, codes={self.cell_codes()})'
 
     @staticmethod
+    @cache
     def empty_face(width: int = 6) -> Face:
-        return Face([[c.from_ansi(256)] * width] * width)
+        return Face._view(array('H', [256] * (width * width)), width, None)
 
     def iter_s(
         self, padding_top: int = 0, padding_bottom: int = 0, cell_width: int = 15
     ) -> Iterable[str]:
+        '''
+        The lines of the face, where each cell is labelled with its RGB value.
+        These are only rendered once for each combination of arguments (and colour depth).
+        '''
+        key = (padding_top, padding_bottom, cell_width, c.env_colour_depth())
+        if key not in self._lines:
+            self._lines[key] = tuple(self._render(padding_top, padding_bottom, cell_width))
+        return self._lines[key]
+
+    def _render(self, padding_top: int, padding_bottom: int, cell_width: int) -> Iterator[str]:
         for row in self.__iter__():
             p = [cell.colorise(' ' * cell_width) for cell in row]
             # r = [cell.colorise(f'{cell.ansi_n:^{cell_width}}') for cell in row]
-            r = [cell.colorise(f'{str(cell.rgb):^{cell_width}}') for cell in row]
+            r = [cell.colorise(f'{_cell_label(cell.ansi_n):^{cell_width}}') for cell in row]
 
             for r in chain(repeat(p, padding_top), [r], repeat(p, padding_bottom)):
                 yield ''.join(r)
 
+    def line_widths(self, cell_width: int = 15) -> list[int]:
+        '''
+        The display width of the labelled line of each row of the face, measured without rendering.
+        (labels wider than `cell_width` widen their cell, and padding lines are never wider)
+        '''
+        codes, w = self.cell_codes(), self.width
+        return [
+            sum(max(cell_width, text.width(_cell_label(n))) for n in codes[i * w : (i + 1) * w])
+            for i in range(w)
+        ]
+
+    def draw_line(
+        self, s: screen.Screen, x: int, y: int, row: int, label: bool = True, cell_width: int = 6
+    ) -> int:
+        '''
+        Draw a row of the face into a screen from column x on line y, with or without labels
+        (as in `iter_s`), and return the column after it.
+        '''
+        w = self.width
+        for n in self.cell_codes()[row * w : (row + 1) * w]:
+            cell = f'{_cell_label(n) if label else "":^{cell_width}}'
+            x = s.write(x, y, cell, bg=n if n < 256 else screen.DEFAULT)
+        return x
+
     def print(self, padding_top: int = 0, padding_bottom: int = 0, cell_width: int = 6) -> None:
         'Print the face, with optional cell padding top/bottom to make it more "square"'
 
@@ -109,15 +246,53 @@ class Faces:
                 yield ''.join(row)
 
     def as_str(self, padding_top: int = 0, padding_bottom: int = 0, cell_width: int = 6) -> str:
-        s = ''
-        for row in self.iter_s(padding_top, padding_bottom, cell_width):
-            s += row + '\n'
-        return s
+        return ''.join(
+            f'{row}\n' for row in self.iter_s(padding_top, padding_bottom, cell_width)
+        )
 
-    def print(self, padding_top: int = 0, padding_bottom: int = 0, cell_width: int = 6) -> None:
+    def str_width(self, cell_width: int = 6) -> int:
+        'The display width of the widest line, measured without rendering'
+        return max(
+            (
+                sum(widths)
+                for face_row in self.faces
+                for widths in zip(*[face.line_widths(cell_width) for face in face_row])
+            ),
+            default=0,
+        )
+
+    def draw(
+        self,
+        s: screen.Screen,
+        x: int = 0,
+        y: int = 0,
+        padding_top: int = 0,
+        padding_bottom: int = 0,
+        cell_width: int = 6,
+    ) -> int:
+        '''
+        Draw the faces into a screen from column x on line y, in the same layout as `iter_s`,
+        and return the line after them. Only the cells that changed are written on the next flush.
+        '''
+        for face_row in self.faces:
+            for row in range(min((face.width for face in face_row), default=0)):
+                for n in range(padding_top + 1 + padding_bottom):
+                    line_x = x
+                    for face in face_row:
+                        line_x = face.draw_line(s, line_x, y, row, n == padding_top, cell_width)
+                    y += 1
+        return y
+
+    def print(
+        self,
+        padding_top: int = 0,
+        padding_bottom: int = 0,
+        cell_width: int = 6,
+        file: TextIO | None = None,
+    ) -> None:
         'Print the faces of the cube, with optional cell padding top/bottom to make it more "square"'
 
-        print(self.as_str(padding_top, padding_bottom, cell_width))
+        (file or sys.stdout).write(self.as_str(padding_top, padding_bottom, cell_width) + '\n')
 
 
 def distance(c1: tuple[int, int, int], c2: tuple[int, int, int]) -> float:
@@ -134,42 +309,46 @@ class RGBCube:
 
     @property
     def str_width(self) -> int:
-        return max(len(ANSI_COLOURS.sub('', line)) for line in self.faces.iter_s())
+        return self.faces.str_width()
 
     @staticmethod
     def compare_rows(r1: Row, r2: Row) -> bool:
         return all(c1 == c2 for c1, c2 in zip(r1, r2))
 
-    def find_face_with_edge(self, face: Face, edge_type: str = 'ts') -> Face:
-        if edge_type == 'ts':
-            edge = face[0]
-        elif edge_type == 'bs':
-            edge = face[-1]
-        elif edge_type == 'lhs':
-            edge = [r[0] for r in face]
-        elif edge_type == 'rhs':
-            edge = [r[-1] for r in face]
+    def __post_init__(self) -> None:
+        # the faces that the edge index was built from, and the index
+        self._indexed: tuple[Faces, dict[Edge, Face]] | None = None
 
+    @property
+    def edge_index(self) -> dict[Edge, Face]:
+        '''
+        An index of every edge of every rotation & flip of each face, to the first face
+        (in order of faces, rotations, then flips) with that edge.
+        This is rebuilt when the faces are replaced.
+        '''
+        if self._indexed is not None and self._indexed[0] is self.faces:
+            return self._indexed[1]
+        index: dict[Edge, Face] = {}
         for face in self.faces:
             for rot in range(4):
                 for flip in (False, True):
-                    if edge_type == 'ts' and RGBCube.compare_rows(
-                        face.rot90(rot, flip=flip)[-1], edge
-                    ):
-                        return face.rot90(rot, flip=flip)
-                    elif edge_type == 'bs' and RGBCube.compare_rows(
-                        face.rot90(rot, flip=flip)[0], edge
-                    ):
-                        return face.rot90(rot, flip=flip)
-                    elif edge_type == 'lhs' and RGBCube.compare_rows(
-                        [r[-1] for r in face.rot90(rot, flip=flip)], edge
-                    ):
-                        return face.rot90(rot, flip=flip)
-                    elif edge_type == 'rhs' and RGBCube.compare_rows(
-                        [r[0] for r in face.rot90(rot, flip=flip)], edge
-                    ):
-                        return face.rot90(rot, flip=flip)
-        raise ValueError('No face with matching edge found')
+                    view = face.rot90(rot, flip=flip)
+                    for side in ('top', 'bottom', 'left', 'right'):
+                        index.setdefault((side, view.edge(side)), view)
+        self._indexed = (self.faces, index)
+        return index
+
+    def find_face_with_edge(self, face: Face, edge_type: str = 'ts') -> Face:
+        '''
+        Find a (rotated/flipped) face that joins onto one side of a face, where `edge_type` is
+        - 'ts'/'bs': the face above/below it
+        - 'lhs'/'rhs': the face to the left/right of it
+        '''
+        side, other_side = _EDGE_SIDES[edge_type]
+        try:
+            return self.edge_index[other_side, face.edge(side)]
+        except KeyError:
+            raise ValueError('No face with matching edge found') from None
 
     @staticmethod
     def from_ranges(
@@ -200,7 +379,45 @@ class RGBCubeCollection:
     cubes: Dict[str, RGBCube]
 
     def __post_init__(self) -> None:
-        self.width = os.get_terminal_size().columns
+        self.width = shutil.get_terminal_size().columns
+        # the edge index of each cube that the edge index was built from, and the index
+        self._indexed: (
+            tuple[list[tuple[str, dict[Edge, Face]]], dict[Edge, list[tuple[str, Face]]]] | None
+        ) = None
+
+    @property
+    def edge_index(self) -> dict[Edge, list[tuple[str, Face]]]:
+        '''
+        An index of every edge in every cube, to the first face with that edge in each cube
+        (in order of cubes), see `RGBCube.edge_index`.
+        This is rebuilt when the cubes change, i.e. when a cube is added, removed or replaced,
+        or its faces are replaced.
+        '''
+        cube_indexes = [(name, cube.edge_index) for name, cube in self.cubes.items()]
+        if self._indexed is not None and _same_indexes(self._indexed[0], cube_indexes):
+            return self._indexed[1]
+        index: dict[Edge, list[tuple[str, Face]]] = {}
+        for name, cube_index in cube_indexes:
+            for edge, face in cube_index.items():
+                index.setdefault(edge, []).append((name, face))
+        self._indexed = (cube_indexes, index)
+        return index
+
+    def groups(self, cell_width: int = 6) -> list[list[tuple[str, RGBCube, int]]]:
+        '''
+        Split the cubes into groups that fit side-by-side in the terminal width,
+        as (name, cube, width) for each cube.
+        '''
+        groups: list[list[tuple[str, RGBCube, int]]] = [[]]
+        group_width = 0
+        for name, cube in self.cubes.items():
+            width = cube.faces.str_width(cell_width)
+            if group_width + width > self.width and groups[-1]:
+                groups.append([])
+                group_width = 0
+            groups[-1].append((name, cube, width))
+            group_width += width
+        return [g for g in groups if g]
 
     def print(
         self,
@@ -208,40 +425,38 @@ class RGBCubeCollection:
         padding_top: int = 0,
         padding_bottom: int = 0,
         cell_width: int = 6,
+        file: TextIO | None = None,
     ) -> None:
-        groups: List[Dict[str, RGBCube]] = []
-        current_group: Dict[str, RGBCube] = {}
-        for name, cube in self.cubes.items():
-            if sum(v.str_width for v in current_group.values()) + cube.str_width <= self.width:
-                current_group[name] = cube
-            else:
-                groups.append(current_group)
-                current_group = {name: cube}
-        groups.append(current_group)
-
-        for g in groups:
-            for name, cube in g.items():
-                print(f'{name:<{cube.str_width}s}', end=grid_sep)
-            print()
-            for rows in zip(*[
-                cube.faces.iter_s(padding_top, padding_bottom, cell_width) for n, cube in g.items()
-            ]):
-                print(grid_sep.join(rows))
+        '''
+        Print the cubes side-by-side, in as many groups as needed to fit the terminal width,
+        writing each group (the cube names, then the lines of the cubes) in a single call.
+        '''
+        file = file or sys.stdout
+        for g in self.groups(cell_width):
+            header = ''.join(f'{text.ljust(name, width)}{grid_sep}' for name, _cube, width in g)
+            lines = zip(*[
+                cube.faces.iter_s(padding_top, padding_bottom, cell_width) for _name, cube, _width in g
+            ])
+            file.write(header + '\n' + ''.join(f'{grid_sep.join(line)}\n' for line in lines))
+
+
+def _same_indexes(a: list[tuple[str, dict]], b: list[tuple[str, dict]]) -> bool:
+    'Whether 2 lists of named edge indexes have the same names & index objects, in the same order'
+    return len(a) == len(b) and all(n1 == n2 and i1 is i2 for (n1, i1), (n2, i2) in zip(a, b))
 
 
 def find_face_with_edge(
     collection: RGBCubeCollection, face_name: str, face: Face, edge_type: str
 ) -> tuple[Face, str]:
-    for n, cube in collection.cubes.items():
-        if n == face_name:
-            continue
-        try:
-            f = cube.find_face_with_edge(face, edge_type)
+    '''
+    Find a (rotated/flipped) face that joins onto one side of a face, in any of the cubes except
+    `face_name`, returning the face and the name of its cube. See `RGBCube.find_face_with_edge`.
+    '''
+    side, other_side = _EDGE_SIDES[edge_type]
+    for n, f in collection.edge_index.get((other_side, face.edge(side)), ()):
+        if n != face_name:
             return f, n
-        except ValueError:
-            continue
-    else:
-        raise ValueError('No face with matching edge found')
+    raise ValueError('No face with matching edge found')
 
 
 def create_cube(f1: Face, f1_name: str, cube_collection: RGBCubeCollection) -> None:
@@ -260,7 +475,131 @@ def create_cube(f1: Face, f1_name: str, cube_collection: RGBCubeCollection) -> N
     Faces(faces).print(padding_top=0, padding_bottom=1, cell_width=15)
 
 
-@dataclass
+# The colour spaces that gradients can be interpolated in
+# - 'rgb' interpolates each component linearly
+# - 'oklab' is perceptually uniform, so the steps look evenly spaced
+# - 'hsl' interpolates around the hue circle (the shortest way), for "rainbow" gradients
+ColourSpace: TypeAlias = Literal['rgb', 'oklab', 'hsl']
+
+_Coords: TypeAlias = tuple[float, float, float]
+
+
+def _to_space(rgb: tuple[int, int, int], space: ColourSpace) -> _Coords:
+    'Convert an RGB tuple to coordinates in a colour space'
+    if space == 'oklab':
+        return c.rgb_to_oklab(*rgb)
+    if space == 'hsl':
+        h, l, s = colorsys.rgb_to_hls(rgb[0] / 255, rgb[1] / 255, rgb[2] / 255)
+        return (h, s, l)
+    return (float(rgb[0]), float(rgb[1]), float(rgb[2]))
+
+
+def _hsl_to_rgb(h: float, s: float, l: float) -> _Coords:
+    '''
+    Convert HSL (0-1) to RGB (0-255, unrounded), for any hue (i.e. not just 0-1)
+    (from: https://en.wikipedia.org/wiki/HSL_and_HSV#HSL_to_RGB_alternative)
+    '''
+    a = s * min(l, 1 - l)
+
+    def _f(n: int) -> float:
+        k = (n + h * 12) % 12
+        return (l - a * max(-1.0, min(k - 3, 9 - k, 1.0))) * 255
+
+    return (_f(0), _f(8), _f(4))
+
+
+def _round(v: float) -> int:
+    return min(max(math.floor(v + 0.5), 0), 255)
+
+
+def _stop_coords(stops: Sequence[tuple[int, int, int]], space: ColourSpace) -> list[_Coords]:
+    '''
+    Convert each stop to the colour space. Hues are unwrapped so that each is within half a turn
+    of the previous one, so that interpolating linearly between them goes the shortest way around.
+    '''
+    coords = [_to_space(stop, space) for stop in stops]
+    if space == 'hsl':
+        for i in range(1, len(coords)):
+            h0, (h, s, l) = coords[i - 1][0], coords[i]
+            coords[i] = (h0 + ((h - h0 + 0.5) % 1 - 0.5), s, l)
+    return coords
+
+
+def _interp_py(coords: list[_Coords], steps: int, space: ColourSpace) -> list[tuple[int, int, int]]:
+    n_segments = len(coords) - 1
+    result = []
+    for i in range(steps):
+        t = i * n_segments / (steps - 1) if steps > 1 else 0.0
+        k = min(int(t), n_segments - 1)
+        u = t - k
+        (x0, y0, z0), (x1, y1, z1) = coords[k], coords[k + 1]
+        x, y, z = (1 - u) * x0 + u * x1, (1 - u) * y0 + u * y1, (1 - u) * z0 + u * z1
+        if space == 'oklab':
+            result.append(c.oklab_to_rgb(x, y, z))
+            continue
+        if space == 'hsl':
+            x, y, z = _hsl_to_rgb(x, y, z)
+        result.append((_round(x), _round(y), _round(z)))
+    return result
+
+
+def _interp_np(coords: list[_Coords], steps: int, space: ColourSpace) -> Any:
+    'The same as `_interp_py`, as array operations over all steps at once, returning a uint8 array'
+    n_segments = len(coords) - 1
+    points = np.array(coords, dtype=np.float64)
+    if steps > 1:
+        t = np.arange(steps) * n_segments / (steps - 1)
+    else:
+        t = np.zeros(steps)
+    k = np.minimum(t.astype(np.intp), n_segments - 1)
+    u = (t - k)[:, None]
+    x, y, z = ((1 - u) * points[k] + u * points[k + 1]).T
+
+    if space == 'oklab':
+        lms = np.stack((
+            x + 0.3963377774 * y + 0.2158037573 * z,
+            x - 0.1055613458 * y - 0.0638541728 * z,
+            x - 0.0894841775 * y - 1.2914855480 * z,
+        )) ** 3
+        linear = np.array([
+            [4.0767416621, -3.3077115913, 0.2309699292],
+            [-1.2684380046, 2.6097574011, -0.3413193965],
+            [-0.0041960863, -0.7034186147, 1.7076147010],
+        ]) @ lms
+        srgb = np.where(
+            linear <= 0.0031308,
+            12.92 * linear,
+            1.055 * np.maximum(linear, 0.0) ** (1 / 2.4) - 0.055,
+        )
+        rgb = (srgb * 255).T
+    elif space == 'hsl':
+        h, s, l = x, y, z
+        a = s * np.minimum(l, 1 - l)
+        n = np.array([0, 8, 4])[:, None]
+        k12 = (n + h * 12) % 12
+        rgb = ((l - a * np.clip(np.minimum(k12 - 3, 9 - k12), -1, 1)) * 255).T
+    else:
+        rgb = np.stack((x, y, z), axis=-1)
+    return np.clip(np.floor(rgb + 0.5), 0, 255).astype(np.uint8)
+
+
+def interp_stops(
+    stops: Sequence[tuple[int, int, int]], steps: int, space: ColourSpace = 'rgb'
+) -> list[tuple[int, int, int]]:
+    '''
+    Interpolate `steps` RGB colours through 2 or more colour stops, which are spaced evenly,
+    so that the first and last colours are exactly the first and last stops.
+    This uses array operations when numpy is available, and a pure-python loop otherwise.
+    '''
+    if len(stops) < 2:
+        raise ValueError(f'A gradient needs at least 2 stops: {stops}')
+    coords = _stop_coords(stops, space)
+    if HAS_NUMPY:
+        return list(map(tuple, _interp_np(coords, steps, space).tolist()))
+    return _interp_py(coords, steps, space)
+
+
+@dataclass(frozen=True)
 class Gradient:
     'Represents a gradient between two RGB colours.'
 
@@ -286,40 +625,48 @@ class Gradient:
 
     @staticmethod
     def interp(v0: float, v1: float, n_steps: int) -> list[float]:
-        return list(
-            map(
-                partial(Gradient.lerp, v0, v1),
-                list(
-                    map(
-                        lambda x: x / (n_steps - 1),
-                        range(0, n_steps),
-                    )
-                ),
-            )
-        )
+        'Interpolate n_steps values from v0 to v1 (inclusive), see `lerp`'
+        last = max(n_steps - 1, 1)
+        return [round((1 - (i / last)) * v0 + (i / last) * v1, 2) for i in range(n_steps)]
 
     @staticmethod
     def interp_xyz(
         c1: tuple[int, int, int], c2: tuple[int, int, int], n_steps: int
     ) -> list[tuple[float, ...]]:
-        return list(
-            zip(
-                *starmap(
-                    Gradient.interp,
-                    zip(c1, c2, repeat(n_steps)),
-                )
-            )
-        )
+        'Interpolate n_steps (x, y, z) values from c1 to c2 (inclusive), see `lerp`'
+        return list(zip(*(Gradient.interp(v0, v1, n_steps) for v0, v1 in zip(c1, c2))))
 
 
-@dataclass
+@dataclass(frozen=True)
 class RGBGradient(Gradient):
-    sequence: list[c.RGBColour] = field(init=False)
+    '''
+    A sequence of `steps` RGB colours from start to end,
+    - passing through each of the `via` colours, which are spaced evenly along the gradient
+    - interpolated in a colour space, see `ColourSpace`
+    Gradients are immutable, so they can be shared, see `RGBGradient.get`.
+    '''
+
+    sequence: tuple[c.RGBColour, ...] = field(init=False, compare=False)
+    via: tuple[c.RGBColour, ...] = ()
+    space: ColourSpace = 'rgb'
 
     def __post_init__(self) -> None:
-        seq = self.interp_xyz(
-            c1=(self.start.r, self.start.g, self.start.b),
-            c2=(self.end.r, self.end.g, self.end.b),
-            n_steps=self.steps,
-        )
-        self.sequence = [c.RGBColour(*map(int, color)) for color in seq]
+        object.__setattr__(self, 'sequence', tuple(map(
+            c.RGBColour._make,
+            interp_stops((self.start, *self.via, self.end), self.steps, self.space),
+        )))
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def get(
+        start: c.RGBColour,
+        end: c.RGBColour,
+        steps: int,
+        via: tuple[c.RGBColour, ...] = (),
+        space: ColourSpace = 'rgb',
+    ) -> RGBGradient:
+        '''
+        Get a gradient, reusing a previously built one with the same arguments if possible.
+        Hits & misses are counted by `RGBGradient.get.cache_info()`.
+        '''
+        return RGBGradient(start, end, steps, via, space)
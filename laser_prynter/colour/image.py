@@ -0,0 +1,275 @@
+'''
+Render images in the terminal, as half-block characters (▀) with the top pixel as the foreground
+colour and the bottom pixel as the background colour, so that each cell shows 2 square-ish pixels.
+
+Images are read from netpbm files (PPM/PGM/PAM), or raw RGB bytes, with no external decoders.
+They are streamed 2 rows at a time (so the whole image is never in memory) and scaled down to fit
+the terminal width, with array operations for the scaling & colours when numpy is available, e.g.
+    ```python
+    image.print_image('photo.ppm')
+    # or, from ffmpeg
+    #   ffmpeg -i video.mp4 -f image2pipe -vcodec ppm - | python -c '...'
+    for frame in image.render_frames(sys.stdin.buffer, columns=80):
+        sys.stdout.write(frame)
+    ```
+'''
+
+from __future__ import annotations
+
+import shutil
+import sys
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any, BinaryIO, Literal, NamedTuple, TextIO
+
+from laser_prynter import term
+from laser_prynter.colour import c
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:  # numpy is optional, and only used to speed up scaling & colouring rows
+    HAS_NUMPY = False
+
+HALF_BLOCK = '▀'
+
+# The PAM tuple types that can be rendered, and their number of channels
+_TUPLTYPES = {'GRAYSCALE': 1, 'GRAYSCALE_ALPHA': 2, 'RGB': 3, 'RGB_ALPHA': 4}
+
+
+class ImageHeader(NamedTuple):
+    'The size & sample format of an image'
+    width: int
+    height: int
+    channels: int = 3  # 1 for greyscale, 2 & 4 have an alpha channel (which is ignored)
+    maxval: int = 255
+
+
+def _token(f: BinaryIO) -> bytes:
+    'Read the next whitespace-separated token of a netpbm header, skipping comments'
+    token = bytearray()
+    while ch := f.read(1):
+        if ch == b'#':
+            f.readline()
+        elif ch.isspace():
+            if token:
+                break
+        else:
+            token += ch
+    return bytes(token)
+
+
+def read_header(f: BinaryIO) -> ImageHeader | None:
+    '''
+    Read the header of a binary netpbm image (P5 PGM, P6 PPM or P7 PAM), leaving `f` at the
+    start of the pixel data. Returns None at the end of the stream (e.g. after the last frame).
+    '''
+    magic = _token(f)
+    if not magic:
+        return None
+    if magic in (b'P5', b'P6'):
+        width, height, maxval = (int(_token(f)) for _ in range(3))
+        header = ImageHeader(width, height, 1 if magic == b'P5' else 3, maxval)
+    elif magic == b'P7':
+        fields: dict[str, str] = {}
+        while (key := _token(f).decode()) != 'ENDHDR':
+            if not key:
+                raise ValueError('PAM header has no ENDHDR')
+            fields[key] = _token(f).decode()
+        tupltype = fields.get('TUPLTYPE', 'RGB')
+        if tupltype not in _TUPLTYPES:
+            raise ValueError(f'unsupported PAM tuple type: {tupltype}')
+        header = ImageHeader(
+            int(fields['WIDTH']), int(fields['HEIGHT']), int(fields['DEPTH']), int(fields['MAXVAL'])
+        )
+    else:
+        raise ValueError(f'unsupported image format: {magic!r} (expected P5, P6 or P7)')
+    if not 0 < header.maxval <= 65535:
+        raise ValueError(f'invalid maxval: {header.maxval} (expected 1-65535)')
+    return header
+
+
+def _to_rgb(row: bytes, header: ImageHeader) -> bytes:
+    'Convert a row of samples to 8-bit RGB, dropping any alpha channel'
+    if header.maxval > 255:
+        # 16-bit samples are big-endian
+        row = bytes(
+            (hi << 8 | lo) * 255 // header.maxval for hi, lo in zip(row[0::2], row[1::2])
+        )
+    elif header.maxval != 255:
+        row = row.translate(bytes(min(v * 255 // header.maxval, 255) for v in range(256)))
+    if header.channels == 3:
+        return row
+    rgb = bytearray(header.width * 3)
+    if header.channels <= 2:
+        rgb[0::3] = rgb[1::3] = rgb[2::3] = row[0 :: header.channels]
+    else:
+        for i in range(3):
+            rgb[i::3] = row[i :: header.channels]
+    return bytes(rgb)
+
+
+def iter_rows(f: BinaryIO, header: ImageHeader) -> Iterator[bytes]:
+    'Read the rows of an image one at a time, as 8-bit RGB bytes'
+    row_size = header.width * header.channels * (2 if header.maxval > 255 else 1)
+    for _ in range(header.height):
+        row = f.read(row_size)
+        if len(row) < row_size:
+            raise ValueError('image data is truncated')
+        yield _to_rgb(row, header)
+
+
+def _escapes(row: bytes, style: Literal['fg', 'bg'], depth: int) -> list[str]:
+    'The escape sequence to set the colour of each pixel in a row of RGB bytes'
+    if depth >= term.ColourDepth.TRUECOLOUR:
+        code = '38;2' if style == 'fg' else '48;2'
+        return [f'\x1b[{code};{r};{g};{b}m' for r, g, b in zip(row[0::3], row[1::3], row[2::3])]
+    return [c.ansi_escape(n, style, depth) for n in c.rgb_to_ansi256_batch(row)]
+
+
+def _line(top: bytes, bottom: bytes | None, depth: int) -> str:
+    '''
+    Render 2 rows of pixels as a line of half-blocks, only setting a colour when it's different
+    to the cell before it (the bottom half of the last line of an odd-height image is left blank)
+    '''
+    out, fg, bg = [], '', ''
+    bgs = _escapes(bottom, 'bg', depth) if bottom is not None else None
+    for i, escape in enumerate(_escapes(top, 'fg', depth)):
+        if escape != fg:
+            out.append(escape)
+            fg = escape
+        if bgs is not None and bgs[i] != bg:
+            out.append(bgs[i])
+            bg = bgs[i]
+        out.append(HALF_BLOCK)
+    if fg or bg:
+        out.append(c.RESET)
+    return ''.join(out)
+
+
+def _sgr_np(values: Any, prefix: bytes) -> tuple[Any, Any]:
+    '''
+    The bytes of the SGR escape sequence of each pixel, from its (N, k) colour parameters (0-255),
+    as an (N, len) array, and a mask of the bytes to keep (which drops the leading zeros)
+    '''
+    n, k = values.shape
+    digits = np.stack([values // 100, values // 10 % 10, values % 10], axis=-1) + ord('0')
+    sep = np.full((n, k, 1), ord(';'), dtype=np.uint8)
+    sep[:, -1] = ord('m')
+    params = np.concatenate([digits, sep], axis=-1).reshape(n, -1)
+    keep = np.stack([values >= 100, values >= 10] + [np.ones_like(values, dtype=bool)] * 2, axis=-1)
+    start = np.tile(np.frombuffer(prefix, dtype=np.uint8), (n, 1))
+    return (
+        np.concatenate([start, params], axis=1),
+        np.concatenate([np.ones(start.shape, dtype=bool), keep.reshape(n, -1)], axis=1),
+    )
+
+
+def _line_np(top: bytes, bottom: bytes | None, depth: int) -> str:
+    '''
+    Render 2 rows of pixels as a line of half-blocks (the same as `_line`, at 256 colours or more),
+    by building the bytes of the whole line with array operations
+    '''
+    parts: list[Any] = []
+    masks: list[Any] = []
+    for row, code in ((top, 38), (bottom, 48)):
+        if row is None:
+            continue
+        rgb = np.frombuffer(row, dtype=np.uint8).reshape(-1, 3)
+        if depth >= term.ColourDepth.TRUECOLOUR:
+            values, prefix = rgb, b'\x1b[%d;2;' % code
+        else:
+            values, prefix = c.rgb_to_ansi256_batch(rgb)[:, None], b'\x1b[%d;5;' % code
+        if not len(values):
+            return ''
+        sgr, keep = _sgr_np(values, prefix)
+        # only set a colour when it's different to the cell before it
+        changed = np.ones(len(values), dtype=bool)
+        changed[1:] = (values[1:] != values[:-1]).any(axis=1)
+        parts.append(sgr)
+        masks.append(keep & changed[:, None])
+    block = np.frombuffer(HALF_BLOCK.encode(), dtype=np.uint8)
+    parts.append(np.tile(block, (len(parts[0]), 1)))
+    masks.append(np.ones(parts[-1].shape, dtype=bool))
+    line = np.concatenate(parts, axis=1)[np.concatenate(masks, axis=1)]
+    return bytes(line).decode() + c.RESET
+
+
+def _scale_rows(rows: Iterable[bytes], scale: float, columns: int) -> Iterator[bytes]:
+    'Scale rows of RGB pixels down by `scale` (>= 1), keeping the nearest pixel of each row & column'
+    offsets = [int(x * scale) * 3 + i for x in range(columns) for i in range(3)]
+    index = np.array(offsets, dtype=np.intp) if HAS_NUMPY else None
+    wanted = 0
+    for n, row in enumerate(rows):
+        if n == int(wanted * scale):
+            if index is not None:
+                yield np.frombuffer(row, dtype=np.uint8)[index].tobytes()
+            else:
+                yield bytes(row[o] for o in offsets)
+            wanted += 1
+
+
+def render_rows(
+    rows: Iterable[bytes], width: int, columns: int | None = None, depth: int | None = None
+) -> Iterator[str]:
+    '''
+    Render rows of 8-bit RGB pixels (each `width` pixels wide) as lines of half-blocks, 2 rows per
+    line. This can be used for any image, e.g. a heatmap with colours from a gradient.
+    - `columns` is the maximum width in terminal cells (the terminal width by default), and wider
+      images are scaled down with nearest-neighbour sampling (keeping the aspect ratio)
+    - `depth` is the colour depth (see `term.ColourDepth`), from the environment by default
+    '''
+    if depth is None:
+        depth = term.env_colour_depth()
+    columns = min(columns or shutil.get_terminal_size().columns, width)
+    if columns < width:
+        rows = _scale_rows(rows, width / columns, columns)
+    line = _line_np if HAS_NUMPY and depth >= term.ColourDepth.ANSI256 else _line
+    rows = iter(rows)
+    while pair := list(islice(rows, 2)):
+        yield line(pair[0], pair[1] if len(pair) == 2 else None, depth)
+
+
+def render(
+    f: BinaryIO,
+    columns: int | None = None,
+    depth: int | None = None,
+    size: tuple[int, int] | None = None,
+) -> Iterator[str]:
+    '''
+    Render an image as lines of half-blocks (see `render_rows`), streamed from `f`, which is a
+    binary netpbm image (PPM/PGM/PAM), or raw 8-bit RGB pixels if the (width, height) `size` is given.
+    '''
+    header = ImageHeader(*size) if size is not None else read_header(f)
+    if header is None:
+        raise ValueError('no image to read')
+    return render_rows(iter_rows(f, header), header.width, columns, depth)
+
+
+def render_frames(
+    f: BinaryIO, columns: int | None = None, depth: int | None = None
+) -> Iterator[str]:
+    '''
+    Render a stream of netpbm images (e.g. from `ffmpeg -f image2pipe -vcodec ppm`) as animation
+    frames, each a single string that redraws the frame from the top-left of the terminal.
+    '''
+    while (header := read_header(f)) is not None:
+        lines = render_rows(iter_rows(f, header), header.width, columns, depth)
+        yield '\x1b[H' + '\n'.join(lines)
+
+
+def print_image(
+    path: str,
+    file: TextIO | None = None,
+    columns: int | None = None,
+    size: tuple[int, int] | None = None,
+) -> None:
+    '''
+    Print an image file (see `render`) line by line,
+    at the colour depth of `file` (STDOUT by default).
+    '''
+    file = file or sys.stdout
+    with open(path, 'rb') as f:
+        for line in render(f, columns, term.colour_depth(file), size):
+            file.write(line + '\n')
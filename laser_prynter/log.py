@@ -34,7 +34,7 @@ import os
 import sys
 from typing import Any, TextIO
 
-from laser_prynter.pp import _json_default
+from laser_prynter.pp import Limits, _is_circular, _json_default, truncate
 
 class LogLevel:
     'An enum type for log levels.'
@@ -50,12 +50,14 @@ DEFAULT_LOG_LEVEL = LogLevel.INFO
 
 class LogFormatter(logging.Formatter):
     'Custom log formatter that formats log messages as JSON, aka "Structured Logging".'
-    def __init__(self, defaults: dict = {}):
+    def __init__(self, defaults: dict = {}, limits: Limits | None = None):
         '''
         Initializes the log formatter with optional default context.
         - `defaults` is a dictionary of default context values to include in every log message.
+        - `limits` bounds the size (and cost) of each log message, see `pp.Limits`.
         '''
         self.defaults = defaults
+        self.limits = limits
         super().__init__()
 
     def format(self, record: logging.LogRecord) -> str:
@@ -72,17 +74,29 @@ class LogFormatter(logging.Formatter):
         elif isinstance(record.args, dict):
             kwargs = record.args
 
-        record.msg = json.dumps(
-            {
-                'timestamp': datetime.now().astimezone().isoformat(),
-                'level':     record.levelname,
-                'name':      record.name,
-                'msg':       record.msg,
-                'event':     {'args': args} if args else {} | kwargs or {},
-                **({'context': self.defaults} if self.defaults else {}),
-            },
-            default=_json_default,
-        )
+        msg, event = record.msg, {'args': args} if args else {} | kwargs or {}
+        if self.limits is not None:
+            # the limits apply to the logged values, rather than to the fields of every message
+            msg, event = truncate(msg, self.limits), truncate(event, self.limits)
+
+        message = {
+            'timestamp': datetime.now().astimezone().isoformat(),
+            'level':     record.levelname,
+            'name':      record.name,
+            'msg':       msg,
+            'event':     event,
+            **({'context': self.defaults} if self.defaults else {}),
+        }
+        try:
+            record.msg = json.dumps(message, default=_json_default)
+        except (ValueError, RecursionError) as e:
+            if not _is_circular(e):
+                raise
+            # values with cycles are converted first, which replaces each cycle with a reference
+            message['msg'], message['event'] = (
+                truncate(msg, Limits(), share=True), truncate(event, Limits(), share=True)
+            )
+            record.msg = json.dumps(message, default=_json_default)
         record.args = ()
         return super().format(record)
 
@@ -92,6 +106,7 @@ def _getLogger(
     level:    int                   = logging.CRITICAL,
     handlers: list[logging.Handler] = [],
     context:  dict                  = {},
+    limits:   Limits | None         = None,
 ) -> logging.Logger:
     '''
     Creates a logger with the given name, level, and handlers.
@@ -126,7 +141,7 @@ def _getLogger(
 
     if logger.handlers:
         # only set the first handler to use the custom formatter
-        logger.handlers[0].setFormatter(LogFormatter(defaults=context))
+        logger.handlers[0].setFormatter(LogFormatter(defaults=context, limits=limits))
 
     return logger
 
@@ -136,6 +151,7 @@ def getLogger(
     stream:   TextIO       = sys.stdout,
     files:    dict[int, str] = {},
     context:  dict                = {},
+    limits:   Limits | None       = None,
 ) -> logging.Logger:
     '''
     Creates a logger with the given name, level, and handlers.
@@ -148,6 +164,7 @@ def getLogger(
     - `level` is the log level for the logger and all handlers (default is INFO).
         - if `level` is not provided, it will check the environment variable `LOG_LEVEL` and use its value if it exists
         - otherwise it defaults to `LogLevel.INFO`.
+    - `limits` bounds the size (and cost) of each log message, see `pp.Limits`.
     '''
 
     if level == -1:
@@ -169,4 +186,4 @@ def getLogger(
         fhandler.setLevel(flevel)
         handlers.append(fhandler)
 
-    return _getLogger(name, level, handlers, context=context)
+    return _getLogger(name, level, handlers, context=context, limits=limits)
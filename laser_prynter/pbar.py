@@ -2,15 +2,25 @@
 
 from __future__ import annotations
 
-import math
+import abc
+import functools
+import io
+import logging
+import multiprocessing
 import os
 import signal
+import stat
 import sys
+import threading
 import time
 import types
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Sized
+from itertools import count
 from random import randint
-from typing import Iterator
+from typing import IO, Any, Self, TypeAlias, TypeVar
 
+from laser_prynter import log, pp, term, text
+from laser_prynter.colour import c
 from laser_prynter.colour.c import RGBColour
 from laser_prynter.colour.gradient import RGBGradient
 
@@ -21,6 +31,27 @@ def _print_to_terminal(s: str) -> None:
     sys.stderr.flush()
 
 
+def _is_headless() -> bool:
+    'Detect if STDERR is not a terminal (e.g. when captured by systemd/k8s/CI)'
+    return pp._output_is_redirected(sys.stderr)
+
+
+@functools.cache
+def _progress_logger() -> logging.Logger:
+    '''
+    The logger for progress records in headless mode, as JSON to STDERR.
+    (this doesn't use `log.getLogger`, as that replaces the handlers of the root logger)
+    '''
+    logger = logging.getLogger('laser_prynter.pbar')
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(log.LogFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(log.LogLevel.INFO)
+        logger.propagate = False
+    return logger
+
+
 def _get_terminal_size() -> tuple[int, int]:
     '''
     Get terminal size (width, height)
@@ -38,50 +69,346 @@ def _get_terminal_size() -> tuple[int, int]:
     return (size.columns, size.lines)
 
 
+class SharedCounter(abc.ABC):
+    'A progress counter that can be incremented by many workers, and read by the bar.'
+
+    @abc.abstractmethod
+    def add(self, n: int = 1) -> None: ...
+
+    @abc.abstractmethod
+    def per_worker(self) -> dict[int, int]:
+        'Return the count for each worker, keyed by worker id'
+
+    @property
+    def value(self) -> int:
+        return sum(self.per_worker().values())
+
+
+class ThreadCounter(SharedCounter):
+    '''
+    A lock-free counter that can be incremented from many threads.
+    Each thread only ever increments its own slot (keyed by thread id),
+    and reading the value sums every slot.
+    '''
+
+    def __init__(self) -> None:
+        # each thread's slot is found through a thread-local, and registered by thread ident
+        # so that the value can be summed from any thread
+        self._local = threading.local()
+        self.counts: dict[int, list[int]] = {}
+
+    def add(self, n: int = 1) -> None:
+        try:
+            self._local.slot[0] += n
+        except AttributeError:
+            # the first add in this thread (a reused ident continues the finished thread's slot)
+            self._local.slot = self.counts.setdefault(threading.get_ident(), [0])
+            self._local.slot[0] += n
+
+    def per_worker(self) -> dict[int, int]:
+        # dict() copies the slots in one step, so a concurrently added slot can't break iteration
+        return {ident: slot[0] for ident, slot in dict(self.counts).items()}
+
+
+class ProcessCounter(SharedCounter):
+    '''
+    A lock-free counter that can be incremented from many processes, via shared memory.
+    Each process claims its own slot (keyed by pid) on its first `add`, and only ever increments it.
+
+    The counter must be passed to workers when they are started, e.g.
+        `multiprocessing.Pool(initializer=pbar.init_worker, initargs=(bar.counter,))`
+    and then workers call `pbar.worker_update()`
+    '''
+
+    def __init__(self, max_workers: int = 64) -> None:
+        self.counts = multiprocessing.RawArray('q', max_workers)
+        self.pids = multiprocessing.RawArray('q', max_workers)
+        self.n_slots = multiprocessing.Value('i', 0)
+        self._pid, self._slot = -1, -1
+
+    def _claim_slot(self) -> int:
+        with self.n_slots.get_lock():
+            slot: int = self.n_slots.value
+            if slot >= len(self.counts):
+                raise ValueError(f'ProcessCounter has no free slots: {len(self.counts)}')
+            self.n_slots.value += 1
+        self.pids[slot] = os.getpid()
+        return slot
+
+    def add(self, n: int = 1) -> None:
+        if self._pid != os.getpid():  # first update in this process
+            self._slot, self._pid = self._claim_slot(), os.getpid()
+        self.counts[self._slot] += n
+
+    def per_worker(self) -> dict[int, int]:
+        n = self.n_slots.value
+        return dict(zip(self.pids[:n], self.counts[:n]))
+
+
+# the counter for a worker process, set by `init_worker`
+_worker_counter: SharedCounter | None = None
+
+
+def init_worker(counter: SharedCounter) -> None:
+    'Initialise a worker process to update the parent progress bar, e.g. as a Pool `initializer`.'
+    global _worker_counter
+    _worker_counter = counter
+
+
+def worker_update(n: int = 1) -> None:
+    'Update the parent progress bar by n steps, from a worker process started with `init_worker`.'
+    if _worker_counter is None:
+        raise RuntimeError('worker_update called in a process not initialised with init_worker')
+    _worker_counter.add(n)
+
+
 DEFAULT_C1, DEFAULT_C2 = RGBColour(240, 50, 0), RGBColour(10, 220, 0)
+# maximum number of repaints per second, see `PBar.update`
+DEFAULT_FPS = 30
+# characters for the partially filled cell at the end of the bar, in eighths of a cell
+EIGHTHS = ' ▏▎▍▌▋▊▉'
+# seconds between progress records in headless mode, see `PBar`
+DEFAULT_LOG_INTERVAL = 10.0
+# weight of the most recent sample in the smoothed rates, see `EWMA`
+DEFAULT_SMOOTHING = 0.3
+
+
+class EWMA:
+    '''
+    An exponentially weighted moving average of a rate (e.g. items per second).
+    Each sample is the rate since the previous sample, weighted by `alpha` against the average,
+    so that a bursty rate gives a stable ETA.
+    '''
+
+    def __init__(self, alpha: float = DEFAULT_SMOOTHING) -> None:
+        self.alpha = alpha
+        self.rate, self.n_samples = 0.0, 0
+        self._last_n, self._last_t = 0, 0.0
+
+    def reset(self, n: int, t: float) -> None:
+        self.rate, self.n_samples = 0.0, 0
+        self._last_n, self._last_t = n, t
+
+    def sample(self, n: int, t: float) -> float:
+        'Add a sample of the total count `n` at time `t`, and return the smoothed rate'
+        dt = t - self._last_t
+        if dt <= 0:
+            return self.rate
+        rate = (n - self._last_n) / dt
+        if self.n_samples == 0:
+            self.rate = rate
+        else:
+            self.rate = self.alpha * rate + (1 - self.alpha) * self.rate
+        self.n_samples += 1
+        self._last_n, self._last_t = n, t
+        return self.rate
+
+
+def _format_units(n: float, unit: str, base: int = 1000, prefixes: str = ' kMGTP') -> str:
+    'Format a number into a human-readable string, e.g. 12345.6 -> "12.3 kit"'
+    for prefix in prefixes:
+        if abs(n) < base:
+            break
+        n /= base
+    return f'{n:.1f} {prefix.strip()}{unit}'
+
+
+def _format_bytes(n: float) -> str:
+    'Format a number of bytes, using binary prefixes, e.g. 2048 -> "2.0 KiB"'
+    if n < 1024:
+        return _format_units(n, 'B', base=1024)
+    return _format_units(n, 'iB', base=1024, prefixes=' KMGTP')
+
+
+def _format_rate(rate: float, unit: str) -> str:
+    'Format a rate per second, e.g. 12345.6 -> "12.3 kit/s", or 2048 bytes -> "2.0 KiB/s"'
+    if unit == 'B':
+        return f'{_format_bytes(rate)}/s'
+    return f'{_format_units(rate, unit)}/s'
+
+
+_SignalHandler: TypeAlias = Callable[[int, types.FrameType | None], Any] | int | None
+
+
+def _set_signal_handlers(handlers: dict[int, _SignalHandler]) -> dict[int, _SignalHandler]:
+    '''
+    Set signal handlers, and return the previous handlers so that they can be restored.
+    Signal handlers can only be set from the main thread, so this does nothing in other threads.
+    '''
+    previous: dict[int, _SignalHandler] = {}
+    if threading.current_thread() is not threading.main_thread():
+        return previous
+    for signum, handler in handlers.items():
+        previous[signum] = signal.signal(signum, handler)
+    return previous
+
+
+def _reset_terminal() -> None:
+    w, h = _get_terminal_size()
+    _print_to_terminal(
+        '\x1b[?25h'  # show cursor
+        f'\x1b[0;{h}r'  # reset margins
+        f'\x1b[{h};0H'  # move to bottom line
+        '\n'
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _bar_cells(g: RGBGradient, depth: int) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    '''
+    The escape sequences to draw each cell of a bar with gradient `g` (plus one cell in the end
+    colour), as full cells, and as partial cells drawn in the gradient colour over the end colour.
+    Colours are downgraded to the colour depth, and with no colour support the bar is drawn with
+    block characters instead.
+    These are shared between bars with the same gradient, e.g. after a resize to a previous width.
+    '''
+    colours = (*g.sequence, g.end)
+    if depth == term.ColourDepth.NONE:
+        return (('█',) * len(colours), ('',) * len(colours))
+    empty = c.rgb_escape(*g.end, 'bg', depth)
+    return (
+        tuple(f'{c.rgb_escape(*colour, "bg", depth)} ' for colour in colours),
+        tuple(f'{empty}{c.rgb_escape(*colour, "fg", depth)}' for colour in colours),
+    )
+
+
+# The SGR parameters of each part of the info line, which are all in the 16 standard colours
+_INFO_SGR = {'label': '1', 'count': '1;32', 'pct': '1;97', 'elapsed': '92', 'eta': '93', 'reset': '0'}
+
+
+@functools.cache
+def _info_styles(depth: int) -> dict[str, str]:
+    'The escape sequences to style each part of the info line, which are empty with no colour support'
+    if depth == term.ColourDepth.NONE:
+        return dict.fromkeys(_INFO_SGR, '')
+    return {k: f'\x1b[{v}m' for k, v in _INFO_SGR.items()}
+
+
+def _clear_lines(start: int, end: int) -> str:
+    'Return the escape sequence to clear the terminal lines between start & end (inclusive).'
+    return ''.join(f'\x1b[{line};0H\x1b[2K' for line in range(max(start, 1), end + 1))
 
 
 class PBar:
-    def __init__(self, total: int, c1: RGBColour = DEFAULT_C1, c2: RGBColour = DEFAULT_C2):
+    def __init__(
+        self,
+        total: int | None,
+        c1: RGBColour = DEFAULT_C1,
+        c2: RGBColour = DEFAULT_C2,
+        fps: float = DEFAULT_FPS,
+        threaded: bool = False,
+        counter: SharedCounter | None = None,
+        worker_rates: bool = False,
+        label: str = '',
+        unit: str = 'it',
+        headless: bool | None = None,
+        log_interval: float = DEFAULT_LOG_INTERVAL,
+        logger: logging.Logger | None = None,
+    ):
+        '''
+        - `total` is the number of steps for the bar to be complete, if it is None the bar is
+          drawn as a spinner and only the count and rates are shown
+        - `c1` and `c2` are the start and end colours of the bar gradient
+        - `fps` is the maximum number of repaints per second (0 repaints on every update)
+        - `threaded` repaints from a background thread at `fps`, so that `update` only increments
+          a counter, and the bar keeps ticking while the worker is blocked
+        - `counter` is a shared counter for updates from many threads or processes (implies
+          `threaded`, as the bar is only ever drawn by this process)
+        - `worker_rates` shows the rate of updates per second for each worker in the info line
+        - `label` is printed at the start of the info line
+        - `unit` is the unit of each step, used for the rate. With 'B' (bytes), the counts & rate
+          are shown with binary prefixes, e.g. "1.5 MiB"
+        - `headless` logs progress records as JSON instead of drawing the bar, with no escape
+          sequences or signal handlers. By default, this is enabled when STDERR isn't a terminal
+        - `log_interval` is the number of seconds between progress records in headless mode
+        - `logger` is the logger for progress records, by default a JSON logger to STDERR
+        '''
         self.t = total
         self.w, self.h = _get_terminal_size()
         self.x_pos, self.i = 0, 0
+        self._eighths = 0  # eighths of the partially filled cell after x_pos
+        self.nbytes = 0
         self.start_time = time.time()
-
-        self.g = RGBGradient(start=c1, end=c2, steps=self.w)
-
-        signal.signal(signal.SIGINT, self.sigint_handler)
-        signal.signal(signal.SIGWINCH, self.sigwinch_handler)
+        self.rate, self.byte_rate = EWMA(), EWMA()
+        self._n_frames = 0
+        self.interval = 1 / fps if fps > 0 else 0.0
+        self._next_render = 0.0
+        self.label = label
+        self.label_width = 0  # the display width to pad the label to, to align it with other bars
+        self.unit = unit
+
+        # the bar line is `offset` lines above the bottom of the terminal, with the info line
+        # above it, and `reserved` lines are reserved at the bottom of the terminal.
+        # these are only changed when the bar is drawn as part of a `MultiPBar`
+        self.offset, self.reserved = 0, 2
+        self.parent: MultiPBar | None = None
+        self._last_info = ''
+
+        self.worker_rates = worker_rates
+        self.counter = counter
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._resized = False
+        if threaded and self.counter is None:
+            self.counter = ThreadCounter()
+        if self.counter is not None:
+            self.interval = self.interval or 1 / DEFAULT_FPS
+
+        self.headless = _is_headless() if headless is None else headless
+        self.logger = logger
+        if self.headless:
+            self.interval = log_interval
+
+        self.depth = term.env_colour_depth()
+        self.g = RGBGradient.get(c1, c2, self.w)
+        self._build_cells()
+        self._prev_handlers: dict[int, _SignalHandler] = {}
 
     def sigint_handler(self, _signum: int, _frame: types.FrameType | None) -> None:
-        self._reset_terminal()
+        _reset_terminal()
         sys.exit(0)
 
     def sigwinch_handler(self, _signum: int, _frame: types.FrameType | None) -> None:
-        self.handle_resize()
+        if self._thread is not None:
+            self._resized = True  # handled by the render thread, to avoid interleaving output
+        else:
+            self.handle_resize()
+
+    @property
+    def _bar_line(self) -> int:
+        return self.h - self.offset
+
+    @property
+    def _scroll_bottom(self) -> int:
+        'The last line of the scrollable area, above the reserved lines'
+        return self.h - self.reserved
+
+    def _resize(self, w: int, h: int) -> str:
+        'Resize the bar, and return the escape sequence to redraw it from scratch'
+        self.w, self.h = w, h
+        self.g = RGBGradient.get(self.g.start, self.g.end, self.w)
+        self._build_cells()
+        self.x_pos, self._eighths, self._last_info = 0, 0, ''
+        return self._initial_bar()
+
+    def _build_cells(self) -> None:
+        '''
+        Precompute the escape sequences to draw each cell of the bar, so that drawing a span
+        is just a slice & join. These only change with the gradient or width, i.e. on resize.
+        '''
+        self._cells, self._partial_cells = _bar_cells(self.g, self.depth)
 
     def handle_resize(self) -> None:
-        i, h = self.i, self.h
-        self.w, self.h = _get_terminal_size()
+        h = self.h
+        w, self.h = _get_terminal_size()
 
         _print_to_terminal(
-            f'\x1b[{h - 1};0H\x1b[2K'  # move to old info line & clear it
-            f'\x1b[{h};0H\x1b[2K'  # move to old bar line & clear it
-            f'\x1b[{self.h - 1};0H\x1b[2K'  # move to info line & clear it
-            f'\x1b[{self.h};0H\x1b[2K'  # move to bar line & clear it
-            f'\x1b[0;{self.h - 2}r'  # set scrolling region, reserve 2 lines at bottom
-            f'\x1b[{self.h - 2};0H'  # move cursor to last line of scrollable area
+            _clear_lines(h - self.reserved + 1, h)  # clear old reserved lines
+            + _clear_lines(self.h - self.reserved + 1, self.h)  # clear new reserved lines
+            + f'\x1b[0;{self._scroll_bottom}r'  # set scrolling region, reserve lines at bottom
+            + self._resize(w, self.h)
         )
-
-        self.g = RGBGradient(start=self.g.start, end=self.g.end, steps=self.w)
-        self._initial_bar()
-
-        self.i, self.x_pos = 0, 0
-
-        if i > 0:
-            self.update(i)
-        else:
-            self._print_info()
+        self.render()
 
     @staticmethod
     def randgrad() -> tuple[RGBColour, RGBColour]:
@@ -91,11 +418,17 @@ class PBar:
             RGBColour(randint(0, 255), randint(0, 255), randint(0, 255)),
         )
 
-    def _pbar_terminal_x_at(self, n: int) -> int:
-        'Where 0 <= n <= self.t, return the corresponding terminal position the progress bar.'
-
+    def _pbar_eighths_at(self, n: int) -> int:
+        '''
+        Where 0 <= n <= self.t, return the corresponding position of the end of the progress bar,
+        in eighths of a terminal cell.
+        '''
+        if self.t is None:
+            raise ValueError('a bar with no total has no position')
+        if self.t == 0:  # there is nothing to do, so the bar is complete
+            return self.w * 8
         if 0 <= n <= self.t:
-            return math.ceil((n / self.t) * self.w)
+            return (n * self.w * 8) // self.t
         else:
             raise ValueError(f'n must be between 0 and total {self.t}: {n}')
 
@@ -107,12 +440,19 @@ class PBar:
         for x in range(self.w):
             yield ((x, self.g.sequence[x]),)
 
-    def __iter__(self) -> PBar:
-        return self
+    def __iter__(self) -> Iterator[int]:
+        '''
+        Iterate over the steps of the bar, drawing it while iterating, e.g.
+            `for i in PBar(100): ...`
+        '''
+        with self:
+            for i in range(self.t) if self.t is not None else count():
+                yield i
+                self.update()
 
-    @staticmethod
-    def _true_colour(rgbColour: RGBColour) -> str:
-        return f'\x1b[48;2;{rgbColour.r};{rgbColour.g};{rgbColour.b}m'
+    def _colour(self, rgbColour: RGBColour) -> str:
+        'Return the escape sequence to set the background colour, at the colour depth of the bar'
+        return c.rgb_escape(*rgbColour, 'bg', self.depth)
 
     @staticmethod
     def _format_time(seconds: float) -> str:
@@ -129,79 +469,550 @@ class PBar:
             mins, secs = divmod(rem, 60)
             return f'{int(hours)}:{int(mins)}:{secs:05.2f}'
 
+    def _info(self) -> str:
+        'Return the escape sequence to print progress info in the line above the bar.'
+
+        now = time.time()
+        elapsed = now - self.start_time
+        rate = self.rate.sample(self.i, now)
+        st = _info_styles(self.depth)
+        reset = st['reset']
+        label = f'{st["label"]}{text.ljust(self.label, self.label_width)}{reset} ' if self.label else ''
+
+        if self.t is None:
+            item_info = f'{label}[{st["count"]}{self._format_count(self.i)}{reset}]'
+            time_info = f'{st["elapsed"]}+{self._format_time(elapsed)}{reset}'
+        else:
+            if rate > 0:
+                eta_str = self._format_time(max(self.t - self.i, 0) / rate)
+            else:
+                eta_str = '??:??'
+            pct = (self.i / self.t) * 100 if self.t else 100.0
+            i, t = self._format_count(self.i), self._format_count(self.t)
+            item_info = f'{label}[{st["count"]}{i}{reset}/{t}] {st["pct"]}{pct:.1f}%{reset}'
+            time_info = (
+                f'{st["elapsed"]}+{self._format_time(elapsed)}{reset} {st["eta"]}-{eta_str}{reset}'
+            )
+
+        if rate > 0:
+            time_info += f' {_format_rate(rate, self.unit)}'
+        if self.nbytes:
+            time_info += f' {_format_rate(self.byte_rate.sample(self.nbytes, now), "B")}'
+        worker_info = ''
+        if self.worker_rates and self.counter is not None and elapsed > 0:
+            # workers are numbered in the order of their first update
+            worker_info = ' | ' + ' '.join(
+                f'w{w}:{n / elapsed:,.1f}/s'
+                for w, n in enumerate(self.counter.per_worker().values())
+            )
+
+        # Clear the line and print info above the progress bar, truncated so that it doesn't wrap
+        return (
+            f'\x1b[{self._bar_line - 1};0H'  # move to line above bar
+            '\x1b[2K'  # clear entire line
+            + text.truncate(f'{item_info} | {time_info}{worker_info}', self.w)
+        )
+
+    def _progress(self) -> dict[str, Any]:
+        'Return the progress as a structured record, for headless mode'
+        now = time.time()
+        rate = self.rate.sample(self.i, now)
+        record: dict[str, Any] = {
+            'label':   self.label,
+            'n':       self.i,
+            'total':   self.t,
+            'unit':    self.unit,
+            'elapsed': round(now - self.start_time, 3),
+            'rate':    round(rate, 3),
+        }
+        if self.t is not None:
+            record['pct'] = round(self.i / self.t * 100, 1) if self.t else 100.0
+            record['eta'] = round(max(self.t - self.i, 0) / rate, 3) if rate > 0 else None
+        if self.nbytes:
+            record['bytes'] = self.nbytes
+            record['byte_rate'] = round(self.byte_rate.sample(self.nbytes, now), 3)
+        if self.worker_rates and self.counter is not None:
+            record['workers'] = list(self.counter.per_worker().values())
+        return record
+
+    def _log(self, msg: str = 'progress') -> None:
+        'Log a progress record, for headless mode'
+        if self.counter is not None:
+            self.i = self.counter.value
+        (self.logger or _progress_logger()).info(msg, self._progress())
+
+    def _format_count(self, n: int) -> str:
+        return _format_bytes(n) if self.unit == 'B' else str(n)
+
+    def _restore_cursor(self) -> str:
+        'Return the escape sequence to move the cursor to the last line of the scrollable area'
+        return f'\x1b[{self._scroll_bottom};0H'
+
     def _print_info(self) -> None:
         'Print progress info in the line above the bar.'
+        _print_to_terminal(self._info() + self._restore_cursor())
+
+    def _bar_span(self, start: int, end: int, colour: RGBColour | None = None) -> str:
+        '''
+        Return the escape sequence to draw the bar cells between positions start & end (inclusive),
+        in the gradient colour for each position, or in `colour` if given.
+        '''
+        start = max(start, 1)  # terminal columns start at 1
+        if end < start:
+            return ''
+        if colour is None:
+            cells = ''.join(self._cells[start : end + 1])
+        else:
+            cells = f'{self._colour(colour)}{" " * (end - start + 1)}'
+        return (
+            f'\x1b[{self._bar_line};{start}H'  # move to bar line
+            f'{cells}'  # the 'bar' characters
+            '\x1b[0m'  # reset color
+        )
+
+    def _initial_bar(self) -> str:
+        'Return the escape sequence to print the initial bar in end color'
+        return self._bar_span(0, self.w, self._pbar_colour_at(self.w))
 
-        elapsed = time.time() - self.start_time
+    def _frame(self) -> str:
+        '''
+        Return the escape sequence to draw only the bar cells and info that have changed
+        since the last frame.
+        '''
+        if self.counter is not None:
+            self.i = self.counter.value
 
-        if self.i == 0:
-            eta_str = '??:??'
+        if self.t is None:
+            frame = self._spinner()
         else:
-            eta_str = self._format_time((elapsed / self.i) * (self.t - self.i))
+            # cells up to x_pos (and the partial cell after it) were drawn by previous frames
+            full, eighths = divmod(self._pbar_eighths_at(min(self.i, self.t)), 8)
+            frame = self._bar_span(self.x_pos + 1, full)
+            if eighths and (full, eighths) != (self.x_pos, self._eighths):
+                frame += (
+                    f'\x1b[{self._bar_line};{full + 1}H'
+                    f'{self._partial_cells[full + 1]}{EIGHTHS[eighths]}'
+                    '\x1b[0m'
+                )
+            self.x_pos, self._eighths = full, eighths
+
+        info = self._info()
+        if info != self._last_info:
+            frame += info
+            self._last_info = info
+        return frame
+
+    def _spinner(self) -> str:
+        '''
+        Return the escape sequence to draw the bar for an unknown total,
+        as a segment of the gradient that bounces from side to side on each frame.
+        '''
+        seg = max(self.w // 8, 1)
+        span = max(self.w - seg, 1)
+        pos = self._n_frames % (2 * span)
+        if pos > span:
+            pos = 2 * span - pos
+        self._n_frames += 1
+
+        end = self._pbar_colour_at(self.w)
+        return (
+            self._bar_span(1, pos, end)
+            + self._bar_span(pos + 1, pos + seg)
+            + self._bar_span(pos + seg + 1, self.w, end)
+        )
 
-        pct = (self.i / self.t) * 100
-        item_info = f'[\x1b[1;32m{self.i}\x1b[0m/{self.t}] \x1b[1;97m{pct:.1f}%\x1b[0m'
-        time_info = f'\x1b[92m+{self._format_time(elapsed)}\x1b[0m \x1b[93m-{eta_str}\x1b[0m'
+    def render(self) -> None:
+        '''
+        Repaint the progress bar, writing all changed cells and the info line in a single write.
+        '''
+        if self.parent is not None:
+            self.parent.render()
+            return
+        self._next_render = time.monotonic() + self.interval
+        if self.headless:
+            self._log()
+        else:
+            _print_to_terminal(self._frame() + self._restore_cursor())
+
+    def update(self, n: int = 1, nbytes: int = 0) -> None:
+        '''
+        Update the progress bar by n steps, and optionally by a number of bytes processed.
+        This only increments the count, the bar is repainted at most once every `interval` seconds
+        (or by the render thread, when `threaded`)
+
+        note: `nbytes` is not counted when using a shared counter
+        '''
+        if self.counter is not None:
+            self.counter.add(n)
+            return
+        self.i += n
+        self.nbytes += nbytes
+        if time.monotonic() >= self._next_render:
+            self.render()
+
+    def __enter__(self) -> Self:
+        self.start_time = time.time()
+        self.rate.reset(self.i, self.start_time)
+        self.byte_rate.reset(self.nbytes, self.start_time)
+        if not self.headless:
+            self._prev_handlers = _set_signal_handlers({
+                signal.SIGINT: self.sigint_handler,
+                signal.SIGWINCH: self.sigwinch_handler,
+            })
+            _print_to_terminal(
+                '\x1b[?25l'  # hide cursor
+                + '\n' * self.reserved  # ensure space for info line and progress bar
+                + f'\x1b[0;{self._scroll_bottom}r'  # set top & bottom margins
+                + self._initial_bar()
+            )
+        self.render()
+        if self.counter is not None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._render_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def _render_loop(self) -> None:
+        'Repaint the bar every `interval` seconds, until stopped'
+        while not self._stop.wait(self.interval):
+            if self._resized:
+                self._resized = False
+                self.handle_resize()
+            else:
+                self.render()
+
+    def _stop_thread(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        self._stop_thread()
+        if self.headless:
+            self._log('done')
+            return
+        self.render()  # draw the final state, which may not have been drawn yet
+        _reset_terminal()
+        _set_signal_handlers(self._prev_handlers)
+
+
+class MultiPBar:
+    '''
+    Several progress bars, each with its own total, gradient & ETA, drawn together in a region of
+    2 lines per bar, reserved at the bottom of the terminal.
+
+    usage:
+        with MultiPBar([100, 1000], labels=['download', 'parse']) as (download, parse):
+            download.update()
+            parse.update(10)
+    '''
+
+    def __init__(
+        self,
+        totals: list[int],
+        colours: list[tuple[RGBColour, RGBColour]] | None = None,
+        labels: list[str] | None = None,
+        fps: float = DEFAULT_FPS,
+        headless: bool | None = None,
+        log_interval: float = DEFAULT_LOG_INTERVAL,
+    ):
+        '''
+        - `totals` is the total number of steps for each bar
+        - `colours` is the start & end colour of the gradient for each bar
+        - `labels` is printed at the start of the info line for each bar
+        - `fps` is the maximum number of repaints per second, shared between all bars
+        - `headless` & `log_interval` log progress records for each bar, see `PBar`
+        '''
+        if headless is None:
+            headless = _is_headless()
+        if colours is None:
+            colours = [(DEFAULT_C1, DEFAULT_C2)] * len(totals)
+        if labels is None:
+            labels = [''] * len(totals)
+
+        self.bars = [
+            PBar(total, c1, c2, fps=fps, label=label, headless=headless, log_interval=log_interval)
+            for total, (c1, c2), label in zip(totals, colours, labels, strict=True)
+        ]
+        self.w, self.h = _get_terminal_size()
+        self.reserved = 2 * len(self.bars)
+        label_width = max((text.width(label) for label in labels), default=0)
+        for n, bar in enumerate(self.bars):
+            bar.offset = 2 * (len(self.bars) - 1 - n)
+            bar.reserved, bar.parent = self.reserved, self
+            bar.label_width = label_width
+        self.headless = headless
+        self.interval = self.bars[0].interval if self.bars else 0.0
+        self._prev_handlers: dict[int, _SignalHandler] = {}
+
+    def __getitem__(self, n: int) -> PBar:
+        return self.bars[n]
+
+    def __iter__(self) -> Iterator[PBar]:
+        return iter(self.bars)
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def sigint_handler(self, _signum: int, _frame: types.FrameType | None) -> None:
+        _reset_terminal()
+        sys.exit(0)
+
+    def sigwinch_handler(self, _signum: int, _frame: types.FrameType | None) -> None:
+        self.handle_resize()
+
+    def handle_resize(self) -> None:
+        h = self.h
+        self.w, self.h = _get_terminal_size()
 
-        # Clear the line and print info above the progress bar
         _print_to_terminal(
-            f'\x1b[{self.h - 1};0H'  # move to line above bar
-            '\x1b[2K'  # clear entire line
-            f'{item_info} | {time_info}'
-            f'\x1b[{self.h - 2};0H'  # mo`ve cursor to last line of scrollable area
+            _clear_lines(h - self.reserved + 1, h)  # clear old reserved lines
+            + _clear_lines(self.h - self.reserved + 1, self.h)  # clear new reserved lines
+            + f'\x1b[0;{self.h - self.reserved}r'  # set scrolling region, reserve lines at bottom
+            + ''.join(bar._resize(self.w, self.h) for bar in self.bars)
         )
-
-    def _print_bar_char(self, s: str, colour: RGBColour, x_pos: int) -> None:
+        self.render()
+
+    def render(self) -> None:
+        'Repaint the changed cells & info lines of every bar, in a single write.'
+        next_render = time.monotonic() + self.interval
+        for bar in self.bars:
+            bar._next_render = next_render
+        if self.headless:
+            for bar in self.bars:
+                bar._log()
+            return
         _print_to_terminal(
-            f'\x1b[{self.h};{x_pos}H'  # move to bottom line
-            f'\x1b[48;2;{colour.r};{colour.g};{colour.b}m'
-            f'{s}'  # the 'bar' characters
-            '\x1b[0m'  # reset color
-            f'\x1b[{self.h - 2};0H'  # move cursor to last line of scrollable area
+            ''.join(bar._frame() for bar in self.bars) + self.bars[-1]._restore_cursor()
         )
 
-    def _initial_bar(self) -> None:
-        'print initial bar in end color'
+    def __enter__(self) -> Self:
+        start_time = time.time()
+        for bar in self.bars:
+            bar.start_time = start_time
+            bar.rate.reset(bar.i, start_time)
+            bar.byte_rate.reset(bar.nbytes, start_time)
+        if not self.headless:
+            self._prev_handlers = _set_signal_handlers({
+                signal.SIGINT: self.sigint_handler,
+                signal.SIGWINCH: self.sigwinch_handler,
+            })
+            _print_to_terminal(
+                '\x1b[?25l'  # hide cursor
+                + '\n' * self.reserved  # ensure space for all info lines and progress bars
+                + f'\x1b[0;{self.h - self.reserved}r'  # set top & bottom margins
+                + ''.join(bar._initial_bar() for bar in self.bars)
+            )
+        self.render()
+        return self
 
-        for x_pos in range(self.w + 1):
-            self._print_bar_char(' ', self._pbar_colour_at(self.w), x_pos)
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        if self.headless:
+            for bar in self.bars:
+                bar._log('done')
+            return
+        self.render()  # draw the final state, which may not have been drawn yet
+        _reset_terminal()
+        _set_signal_handlers(self._prev_handlers)
 
-    def update(self, n: int) -> None:
-        'update the progress bar by n steps'
 
-        target_pos = self._pbar_terminal_x_at(self.i + n)
+T = TypeVar('T')
 
-        for pos in range(self.x_pos, target_pos + 1):
-            self._print_bar_char(' ', self._pbar_colour_at(pos), pos)
 
-        self.i += n
-        self.x_pos = target_pos
+def _nbytes(item: object) -> int:
+    'Return the size of a bytes-like item, or 0 for anything else'
+    if isinstance(item, (bytes, bytearray)):
+        return len(item)
+    if isinstance(item, memoryview):
+        return item.nbytes
+    return 0
 
-        self._print_info()
 
-    def __enter__(self) -> PBar:
-        self.start_time = time.time()
-        _print_to_terminal(
-            '\x1b[?25l'  # hide cursor
-            '\n\n'  # ensure space for info line and progress bar
-            f'\x1b[0;{self.h - 2}r'  # set top & bottom margins
-        )
-        self._initial_bar()
-        self._print_info()
+def _total(iterable: Iterable | AsyncIterable, total: int | None) -> int | None:
+    if total is None and isinstance(iterable, Sized):
+        return len(iterable)
+    return total
+
+
+def track(iterable: Iterable[T], total: int | None = None, **kwargs: Any) -> Iterator[T]:
+    '''
+    Iterate over an iterable, drawing a progress bar with smoothed rates and ETA.
+    - `total` defaults to the length of the iterable, if it has one, otherwise the bar is drawn
+      as a spinner
+    - bytes-like items are also counted in bytes per second
+    - other `kwargs` are passed to `PBar`
+    '''
+    with PBar(_total(iterable, total), **kwargs) as bar:
+        for item in iterable:
+            yield item
+            bar.update(1, _nbytes(item))
+
+
+async def atrack(
+    aiterable: AsyncIterable[T], total: int | None = None, **kwargs: Any
+) -> AsyncIterator[T]:
+    'Iterate over an async iterable, drawing a progress bar, see `track`'
+    with PBar(_total(aiterable, total), **kwargs) as bar:
+        async for item in aiterable:
+            yield item
+            bar.update(1, _nbytes(item))
+
+
+# the default buffer size for `copy`, and the largest chunk for each update of the bar
+COPY_BUFSIZE = 1024 * 1024
+
+
+def _file_size(fileobj: IO) -> int | None:
+    'Return the number of bytes left to read in a regular file, or None if unknown'
+    try:
+        st = os.fstat(fileobj.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return max(st.st_size - fileobj.tell(), 0)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class ProgressFile:
+    '''
+    A file object wrapper that updates a progress bar with the number of bytes read or written.
+    All other attributes are passed through to the wrapped file object.
+    '''
+
+    def __init__(self, fileobj: IO, bar: PBar) -> None:
+        self.fileobj = fileobj
+        self.bar = bar
+
+    def read(self, size: int = -1) -> Any:
+        data = self.fileobj.read(size)
+        self.bar.update(len(data))
+        return data
+
+    def read1(self, size: int = -1) -> Any:
+        data = self.fileobj.read1(size)  # type: ignore[attr-defined]
+        self.bar.update(len(data))
+        return data
+
+    def readinto(self, b: bytearray | memoryview) -> int:
+        n: int = self.fileobj.readinto(b)  # type: ignore[attr-defined]
+        if n:
+            self.bar.update(n)
+        return n
+
+    def readline(self, size: int = -1) -> Any:
+        line = self.fileobj.readline(size)
+        self.bar.update(len(line))
+        return line
+
+    def write(self, b: Any) -> int:
+        n = self.fileobj.write(b)
+        self.bar.update(n)
+        return n
+
+    def __iter__(self) -> Iterator[Any]:
+        for line in self.fileobj:
+            self.bar.update(len(line))
+            yield line
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.fileobj, name)
+
+    def __enter__(self) -> Self:
+        self.bar.__enter__()
         return self
 
-    @staticmethod
-    def _reset_terminal() -> None:
-        w, h = _get_terminal_size()
-        _print_to_terminal(
-            '\x1b[?25h'  # show cursor
-            f'\x1b[0;{h}r'  # reset margins
-            f'\x1b[{h};0H'  # move to bottom line
-            '\n'
-        )
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        self.bar.__exit__(exc_type, exc, tb)
+        self.fileobj.close()
 
-    def __exit__(self, _exc_type: type, _exc_val: BaseException, _exc_tb: type) -> None:
-        self._reset_terminal()
+
+def wrap_file(fileobj: IO, total_bytes: int | None = None, **kwargs: Any) -> ProgressFile:
+    '''
+    Wrap a file object to draw a progress bar of the bytes read from (or written to) it, e.g.
+        `with pbar.wrap_file(open('big.tar', 'rb')) as f: tarfile.open(fileobj=f)`
+    - `total_bytes` defaults to the bytes left to read in a regular file
+    - other `kwargs` are passed to `PBar`
+    '''
+    if total_bytes is None:
+        total_bytes = _file_size(fileobj)
+    return ProgressFile(fileobj, PBar(total_bytes, unit='B', **kwargs))
+
+
+def _sendfile(src: IO, dst: IO, bar: PBar, bufsize: int) -> int:
+    '''
+    Copy from src to dst with `os.sendfile`, so that the data is never copied into userspace.
+    Returns the number of bytes copied, or raises OSError if sendfile isn't possible.
+    '''
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    if not (stat.S_ISREG(os.fstat(src_fd).st_mode) and stat.S_ISREG(os.fstat(dst_fd).st_mode)):
+        raise OSError('sendfile requires regular files')
+
+    # bypass any buffering of the file objects, and restore their positions afterwards
+    dst.flush()
+    offset, dst_pos = src.tell(), dst.tell()
+    os.lseek(dst_fd, dst_pos, os.SEEK_SET)
+    copied = 0
+    while n := os.sendfile(dst_fd, src_fd, offset + copied, bufsize):
+        copied += n
+        bar.update(n)
+    src.seek(offset + copied)
+    dst.seek(dst_pos + copied)
+    return copied
+
+
+def copy(
+    src: IO, dst: IO, bufsize: int = COPY_BUFSIZE, total: int | None = None, **kwargs: Any
+) -> int:
+    '''
+    Copy all bytes from src to dst, drawing a progress bar, and return the number of bytes copied.
+    - when both are regular files, `os.sendfile` is used to copy in the kernel
+    - otherwise, data is read into a single reusable buffer with `readinto`, and written from
+      a memoryview of it, so that it is never copied
+    - `total` defaults to the bytes left to read in src, if it is a regular file
+    - other `kwargs` are passed to `PBar`
+    '''
+    if total is None:
+        total = _file_size(src)
+
+    with PBar(total, unit='B', **kwargs) as bar:
+        if hasattr(os, 'sendfile'):
+            try:
+                return _sendfile(src, dst, bar, bufsize)
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                if bar.i:  # the copy failed partway, so it can't be retried
+                    raise
+
+        copied = 0
+        readinto = getattr(src, 'readinto', None)
+        if readinto is None:
+            while data := src.read(bufsize):
+                dst.write(data)
+                copied += len(data)
+                bar.update(len(data))
+            return copied
+
+        view = memoryview(bytearray(bufsize))
+        while n := readinto(view):
+            dst.write(view[:n])
+            copied += n
+            bar.update(n)
+        return copied
 
 
 if __name__ == '__main__':
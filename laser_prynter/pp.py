@@ -1,16 +1,30 @@
-from dataclasses import asdict, is_dataclass
+import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import contextlib
+from dataclasses import asdict, fields, is_dataclass
 from datetime import datetime
+import functools
+import io
 import json
+import mmap
+import os
 import random
+import re
+import stat
 import sys
 from types import FunctionType
-from typing import cast, Any, Iterator, NamedTuple, TextIO
+from typing import cast, Any, BinaryIO, Iterator, NamedTuple, TextIO
 
 from pygments import highlight, console
+from pygments.token import Token, _TokenType
+from pygments.formatter import Formatter
+from pygments.formatters import Terminal256Formatter, TerminalFormatter, TerminalTrueColorFormatter
 from pygments.lexers import JsonLexer
-from pygments.formatters import Terminal256Formatter
 from pygments.styles import get_style_by_name
 
+from laser_prynter import term
+
 STYLES = (
     'dracula', 'fruity', 'gruvbox-dark', 'gruvbox-light', 'lightbulb', 'material', 'native',
     'one-dark', 'perldoc', 'tango',
@@ -35,18 +49,18 @@ def _normalise_keys(d: dict) -> Iterator[tuple[str, Any]]:
     'norlimalise dict keys for JSON by stringifying'
     for k,v in d.items():
         if not isinstance(k, str):
-            yield str(k), _normalise(v)
+            yield str(k), _normalise_tree(v)
         else:
-            yield k, _normalise(v)
+            yield k, _normalise_tree(v)
 
-def _normalise(obj: object) -> Any:
-    'step through obj and normalise namedtuples to dicts'
+def _normalise_tree(obj: object) -> Any:
+    'step through obj and normalise namedtuples to dicts, see `_normalise`'
     if isinstance(obj, dict):
         return dict(_normalise_keys(obj))
     if isinstance(obj, list):
-        return [_normalise(i) for i in obj]
+        return [_normalise_tree(i) for i in obj]
     if _isnamedtuple(obj):
-        return cast(NamedTuple, obj)._asdict()
+        return dict(_normalise_keys(cast(NamedTuple, obj)._asdict()))
     return obj
 
 # ruff: disable[E701]
@@ -63,15 +77,196 @@ def _json_default(obj: object) -> Any:
     elif hasattr(obj, '__dict__'):      return obj.__dict__ # class
     return str(obj)
 
-def ppd(d_obj: Any, indent: int|None=2, style: str|None='dracula', random_style: bool=False, **kwargs: Any) -> None:
-    'pretty-print a dict'
-    d = _normalise(d_obj) # convert any namedtuples to dicts
+def _children(obj: object) -> dict|list|None:
+    'get the (shallow) children of a container that can be diffed, as a dict or list'
+    if isinstance(obj, dict):
+        return obj
+    if _isnamedtuple(obj):
+        return cast(NamedTuple, obj)._asdict()
+    if isinstance(obj, (list, tuple)):
+        return cast(list, obj)
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    return None
+
+class Limits(NamedTuple):
+    '''
+    limits on the size of a printed (or logged) object, which bound the cost of printing anything.
+    These are enforced while walking the object, and elided content is replaced with markers
+    - `max_depth` is the number of levels of nested containers, e.g. "… 5 items"
+    - `max_items` is the number of items of each container, e.g. "… 12,345 more items"
+    - `max_str_len` is the number of characters of each string, e.g. "abc… 1,000 more chars"
+    - `max_bytes` is the approximate size of the output as compact JSON (including the markers,
+      which are never truncated)
+    '''
+    max_depth:   int|None = None
+    max_items:   int|None = None
+    max_str_len: int|None = None
+    max_bytes:   int|None = None
+
+def _n_items(n: int, more: str='') -> str:
+    return f'{n:,d} {more}item{"" if n == 1 else "s"}'
+
+class _Encoder:
+    '''
+    convert an object to a JSON-ready copy, in a single walk that tracks the containers it's in:
+    - a cycle is replaced with a JSON reference to the container it loops back to, e.g. {"$ref": "#/a/b"}
+    - with `share`, an object that appears more than once (e.g. shared by many other objects) is only
+      converted once when there are no limits (as with limits, the output depends on where it appears).
+      The copies then share their converted parts, so this is only for copies that aren't changed,
+      e.g. that are serialised straight away
+    - the limits are enforced while walking (see `Limits`)
+    '''
+
+    def __init__(self, limits: Limits, share: bool=False) -> None:
+        self.limits = limits
+        self.budget = sys.maxsize if limits.max_bytes is None else limits.max_bytes
+        self.path: list[str|int] = []       # the keys/indexes from the root to the current object
+        self.ancestors: dict[int, int] = {} # the depth of each container that the current object is in
+        self.unlimited = limits == Limits()
+        self.memo: dict[int, tuple[object, Any]]|None = {} if share and self.unlimited else None
+
+    def leaf(self, obj: Any) -> Any:
+        'truncate a string to the limits, and take the (approximate) size of a value from the byte budget'
+        if isinstance(obj, str):
+            n = len(obj) if self.limits.max_str_len is None else self.limits.max_str_len
+            n = min(n, max(self.budget - 2, 0))
+            if len(obj) > n:
+                obj = f'{obj[:n]}… {len(obj) - n:,d} more chars'
+            self.budget -= len(obj) + 2
+        else:
+            self.budget -= len(str(obj))
+        return obj
+
+    def marker(self, marker: str) -> str:
+        'take the size of a marker for elided content from the byte budget, without truncating it'
+        self.budget -= len(marker) + 2
+        return marker
+
+    def ref(self, depth: int) -> dict[str, str]:
+        'a JSON reference (with a JSON pointer) to the container at a depth of the current path'
+        return {'$ref': '/'.join(['#', *(str(k).replace('~', '~0').replace('/', '~1') for k in self.path[:depth])])}
+
+    def encode(self, obj: Any, depth: int=0) -> Any:
+        if obj is None or isinstance(obj, (str, bool, int, float)):
+            return obj if self.unlimited else self.leaf(obj)
+        key = id(obj)
+        if key in self.ancestors:
+            return self.ref(self.ancestors[key])
+        if self.memo is not None and key in self.memo:
+            return self.memo[key][1]
+
+        children = _children(obj)
+        if children is None:
+            converted = _json_default(obj)
+            if not isinstance(converted, (dict, list)):
+                return self.leaf(converted)
+            children = converted
+        n = len(children)
+        if self.limits.max_depth is not None and depth >= self.limits.max_depth:
+            return self.marker(f'… {_n_items(n)}')
+        max_items = n if self.limits.max_items is None else self.limits.max_items
+
+        self.ancestors[key] = depth
+        self.budget -= 2 # brackets
+        encoded: dict|list
+        if isinstance(children, dict):
+            encoded = {}
+            for i, (k, v) in enumerate(children.items()):
+                if i >= max_items or self.budget <= 0:
+                    encoded['…'] = self.marker(_n_items(n - i, 'more '))
+                    break
+                k = k if isinstance(k, str) else str(k)
+                self.budget -= len(k) + 6 # quotes, colon & separator
+                self.path.append(k)
+                encoded[k] = self.encode(v, depth + 1)
+                self.path.pop()
+        else:
+            encoded = []
+            for i, v in enumerate(children):
+                if i >= max_items or self.budget <= 0:
+                    encoded.append(self.marker(f'… {_n_items(n - i, "more ")}'))
+                    break
+                self.budget -= 2 # separator
+                self.path.append(i)
+                encoded.append(self.encode(v, depth + 1))
+                self.path.pop()
+        del self.ancestors[key]
+
+        if self.memo is not None:
+            self.memo[key] = (obj, encoded) # keep obj, so that its id isn't reused by another object
+        return encoded
+
+def truncate(obj: Any, limits: Limits, share: bool=False) -> Any:
+    '''
+    get a JSON-ready copy of an object within the limits (see `Limits`),
+    which only walks & converts the parts of the object that will be printed.
+    `share` converts repeated objects only once, sharing the result within the copy (see `_Encoder`)
+    '''
+    return _Encoder(limits, share).encode(obj)
+
+def _is_circular(e: Exception) -> bool:
+    'whether an error from walking (or `json.dumps`-ing) an object was caused by a cycle in it'
+    return isinstance(e, RecursionError) or 'Circular reference' in str(e)
+
+def _normalise(obj: object) -> Any:
+    '''
+    step through obj and normalise namedtuples to dicts.
+    Objects with cycles (which the plain walk recurses into forever) are re-walked with `_Encoder`
+    '''
+    try:
+        return _normalise_tree(obj)
+    except RecursionError:
+        return _Encoder(Limits()).encode(obj)
+
+def _dumps(obj: Any, **kwargs: Any) -> str:
+    '''
+    serialise an object as JSON, with no limits. Plain `json.dumps` is tried first, and only objects
+    with cycles are re-run through `_Encoder`, which replaces each cycle with a reference
+    '''
+    try:
+        return json.dumps(_normalise_tree(obj), default=_json_default, **kwargs)
+    except (ValueError, RecursionError) as e:
+        if not _is_circular(e):
+            raise
+    # the copy is only serialised, so repeated objects can share their conversion
+    return json.dumps(truncate(obj, Limits(), share=True), **kwargs)
+
+@functools.cache
+def _formatter(style: str, depth: int) -> Formatter:
+    'get a (cached) formatter for a style, at a colour depth from `term.ColourDepth`'
+    if depth >= term.ColourDepth.TRUECOLOUR:
+        return TerminalTrueColorFormatter(style=get_style_by_name(style))
+    if depth >= term.ColourDepth.ANSI256:
+        return Terminal256Formatter(style=get_style_by_name(style))
+    return TerminalFormatter() # the 16 standard colours, which the terminal theme defines
+
+def ppd(
+    d_obj: Any,
+    indent: int|None=2,
+    style: str|None='dracula',
+    random_style: bool=False,
+    max_depth: int|None=None,
+    max_items: int|None=None,
+    max_str_len: int|None=None,
+    max_bytes: int|None=None,
+    **kwargs: Any,
+) -> None:
+    '''
+    pretty-print a dict.
+    The `max_*` options limit the size of the output, and the cost of printing it (see `Limits`)
+    '''
+    limits = Limits(max_depth, max_items, max_str_len, max_bytes)
+    if limits == Limits():
+        code = _dumps(d_obj, indent=indent, ensure_ascii=False)
+    else:
+        code = json.dumps(truncate(d_obj, limits), indent=indent, ensure_ascii=False)
 
-    if _output_is_redirected(cast(TextIO, kwargs.get('file', sys.stdout))):
+    depth = term.colour_depth(cast(TextIO, kwargs.get('file', sys.stdout)))
+    if depth == term.ColourDepth.NONE:
         style = None
     elif random_style:
         style = random.choice(STYLES)
-    code = json.dumps(d, indent=indent, default=_json_default)
 
     if style is None:
         _print(code, **kwargs)
@@ -80,17 +275,80 @@ def ppd(d_obj: Any, indent: int|None=2, style: str|None='dracula', random_style:
             highlight(
                 code      = code,
                 lexer     = JsonLexer(),
-                formatter = Terminal256Formatter(style=get_style_by_name(style))
+                formatter = _formatter(style, depth)
             ).strip(),
             **kwargs,
         )
 
+# JSON tokens, with the same token types as pygments' JsonLexer (keys are strings followed by a colon),
+# with the most common tokens first
+_JSON_TOKENS = re.compile(r'''
+    (?P<punctuation>[{}\[\],:]+)
+    |(?P<whitespace>[^\S\n]+)
+    |(?P<key>"[^"\\\n]*(?:\\.[^"\\\n]*)*"(?=\s*:))
+    |(?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*")
+    |(?P<float>-?\d+(?:\.\d+(?:[eE][+-]?\d+)?|[eE][+-]?\d+))
+    |(?P<integer>-?\d+)
+    |(?P<constant>true|false|null)
+''', re.VERBOSE)
+_JSON_TOKEN_TYPES: dict[str, _TokenType] = {
+    'key':         Token.Name.Tag,
+    'string':      Token.Literal.String.Double,
+    'float':       Token.Literal.Number.Float,
+    'integer':     Token.Literal.Number.Integer,
+    'constant':    Token.Keyword.Constant,
+    'punctuation': Token.Punctuation,
+    'whitespace':  Token.Text.Whitespace,
+}
+
+@functools.cache
+def _json_escapes(style: str, depth: int) -> dict[str, tuple[str, str]]:
+    '''
+    get the (cached) escape sequences before & after each type of JSON token,
+    as the formatter for the style would write them
+    '''
+    escapes = {}
+    for group, ttype in _JSON_TOKEN_TYPES.items():
+        s = io.StringIO()
+        _formatter(style, depth).format([(ttype, '\x00')], s)
+        before, _, after = s.getvalue().partition('\x00')
+        escapes[group] = (before, after)
+    return escapes
+
+def pj(j: str, style: str=DEFAULT_STYLE, depth: int|None=None) -> str:
+    '''
+    add colour to a JSON string as-is, without parsing & re-encoding it (which is 2-3x faster than
+    highlighting with pygments). The string isn't validated, so anything that looks like a JSON token
+    is coloured wherever it is (strings never span lines, so an unterminated quote stops at the line end)
+    '''
+    if depth is None:
+        depth = term.env_colour_depth()
+    if depth == term.ColourDepth.NONE:
+        return j
+    escapes = _json_escapes(style, depth)
+
+    def _colour(m: re.Match[str]) -> str:
+        before, after = escapes[cast(str, m.lastgroup)]
+        return before + m.group() + after
+
+    return _JSON_TOKENS.sub(_colour, j)
+
 def ppj(j: str, indent: int|None=None, style: str='dracula', random_style: bool=False, **kwargs: Any) -> None:
-    'pretty-print a JSON string'
-    ppd(_normalise(json.loads(j)), indent=indent, style=style, random_style=random_style)
+    '''
+    pretty-print a JSON string.
+    When it isn't re-indented, the string is coloured as-is (see `pj`), rather than being parsed
+    '''
+    if indent is not None:
+        ppd(json.loads(j), indent=indent, style=style, random_style=random_style, **kwargs)
+        return
+    if random_style:
+        style = random.choice(STYLES)
+    _print(pj(j.strip(), style, term.colour_depth(cast(TextIO, kwargs.get('file', sys.stdout)))), **kwargs)
 
 def ps(s: str, style: str='yellow', random_style: bool=False) -> str|Any:
-    'add color to a string'
+    'add color to a string, unless colour is disabled (e.g. by `NO_COLOR`)'
+    if term.env_colour_depth() == term.ColourDepth.NONE:
+        return s
     if random_style:
         style = random.choice(console.dark_colors + console.light_colors)
     return console.colorize(style, s)
@@ -99,9 +357,221 @@ def pps(s: str, style: str='yellow', random_style: bool=False) -> None:
     'pretty-print a string'
     _print(ps(s, style=style, random_style=random_style))
 
+class Change(NamedTuple):
+    'a difference between 2 objects, at a path of keys & indexes'
+    op:   str # '+' (added), '-' (removed) or '~' (changed)
+    path: tuple
+    old:  Any
+    new:  Any
+
+def _same(a: Any, b: Any) -> bool:
+    'whether 2 objects are equal, or too deeply nested (e.g. with cycles) to tell without walking them'
+    try:
+        return a is b or a == b
+    except RecursionError:
+        return False
+
+def _diff(old: Any, new: Any, path: tuple, seen: set[tuple[int, int]]) -> Iterator[Change]:
+    if old is new:
+        return
+    a, b = _children(old), _children(new)
+    if a is None or b is None or type(a) is not type(b):
+        if type(old) is not type(new) or old != new:
+            yield Change('~', path, old, new)
+        return
+    pair = (id(old), id(new))
+    if pair in seen:
+        return # a cycle in both objects, which is already being compared
+    seen.add(pair)
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k, v in a.items():
+            if k not in b:
+                yield Change('-', path + (k,), v, None)
+            elif type(v) is not type(b[k]) or not _same(v, b[k]):
+                yield from _diff(v, b[k], path + (k,), seen)
+        for k, v in b.items():
+            if k not in a:
+                yield Change('+', path + (k,), None, v)
+    elif isinstance(a, list) and isinstance(b, list):
+        start, end = 0, 0
+        n = min(len(a), len(b))
+        while start < n and _same(a[start], b[start]):
+            start += 1
+        while end < n - start and _same(a[-1 - end], b[-1 - end]):
+            end += 1
+        changed = min(len(a), len(b)) - start - end
+        for i in range(start, start + changed):
+            yield from _diff(a[i], b[i], path + (i,), seen)
+        for i in range(start + changed, len(a) - end):
+            yield Change('-', path + (i,), a[i], None)
+        for i in range(start + changed, len(b) - end):
+            yield Change('+', path + (i,), None, b[i])
+    elif not _same(old, new):
+        # other containers (i.e. tuples) are compared as a whole, as before
+        yield Change('~', path, old, new)
+    seen.discard(pair)
+
+def diff(old: Any, new: Any, path: tuple=()) -> Iterator[Change]:
+    '''
+    find the differences between 2 objects, descending into dicts, lists, namedtuples & dataclasses.
+    Unchanged subtrees (the same object, or equal values of the same type) are skipped with a single
+    equality check rather than being walked, so only the paths to the changes are walked in python,
+    and lists are compared after skipping their common start & end.
+    Objects with cycles are safe to compare, as each pair of containers is only walked once per path
+    '''
+    return _diff(old, new, path, set())
+
+def _format_path(path: tuple) -> str:
+    'format a path of keys & indexes like a jq path, e.g. .a.b[0]["c d"]'
+    return ''.join(
+        f'[{k}]' if isinstance(k, int) else f'.{k}' if str(k).isidentifier() else f'[{json.dumps(str(k), ensure_ascii=False)}]'
+        for k in path
+    ) or '.'
+
+_DIFF_COLOURS = {'+': 'green', '-': 'red', '~': 'yellow'}
+
+def ppdiff(old: Any, new: Any, style: str|None='dracula', **kwargs: Any) -> None:
+    '''
+    pretty-print the differences between 2 objects (see `diff`), one per line with its path, e.g.
+        ~ .a.b: 1 → 2
+        + .c[3]: {"d": 4}
+    only the changed values are serialised & coloured
+    '''
+    depth = term.colour_depth(cast(TextIO, kwargs.get('file', sys.stdout)))
+    if style is None:
+        depth = term.ColourDepth.NONE
+
+    def _value(obj: Any) -> str:
+        return pj(_dumps(obj, ensure_ascii=False), cast(str, style), depth)
+
+    lines = []
+    for change in diff(old, new):
+        op, path = change.op, _format_path(change.path)
+        if depth != term.ColourDepth.NONE:
+            op, path = console.colorize(_DIFF_COLOURS[op], op), console.colorize('bold', path)
+        if change.op == '~':
+            lines.append(f'{op} {path}: {_value(change.old)} → {_value(change.new)}')
+        else:
+            lines.append(f'{op} {path}: {_value(change.new if change.op == "+" else change.old)}')
+    if lines:
+        _print('\n'.join(lines), **kwargs)
+
 def demo(**kwargs: Any) -> None:
     'demonstrate pretty-printing colours'
 
     for s in STYLES:
         ppd({'message': {'Hello': 'World', 'The answer is': 42}, 'style': s}, style=s, indent=None, **kwargs)
 
+
+def _colourise_lines(data: bytes, style: str, depth: int, indent: int|None) -> str:
+    '''
+    colourise a chunk of JSON lines (each line is re-indented if `indent` is set).
+    Lines that aren't valid JSON (e.g. other output mixed in with logs) are left as-is
+    '''
+    text = data.decode(errors='replace')
+    if text and not text.endswith('\n'):
+        text += '\n'
+    out = []
+    for line in io.StringIO(text): # lines are only split at \n, as in JSON lines
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            out.append(line)
+            continue
+        if indent is not None:
+            line = json.dumps(obj, indent=indent, ensure_ascii=False) + '\n'
+        out.append(pj(line, style, depth))
+    return ''.join(out)
+
+def _is_regular_file(f: BinaryIO) -> bool:
+    'detect if a stream is a regular file (that can be memory-mapped), rather than e.g. a pipe'
+    try:
+        return stat.S_ISREG(os.fstat(f.fileno()).st_mode)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+def _chunks(f: BinaryIO, size: int) -> Iterator[bytes]:
+    '''
+    read a stream in chunks of whole lines, of roughly `size` bytes.
+    Regular files are memory-mapped and split at newlines, and other streams (e.g. pipes) are read
+    line by line when `size` is 0, so that lines are written as soon as they arrive (e.g. when tailing)
+    '''
+    if _is_regular_file(f) and os.fstat(f.fileno()).st_size > 0:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            start = 0
+            while start < len(m):
+                end = m.find(b'\n', start + max(size, 1) - 1)
+                end = len(m) if end == -1 else end + 1
+                yield m[start:end]
+                start = end
+    elif size:
+        while lines := f.readlines(size):
+            yield b''.join(lines)
+    else:
+        yield from f
+
+def colourise(
+    files: list[BinaryIO],
+    out: TextIO,
+    style: str=DEFAULT_STYLE,
+    depth: int|None=None,
+    indent: int|None=None,
+    workers: int=1,
+    chunk_size: int=1 << 20,
+) -> None:
+    '''
+    colourise JSON lines from each file, and write them to `out`, in order.
+    - `workers` > 1 colourises chunks of `chunk_size` bytes in a process pool, with at most 2 chunks
+      per worker in flight at a time, so that memory use is bounded for files of any size
+    '''
+    if depth is None:
+        depth = term.colour_depth(out)
+    if workers <= 1:
+        for f in files:
+            # a single worker writes each line as soon as it's read from a pipe (e.g. when tailing)
+            size = chunk_size if _is_regular_file(f) else 0
+            for chunk in _chunks(f, size):
+                out.write(_colourise_lines(chunk, style, depth, indent))
+                if not size:
+                    out.flush()
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending: deque[Future[str]] = deque()
+        for f in files:
+            for chunk in _chunks(f, chunk_size):
+                if len(pending) >= 2 * workers:
+                    out.write(pending.popleft().result())
+                pending.append(pool.submit(_colourise_lines, chunk, style, depth, indent))
+        while pending:
+            out.write(pending.popleft().result())
+
+def main(argv: list[str]|None=None) -> None:
+    'colourise JSON lines (e.g. structured logs from `laser_prynter.log`) from files or STDIN'
+    parser = argparse.ArgumentParser(prog='python -m laser_prynter.pp', description=main.__doc__)
+    parser.add_argument('files', nargs='*', default=['-'], help='files to read, or - for STDIN (the default)')
+    parser.add_argument('-s', '--style', default=DEFAULT_STYLE, choices=STYLES)
+    parser.add_argument('-i', '--indent', type=int, default=None, help='re-indent each line of valid JSON')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='the number of processes (0 for one per CPU)')
+    parser.add_argument('--colour', default='auto', choices=('auto', 'always', 'never'))
+    args = parser.parse_args(argv)
+
+    depth = {
+        'auto':   None,
+        'always': term.env_colour_depth() or term.ColourDepth.ANSI256,
+        'never':  term.ColourDepth.NONE,
+    }[args.colour]
+    with contextlib.ExitStack() as stack:
+        files = [
+            sys.stdin.buffer if path == '-' else stack.enter_context(open(path, 'rb'))
+            for path in args.files
+        ]
+        try:
+            colourise(files, sys.stdout, args.style, depth, args.indent, args.workers or os.cpu_count() or 1)
+        except BrokenPipeError:
+            # e.g. when piped into `head`, redirect the rest of the output to avoid another error on exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except KeyboardInterrupt: # e.g. when tailing is stopped
+            pass
+
+if __name__ == '__main__':
+    main()
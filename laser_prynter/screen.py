@@ -0,0 +1,212 @@
+'''
+A double-buffered framebuffer of terminal cells, for flicker-free drawing.
+
+Cells are drawn into the back buffer, and `flush` writes only the cells that have changed since the
+last flush (with the fewest cursor moves & colour changes) in a single write, e.g.
+    ```python
+    s = screen.Screen(20, 2)
+    s.write(0, 0, 'hello', fg=screen.rgb(255, 0, 0))
+    s.flush()  # draws the whole screen
+    s.write(0, 0, 'j')
+    s.flush()  # only moves to the 1st cell, and draws 'j'
+    ```
+
+Each cell is a character with a foreground & background colour, stored in flat arrays:
+- characters are code points, and wide characters take up 2 cells (the 2nd is `CONTINUATION`)
+- colours are `DEFAULT`, an ANSI colour code (0-255), or a 24-bit RGB colour from `rgb`
+'''
+
+from __future__ import annotations
+
+import shutil
+import sys
+from array import array
+from functools import lru_cache
+from typing import Literal, TextIO
+
+from laser_prynter import term, text
+from laser_prynter.colour import c
+
+DEFAULT = -1
+CONTINUATION = 0  # the character of the right half of a wide character
+_RGB_FLAG = 1 << 24
+_BLANK = ord(' ')
+
+
+def rgb(r: int, g: int, b: int) -> int:
+    'The cell colour for a 24-bit RGB colour'
+    return _RGB_FLAG | r << 16 | g << 8 | b
+
+
+@lru_cache(maxsize=1024)
+def _colour_escape(colour: int, style: Literal['fg', 'bg'], depth: int) -> str:
+    'The escape sequence to set a cell colour, at a colour depth from `term.ColourDepth`'
+    if depth == term.ColourDepth.NONE:
+        return ''
+    if colour == DEFAULT:
+        return '\x1b[39m' if style == 'fg' else '\x1b[49m'
+    if colour & _RGB_FLAG:
+        return c.rgb_escape(colour >> 16 & 0xFF, colour >> 8 & 0xFF, colour & 0xFF, style, depth)
+    return c.ansi_escape(colour, style, depth)
+
+
+class Screen:
+    '''
+    A w x h grid of cells, drawn at `origin` (the 0-based column & line of the top-left cell in
+    the terminal). By default, the screen is the size of the terminal.
+    '''
+
+    def __init__(
+        self,
+        w: int | None = None,
+        h: int | None = None,
+        origin: tuple[int, int] = (0, 0),
+        file: TextIO | None = None,
+        depth: int | None = None,
+    ) -> None:
+        '''
+        - `file` is the stream to flush to, STDOUT by default
+        - `depth` is the colour depth (see `term.ColourDepth`), detected from `file` by default
+        '''
+        self.origin = origin
+        self.file = file or sys.stdout
+        self.depth = term.colour_depth(self.file) if depth is None else depth
+        self.w, self.h = 0, 0
+        self.chars, self.fg, self.bg = array('I'), array('i'), array('i')
+        self.resize(w, h)
+        self._clear = False  # the first flush draws every cell, so there's nothing to clear
+
+    def resize(self, w: int | None = None, h: int | None = None) -> None:
+        '''
+        Resize the screen (to the terminal size by default), keeping the cells that still fit.
+        As the terminal reflows its contents when resized, the next flush clears & redraws it all.
+        '''
+        size = shutil.get_terminal_size()
+        w, h = w or size.columns, h or size.lines
+        chars, fg, bg = _blank(w * h, _BLANK, DEFAULT)
+        n = min(w, self.w)
+        for y in range(min(h, self.h)):
+            src, dst = slice(y * self.w, y * self.w + n), slice(y * w, y * w + n)
+            chars[dst], fg[dst], bg[dst] = self.chars[src], self.fg[src], self.bg[src]
+            # a wide character cut in half by the new width is replaced by a blank
+            if n < self.w and self.chars[y * self.w + n] == CONTINUATION:
+                chars[y * w + n - 1] = _BLANK
+        self.w, self.h = w, h
+        self.chars, self.fg, self.bg = chars, fg, bg
+        self._clear = True
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        'Forget the last frame, so that the next flush redraws every cell'
+        self._front = _blank(self.w * self.h, CONTINUATION, DEFAULT)
+        self._full = True
+
+    def set(self, x: int, y: int, ch: str = ' ', fg: int = DEFAULT, bg: int = DEFAULT) -> int:
+        '''
+        Set the cell at column x & line y, and return the width of the character (0-2).
+        Cells outside the screen are ignored, and zero-width characters aren't drawn.
+        '''
+        cw = text.width(ch)
+        if cw == 0 or not (0 <= y < self.h and 0 <= x and x + cw <= self.w):
+            return cw
+        i = y * self.w + x
+        chars = self.chars
+        # don't leave half of a wide character behind
+        if chars[i] == CONTINUATION and x > 0:
+            chars[i - 1] = _BLANK
+        end = i + cw
+        if end < (y + 1) * self.w and chars[end] == CONTINUATION:
+            chars[end] = _BLANK
+        chars[i], self.fg[i], self.bg[i] = ord(ch), fg, bg
+        if cw == 2:
+            chars[i + 1], self.fg[i + 1], self.bg[i + 1] = CONTINUATION, fg, bg
+        return cw
+
+    def write(self, x: int, y: int, s: str, fg: int = DEFAULT, bg: int = DEFAULT) -> int:
+        '''
+        Write a line of (plain) text from column x on line y, clipped to the screen,
+        and return the column after it.
+        '''
+        for ch in s:
+            x += self.set(x, y, ch, fg, bg)
+        return x
+
+    def fill(
+        self, x: int, y: int, w: int, h: int, ch: str = ' ', fg: int = DEFAULT, bg: int = DEFAULT
+    ) -> None:
+        'Fill a rectangle of w x h cells, clipped to the screen'
+        for line in range(max(y, 0), min(y + h, self.h)):
+            self.write(x, line, ch * w, fg, bg)
+
+    def clear(self) -> None:
+        'Blank every cell (this is only drawn on the next flush)'
+        self.chars, self.fg, self.bg = _blank(self.w * self.h, _BLANK, DEFAULT)
+
+    def diff(self) -> str:
+        '''
+        Return the escape sequences to draw every cell that has changed since the last frame,
+        and make the current cells the last frame.
+        - unchanged lines are skipped by comparing whole lines at once
+        - the cursor is only moved when it isn't already at the next changed cell
+        - colours are only set when they differ from the previous cell drawn
+        '''
+        w, chars, fg, bg, depth = self.w, self.chars, self.fg, self.bg, self.depth
+        front_chars, front_fg, front_bg = self._front
+        ox, oy = self.origin
+        out = ['\x1b[2J'] if self._clear else []
+        pen_fg, pen_bg = DEFAULT, DEFAULT
+        cursor = None  # the (x, y) of the cursor on the screen, if known
+
+        for y in range(self.h):
+            start, end = y * w, (y + 1) * w
+            if (
+                not self._full
+                and chars[start:end] == front_chars[start:end]
+                and fg[start:end] == front_fg[start:end]
+                and bg[start:end] == front_bg[start:end]
+            ):
+                continue
+            for x in range(w):
+                i = start + x
+                ch = chars[i]
+                if ch == CONTINUATION or (
+                    not self._full
+                    and ch == front_chars[i]
+                    and fg[i] == front_fg[i]
+                    and bg[i] == front_bg[i]
+                ):
+                    continue
+                if cursor != (x, y):
+                    if cursor is not None and cursor[1] == y and cursor[0] < x:
+                        out.append(f'\x1b[{x - cursor[0]}C')  # forward on the same line
+                    else:
+                        out.append(f'\x1b[{oy + y + 1};{ox + x + 1}H')
+                if fg[i] != pen_fg:
+                    pen_fg = fg[i]
+                    out.append(_colour_escape(pen_fg, 'fg', depth))
+                if bg[i] != pen_bg:
+                    pen_bg = bg[i]
+                    out.append(_colour_escape(pen_bg, 'bg', depth))
+                out.append(chr(ch))
+                after = x + 2 if i + 1 < end and chars[i + 1] == CONTINUATION else x + 1
+                # the cursor doesn't advance past the last column, it waits to wrap
+                cursor = (after, y) if after < w else None
+
+        if (pen_fg, pen_bg) != (DEFAULT, DEFAULT) and depth != term.ColourDepth.NONE:
+            out.append(c.RESET)
+        self._front = (array('I', chars), array('i', fg), array('i', bg))
+        self._full = self._clear = False
+        return ''.join(out)
+
+    def flush(self) -> int:
+        'Draw the cells that changed since the last flush in a single write, and return its length'
+        s = self.diff()
+        if s:
+            self.file.write(s)
+            self.file.flush()
+        return len(s)
+
+
+def _blank(n: int, char: int, colour: int) -> tuple[array[int], array[int], array[int]]:
+    'Arrays of n cells, with the same character & colours'
+    return array('I', [char]) * n, array('i', [colour]) * n, array('i', [colour]) * n
@@ -0,0 +1,59 @@
+'''
+Terminal capability detection, to pick how many colours to use in escape sequences.
+
+The environment is only probed once per process, e.g.
+    ```python
+    term.colour_depth(sys.stderr)
+    # 24, when STDERR is a terminal and COLORTERM=truecolor
+    # 0, when STDERR is redirected, or NO_COLOR is set
+    ```
+'''
+
+import functools
+import os
+import sys
+from typing import TextIO
+
+
+class ColourDepth:
+    'An enum type for terminal colour depths, as the number of bits per colour.'
+    NONE       = 0
+    ANSI16     = 4
+    ANSI256    = 8
+    TRUECOLOUR = 24
+
+
+# TERM values for terminals that only support the 16 standard colours
+_ANSI16_TERMS = ('ansi', 'cygwin', 'linux', 'vt100', 'vt220', 'xterm-16color', 'xterm-color')
+
+@functools.cache
+def env_colour_depth() -> int:
+    '''
+    Detect the colour depth from the environment, ignoring whether output is a terminal.
+    - `NO_COLOR` (any non-empty value) disables colour, see https://no-color.org
+    - `COLORTERM=truecolor|24bit` enables 24-bit colour
+    - `TERM` is used otherwise, and unknown or unset values default to 256 colours
+    '''
+    if os.environ.get('NO_COLOR'):
+        return ColourDepth.NONE
+    if os.environ.get('COLORTERM', '').lower() in ('truecolor', '24bit'):
+        return ColourDepth.TRUECOLOUR
+
+    term = os.environ.get('TERM', '').lower()
+    if term == 'dumb':
+        return ColourDepth.NONE
+    if term.endswith(('-direct', '-truecolor')):
+        return ColourDepth.TRUECOLOUR
+    if term in _ANSI16_TERMS:
+        return ColourDepth.ANSI16
+    return ColourDepth.ANSI256
+
+def colour_depth(stream: TextIO | None = sys.stdout) -> int:
+    '''
+    Detect the colour depth to use for output to `stream`,
+    which is `ColourDepth.NONE` if the stream isn't a terminal (e.g. redirected to a file or pipe).
+    If `stream` is None, only the environment is checked.
+    '''
+    if stream is not None and not stream.isatty():
+        return ColourDepth.NONE
+    return env_colour_depth()
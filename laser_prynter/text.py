@@ -0,0 +1,118 @@
+r'''
+Measure & pad text by its display width in a terminal, i.e. the number of columns it takes up.
+- ANSI escape sequences (e.g. colours) take up no columns
+- East-Asian wide & fullwidth characters (e.g. CJK, most emoji) take up 2 columns
+- combining marks & other zero-width characters (e.g. the macron in "x̄") take up no columns
+
+e.g.
+    ```python
+    text.width('\x1b[1;32m漢字\x1b[0m') # 4
+    text.ljust('x̄', 4)                  # 'x̄   '
+    ```
+'''
+
+import unicodedata
+from collections.abc import Iterator
+from functools import lru_cache
+
+ESC = '\x1b'
+
+
+@lru_cache(maxsize=4096)
+def _char_width(ch: str) -> int:
+    'The display width of a single (non-escape) character'
+    if unicodedata.combining(ch) or unicodedata.category(ch) in ('Mn', 'Me', 'Cf', 'Cc'):
+        return 0
+    if unicodedata.east_asian_width(ch) in ('W', 'F'):
+        return 2
+    return 1
+
+
+def _tokens(s: str) -> Iterator[tuple[str, int]]:
+    '''
+    Split a string into escape sequences & characters in a single pass, with the display width of
+    each (which is 0 for escape sequences). Supports CSI sequences (e.g. colours & cursor moves),
+    OSC sequences (e.g. hyperlinks & titles), and other 2-character escapes.
+    '''
+    i, n = 0, len(s)
+    while i < n:
+        ch = s[i]
+        if ch != ESC:
+            yield ch, _char_width(ch)
+            i += 1
+            continue
+        j = i + 2
+        if s[i + 1 : i + 2] == '[':
+            # CSI: parameter & intermediate bytes, then a final byte in @-~
+            while j < n and not '@' <= s[j] <= '~':
+                j += 1
+            j += 1
+        elif s[i + 1 : i + 2] == ']':
+            # OSC: terminated by BEL or ST (ESC \)
+            while j < n and s[j] != '\x07' and s[j : j + 2] != ESC + '\\':
+                j += 1
+            j += 1 if s[j : j + 1] == '\x07' else 2
+        yield s[i:j], 0
+        i = j
+
+
+@lru_cache(maxsize=4096)
+def width(s: str) -> int:
+    'The display width of a string, skipping escape sequences'
+    if s.isascii() and s.isprintable():
+        return len(s)
+    return sum(w for _, w in _tokens(s))
+
+
+def ljust(s: str, n: int, fillchar: str = ' ') -> str:
+    'Pad a string on the right to a display width of n, like `str.ljust`'
+    return s + fillchar * (n - width(s))
+
+
+def rjust(s: str, n: int, fillchar: str = ' ') -> str:
+    'Pad a string on the left to a display width of n, like `str.rjust`'
+    return fillchar * (n - width(s)) + s
+
+
+def center(s: str, n: int, fillchar: str = ' ') -> str:
+    'Pad a string on both sides to a display width of n, like `str.center`'
+    pad = n - width(s)
+    if pad <= 0:
+        return s
+    left = pad // 2 + (pad & n & 1)  # the same split as `str.center`
+    return fillchar * left + s + fillchar * (pad - left)
+
+
+def truncate(s: str, n: int, placeholder: str = '…') -> str:
+    '''
+    Truncate a string to a display width of n (including the placeholder), keeping all escape
+    sequences, so that e.g. colours are still reset at the end of the string.
+    (this isn't cached, as it's meant for strings that change often, e.g. progress info)
+    '''
+    tokens = list(_tokens(s))
+    if sum(w for _, w in tokens) <= n:
+        return s
+    limit = n - width(placeholder)
+    parts, used, cut = [], 0, False
+    for token, w in tokens:
+        if w == 0 and token.startswith(ESC):
+            parts.append(token)
+        elif not cut and used + w <= limit:
+            parts.append(token)
+            used += w
+        elif not cut:
+            parts.append(placeholder)
+            cut = True
+    return ''.join(parts)
+
+
+def tail(s: str, n: int) -> str:
+    'The end of a (plain text) string, with a display width of at most n'
+    used, i = 0, len(s)
+    while i > 0:
+        w = _char_width(s[i - 1])
+        if used + w > n:
+            break
+        used += w
+        i -= 1
+    return s[i:]
@@ -0,0 +1,13 @@
+from io import StringIO
+
+
+class CountingStringIO(StringIO):
+    'A StringIO that counts the number of writes to it'
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
@@ -0,0 +1,63 @@
+import unittest
+from io import StringIO
+
+from laser_prynter import bench
+
+from .helpers import CountingStringIO
+
+
+def _identity(x: list) -> list:
+    return x
+
+
+class TestRenderer(unittest.TestCase):
+    def test_get_renderer_redirected(self) -> None:
+        'Plain text is used when output is redirected'
+
+        self.assertIsInstance(bench.get_renderer(file=StringIO()), bench.PlainRenderer)
+        self.assertNotIsInstance(bench.get_renderer(file=StringIO()), bench.ANSIRenderer)
+
+    def test_get_renderer_fmt(self) -> None:
+        'An explicit format overrides detection'
+
+        self.assertIsInstance(bench.get_renderer('markdown', StringIO()), bench.MarkdownRenderer)
+        self.assertIsInstance(bench.get_renderer('ansi', StringIO()), bench.ANSIRenderer)
+
+    def test_get_renderer_unknown(self) -> None:
+        'An unknown format is an error, which lists the known formats'
+
+        with self.assertRaisesRegex(ValueError, r"'foo'.*\['ansi', 'markdown', 'plain'\]"):
+            bench.get_renderer('foo', StringIO())
+
+    def test_plain_single_write(self) -> None:
+        'Plain output contains no escapes, and each test is written in a single call'
+
+        s = CountingStringIO()
+        bench.bench(
+            tests=[(([1],), {}, [1]), (([2],), {}, [2])],
+            func_groups=[[_identity]],
+            n=10,
+            sort=True,
+            renderer=bench.PlainRenderer(s, width=80),
+        )
+
+        self.assertEqual(s.writes, 2)
+        self.assertNotIn('\x1b', s.getvalue())
+        self.assertIn('sorted by time:', s.getvalue())
+
+    def test_markdown(self) -> None:
+        'Markdown output renders results as a table'
+
+        s = StringIO()
+        bench.bench(
+            tests=[(([1],), {}, [2])],
+            func_groups=[[_identity]],
+            n=10,
+            renderer=bench.MarkdownRenderer(s, width=80),
+        )
+        lines = s.getvalue().splitlines()
+
+        self.assertIn('| function | status | Σ | x̄ | |', lines)
+        row = next(line for line in lines if '._identity`' in line)
+        self.assertTrue(row.startswith(f'| `{_identity.__module__}._identity` | fail |'))
+        self.assertTrue(row.endswith(">> result='[1]' |"))
@@ -1,6 +1,9 @@
+import random
 import unittest
+from unittest import mock
 
 from laser_prynter.colour import c
+from laser_prynter.term import ColourDepth
 
 class TestC(unittest.TestCase):
     def test_ansi_to_rgb(self) -> None:
@@ -32,3 +35,181 @@ class TestC(unittest.TestCase):
             results[n] = c.ansi_to_rgb(n)
 
         self.assertEqual(results, expected)
+
+
+class TestBatch(unittest.TestCase):
+    def test_rgb_to_cube_coords(self) -> None:
+        'RGB components are quantised to the nearest cube level'
+
+        self.assertEqual(c.rgb_to_cube_coords(0, 47, 48), (0, 0, 1))
+        self.assertEqual(c.rgb_to_cube_coords(114, 116, 255), (1, 2, 5))
+        for n in range(16, 232):
+            self.assertEqual(c.rgb_to_ansi_cube(*c.ansi_to_rgb(n)), n)
+
+    def test_sequences(self) -> None:
+        'Sequences are converted to lists'
+
+        self.assertEqual(c.ansi_to_rgb_batch([16, 21, 231]), [(0, 0, 0), (0, 0, 255), (255, 255, 255)])
+        self.assertEqual(c.rgb_to_ansi_batch([(0, 0, 0), (0, 0, 250), (255, 255, 255)]), [16, 21, 231])
+
+    def test_buffers(self) -> None:
+        'Buffers are converted to bytes, with RGB packed as 3 bytes per colour'
+
+        codes = bytes(range(16, 232))
+        rgb = c.ansi_to_rgb_batch(codes)
+
+        self.assertEqual(rgb, b''.join(bytes(c.ansi_to_rgb(n)) for n in codes))
+        self.assertEqual(c.rgb_to_ansi_batch(rgb), codes)
+        self.assertEqual(c.rgb_to_ansi_batch(memoryview(bytearray(rgb))), codes)
+
+    def test_buffers_without_numpy(self) -> None:
+        'The pure-python fallback gives the same results'
+
+        codes = bytes(range(16, 232))
+        with mock.patch.object(c, 'HAS_NUMPY', False):
+            rgb = c.ansi_to_rgb_batch(codes)
+            self.assertEqual(rgb, b''.join(bytes(c.ansi_to_rgb(n)) for n in codes))
+            self.assertEqual(c.rgb_to_ansi_batch(rgb), codes)
+
+    @unittest.skipUnless(c.HAS_NUMPY, 'numpy is not installed')
+    def test_numpy(self) -> None:
+        'numpy arrays are converted to numpy arrays'
+
+        import numpy as np
+
+        codes = np.arange(16, 232, dtype=np.uint8).reshape(6, 36)
+        rgb = c.ansi_to_rgb_batch(codes)
+
+        self.assertEqual(rgb.shape, (6, 36, 3))
+        self.assertTrue((c.rgb_to_ansi_batch(rgb) == codes).all())
+
+
+def _rgbs(step: int) -> list[tuple[int, int, int]]:
+    return [(r, g, b) for r in range(0, 256, step) for g in range(0, 256, step) for b in range(0, 256, step)]
+
+
+class TestANSI256(unittest.TestCase):
+    def _nearest(self, rgb: tuple[int, int, int], perceptual: bool) -> float:
+        'Returns the distance to the nearest colour, by scanning the whole palette'
+
+        if perceptual:
+            lab = c.rgb_to_oklab(*rgb)
+            return min(
+                sum((x - y) ** 2 for x, y in zip(lab, c.rgb_to_oklab(*c.ansi_to_rgb(n))))
+                for n in range(16, 256)
+            )
+        return min(c._distance(rgb, c.ansi_to_rgb(n)) for n in range(16, 256))
+
+    def _distance(self, rgb: tuple[int, int, int], n: int, perceptual: bool) -> float:
+        if perceptual:
+            lab = c.rgb_to_oklab(*rgb)
+            return sum((x - y) ** 2 for x, y in zip(lab, c.rgb_to_oklab(*c.ansi_to_rgb(n))))
+        return c._distance(rgb, c.ansi_to_rgb(n))
+
+    def test_greyscale(self) -> None:
+        'The greyscale ramp is included in the palette'
+
+        self.assertEqual(c.ansi_to_rgb(232), (8, 8, 8))
+        self.assertEqual(c.ansi_to_rgb(255), (238, 238, 238))
+        self.assertEqual(c.rgb_to_ansi256(128, 128, 128), 244)
+        self.assertEqual(c.rgb_to_ansi256(128, 128, 128, perceptual=True), 244)
+
+    def test_palette(self) -> None:
+        'Every palette colour maps to itself'
+
+        for n in range(16, 256):
+            with self.subTest(n=n):
+                self.assertEqual(c.ansi_to_rgb(c.rgb_to_ansi256(*c.ansi_to_rgb(n))), c.ansi_to_rgb(n))
+
+    def test_nearest(self) -> None:
+        'The result is as near as the nearest colour found by scanning the whole palette'
+
+        for rgb in _rgbs(37):
+            for perceptual in (False, True):
+                with self.subTest(rgb=rgb, perceptual=perceptual):
+                    n = c.rgb_to_ansi256(*rgb, perceptual=perceptual)
+                    self.assertAlmostEqual(self._distance(rgb, n, perceptual), self._nearest(rgb, perceptual))
+
+    def test_nearest_grey(self) -> None:
+        'The nearest grey is found from the exact mean of the components, so is never a level too far'
+
+        self.assertEqual(c.rgb_to_ansi256(185, 189, 206), 251)
+        rng = random.Random(0)
+        rgbs = [(185, 189, 206)]
+        rgbs += [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(2000)]
+        batch = c.rgb_to_ansi256_batch(b''.join(map(bytes, rgbs)))
+        for rgb, n in zip(rgbs, batch):
+            with self.subTest(rgb=rgb):
+                self.assertEqual(self._distance(rgb, c.rgb_to_ansi256(*rgb), False), self._nearest(rgb, False))
+                self.assertEqual(self._distance(rgb, n, False), self._nearest(rgb, False))
+
+    def test_batch(self) -> None:
+        'The batch conversion matches the single conversion, for every kind of input'
+
+        rgbs = _rgbs(51)
+        packed = b''.join(map(bytes, rgbs))
+        for perceptual in (False, True):
+            expected = [c.rgb_to_ansi256(*rgb, perceptual=perceptual) for rgb in rgbs]
+            with self.subTest(perceptual=perceptual):
+                self.assertEqual(c.rgb_to_ansi256_batch(rgbs, perceptual), expected)
+                self.assertEqual(c.rgb_to_ansi256_batch(packed, perceptual), bytes(expected))
+                with mock.patch.object(c, 'HAS_NUMPY', False):
+                    self.assertEqual(c.rgb_to_ansi256_batch(packed, perceptual), bytes(expected))
+                if c.HAS_NUMPY:
+                    import numpy as np
+
+                    array = np.frombuffer(packed, dtype=np.uint8).reshape(-1, 3)
+                    self.assertEqual(c.rgb_to_ansi256_batch(array, perceptual).tolist(), expected)
+
+
+class TestEscape(unittest.TestCase):
+    def test_ansi_escape(self) -> None:
+        'ANSI colours are downgraded to the nearest standard colour, or nothing'
+
+        self.assertEqual(c.ansi_escape(196, 'fg', ColourDepth.TRUECOLOUR), '\033[38;5;196m')
+        self.assertEqual(c.ansi_escape(196, 'bg', ColourDepth.ANSI256), '\033[48;5;196m')
+        self.assertEqual(c.ansi_escape(196, 'fg', ColourDepth.ANSI16), '\033[91m')
+        self.assertEqual(c.ansi_escape(16, 'bg', ColourDepth.ANSI16), '\033[40m')
+        self.assertEqual(c.ansi_escape(196, 'fg', ColourDepth.NONE), '')
+
+    def test_rgb_escape(self) -> None:
+        'RGB colours are downgraded to the nearest palette colour, or nothing'
+
+        self.assertEqual(c.rgb_escape(1, 2, 3, 'bg', ColourDepth.TRUECOLOUR), '\033[48;2;1;2;3m')
+        self.assertEqual(c.rgb_escape(255, 0, 0, 'fg', ColourDepth.ANSI256), '\033[38;5;196m')
+        self.assertEqual(c.rgb_escape(255, 0, 0, 'bg', ColourDepth.ANSI16), '\033[101m')
+        self.assertEqual(c.rgb_escape(255, 0, 0, 'bg', ColourDepth.NONE), '')
+
+    def test_colorise(self) -> None:
+        'Text is left as-is when colour is disabled'
+
+        colour = c.from_ansi(196)
+        with mock.patch.object(c, 'env_colour_depth', return_value=ColourDepth.ANSI256):
+            self.assertEqual(colour.colorise('x'), f'\033[48;5;196mx{c.RESET}')
+        with mock.patch.object(c, 'env_colour_depth', return_value=ColourDepth.NONE):
+            self.assertEqual(colour.colorise('x'), 'x')
+
+
+class TestANSIColour(unittest.TestCase):
+    def test_interned(self) -> None:
+        'The same ANSIColour is returned for the same ANSI colour code'
+
+        self.assertIs(c.from_ansi(196), c.from_ansi(196))
+        self.assertIs(c.from_cube_coords(5, 0, 0), c.from_ansi(196))
+        self.assertEqual(c.from_ansi(196), c.ANSIColour(ansi_n=196, rgb=(255, 0, 0)))
+
+    def test_out_of_range(self) -> None:
+        'Codes outside the palette are still supported, but not shared'
+
+        colour = c.from_ansi(256)
+        self.assertEqual(colour.rgb, (0, 0, 0))
+        with mock.patch.object(c, 'env_colour_depth', return_value=ColourDepth.ANSI256):
+            self.assertEqual(colour.bg, '\033[48;5;256m')
+
+    def test_escapes(self) -> None:
+        'Escape codes are shared between calls'
+
+        colour = c.from_ansi(21)
+        with mock.patch.object(c, 'env_colour_depth', return_value=ColourDepth.ANSI256):
+            self.assertEqual((colour.fg, colour.bg), ('\033[38;5;21m', '\033[48;5;21m'))
+            self.assertIs(colour.fg, c.from_ansi(21).escape_code('fg'))
@@ -0,0 +1,282 @@
+import unittest
+from unittest import mock
+
+from laser_prynter.colour import c, gradient
+from laser_prynter.colour.c import RGBColour
+
+from .helpers import CountingStringIO
+
+RED, GREEN, BLUE = RGBColour(255, 0, 0), RGBColour(0, 255, 0), RGBColour(0, 0, 255)
+
+
+class TestRGBGradient(unittest.TestCase):
+    def test_rgb(self) -> None:
+        'RGB gradients interpolate each component linearly, from start to end (inclusive)'
+
+        g = gradient.RGBGradient(start=RGBColour(0, 0, 0), end=RGBColour(255, 100, 10), steps=6)
+
+        self.assertEqual(g.sequence, (
+            (0, 0, 0), (51, 20, 2), (102, 40, 4), (153, 60, 6), (204, 80, 8), (255, 100, 10),
+        ))
+        self.assertIsInstance(g.sequence[0], RGBColour)
+
+    def test_steps(self) -> None:
+        'Gradients can have any number of steps'
+
+        self.assertEqual(gradient.RGBGradient(RED, BLUE, 0).sequence, ())
+        self.assertEqual(gradient.RGBGradient(RED, BLUE, 1).sequence, (RED,))
+        self.assertEqual(gradient.RGBGradient(RED, BLUE, 2).sequence, (RED, BLUE))
+
+    def test_via(self) -> None:
+        'Gradients pass through each of the via colours, which are spaced evenly'
+
+        g = gradient.RGBGradient(RED, BLUE, 5, via=(GREEN,))
+
+        self.assertEqual(g.sequence, (RED, (128, 128, 0), GREEN, (0, 128, 128), BLUE))
+
+    def test_hsl(self) -> None:
+        'HSL gradients go around the hue circle, the shortest way'
+
+        g = gradient.RGBGradient(RED, BLUE, 3, space='hsl')
+
+        self.assertEqual(g.sequence, (RED, (255, 0, 255), BLUE))
+
+    def test_oklab(self) -> None:
+        'OKLab gradients are perceptually even, so the midpoint is darker than in RGB'
+
+        black, white = RGBColour(0, 0, 0), RGBColour(255, 255, 255)
+        g = gradient.RGBGradient(black, white, 3, space='oklab')
+
+        self.assertEqual((g.sequence[0], g.sequence[-1]), (black, white))
+        self.assertEqual(g.sequence[1], (99, 99, 99))
+
+    def test_get(self) -> None:
+        'Gradients with the same arguments are shared, and cache hits/misses are counted'
+
+        gradient.RGBGradient.get.cache_clear()
+        g = gradient.RGBGradient.get(RED, BLUE, 10)
+
+        self.assertIs(gradient.RGBGradient.get(RED, BLUE, 10), g)
+        self.assertIsNot(gradient.RGBGradient.get(RED, BLUE, 11), g)
+        info = gradient.RGBGradient.get.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 2))
+
+    def test_immutable(self) -> None:
+        'Gradients cannot be changed, as they are shared'
+
+        g = gradient.RGBGradient.get(RED, BLUE, 10)
+        with self.assertRaises(AttributeError):
+            g.steps = 5  # type: ignore[misc]
+
+    def test_too_few_stops(self) -> None:
+        'At least 2 stops are needed'
+
+        with self.assertRaises(ValueError):
+            gradient.interp_stops([RED], 10)
+
+    @unittest.skipUnless(gradient.HAS_NUMPY, 'numpy is not installed')
+    def test_without_numpy(self) -> None:
+        'The pure-python fallback gives the same results as numpy'
+
+        stops = [(10, 200, 30), (250, 3, 99), (0, 0, 0), (255, 128, 64)]
+        for space in ('rgb', 'oklab', 'hsl'):
+            with self.subTest(space=space):
+                expected = gradient.interp_stops(stops, 257, space)
+                with mock.patch.object(gradient, 'HAS_NUMPY', False):
+                    self.assertEqual(gradient.interp_stops(stops, 257, space), expected)
+
+
+class TestGradient(unittest.TestCase):
+    def test_interp(self) -> None:
+        'Values are interpolated from v0 to v1 (inclusive), rounded to 2 decimal places'
+
+        self.assertEqual(gradient.Gradient.interp(0, 1, 4), [0.0, 0.33, 0.67, 1.0])
+        self.assertEqual(gradient.Gradient.interp(5, 9, 1), [5.0])
+
+    def test_interp_xyz(self) -> None:
+        'Each component is interpolated separately'
+
+        self.assertEqual(
+            gradient.Gradient.interp_xyz((0, 10, 20), (10, 10, 0), 3),
+            [(0.0, 10.0, 20.0), (5.0, 10.0, 10.0), (10.0, 10.0, 0.0)],
+        )
+
+
+def _face(codes: list[list[int]]) -> gradient.Face:
+    return gradient.Face([[c.from_ansi(n) for n in row] for row in codes])
+
+
+class TestFace(unittest.TestCase):
+    def test_rows(self) -> None:
+        'Faces are indexed & iterated by row, with shared ANSIColour cells'
+
+        face = _face([[16, 17], [18, 19]])
+
+        self.assertEqual(face[0], [c.from_ansi(16), c.from_ansi(17)])
+        self.assertIs(face[-1][1], c.from_ansi(19))
+        self.assertEqual([[cell.ansi_n for cell in row] for row in face], [[16, 17], [18, 19]])
+
+    def test_rot90(self) -> None:
+        'Faces are rotated clockwise, after flipping vertically'
+
+        face = _face([[16, 17], [18, 19]])
+
+        self.assertEqual(face.rot90(0), face)
+        self.assertEqual(face.rot90(1), _face([[18, 16], [19, 17]]))
+        self.assertEqual(face.rot90(2), _face([[19, 18], [17, 16]]))
+        self.assertEqual(face.rot90(0, flip=True), _face([[18, 19], [16, 17]]))
+        self.assertEqual(face.rot90(1, flip=True), _face([[16, 18], [17, 19]]))
+        self.assertEqual(face.rot90(1).rot90(1), face.rot90(2))
+
+    def test_compatibility(self) -> None:
+        'The rotations are still available as lists, and with_rotations is accepted'
+
+        rows = [[c.from_ansi(16), c.from_ansi(17)], [c.from_ansi(18), c.from_ansi(19)]]
+        face = gradient.Face(rows, with_rotations=False)
+
+        self.assertEqual(face.rotations, [face.rot90(n) for n in range(4)])
+        self.assertEqual(face.flipped_rotations, [face.rot90(n, flip=True) for n in range(4)])
+        self.assertIsNot(face.rot90(0), face)
+        self.assertEqual(face.rotations[0], face)
+
+    def test_views(self) -> None:
+        'Rotations share the same array of codes, and are only created once'
+
+        face = _face([[16, 17], [18, 19]])
+
+        self.assertIs(face.rot90(3, flip=True), face.rot90(3, flip=True))
+        self.assertIs(face.rot90(3, flip=True).codes, face.codes)
+        self.assertIs(face.rot90(1).rot90(1).codes, face.codes)
+
+    def test_empty_face(self) -> None:
+        'Empty faces are shared'
+
+        self.assertIs(gradient.Face.empty_face(6), gradient.Face.empty_face(6))
+        self.assertEqual(gradient.Face.empty_face(2).cell_codes(), (256,) * 4)
+
+
+class TestEdges(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cube = gradient.RGBCube.from_ranges('r', 'g', 'b')
+
+    def test_edge(self) -> None:
+        'Edges are read top-to-bottom or left-to-right'
+
+        face = _face([[16, 17], [18, 19]])
+
+        self.assertEqual(face.edge('top'), (16, 17))
+        self.assertEqual(face.edge('bottom'), (18, 19))
+        self.assertEqual(face.edge('left'), (16, 18))
+        self.assertEqual(face.edge('right'), (17, 19))
+
+    def test_find_face_with_edge(self) -> None:
+        'The face found joins onto the given side of the face'
+
+        face = self.cube.faces.faces[0][0]
+        sides: tuple[tuple[str, gradient.Side, gradient.Side], ...] = (
+            ('ts', 'top', 'bottom'),
+            ('bs', 'bottom', 'top'),
+            ('lhs', 'left', 'right'),
+            ('rhs', 'right', 'left'),
+        )
+        for edge_type, side, other_side in sides:
+            with self.subTest(edge_type=edge_type):
+                found = self.cube.find_face_with_edge(face, edge_type)
+                self.assertEqual(found.edge(other_side), face.edge(side))
+
+    def test_no_matching_edge(self) -> None:
+        'An error is raised when no face has a matching edge'
+
+        with self.assertRaises(ValueError):
+            self.cube.find_face_with_edge(gradient.Face.empty_face(6), 'ts')
+
+    def test_collection(self) -> None:
+        'Faces are found in other cubes of a collection'
+
+        collection = gradient.RGBCubeCollection({
+            'rgb': self.cube,
+            'grb': gradient.RGBCube.from_ranges('g', 'r', 'b'),
+        })
+        face = self.cube.faces.faces[0][0]
+
+        found, name = gradient.find_face_with_edge(collection, 'rgb', face, 'ts')
+
+        self.assertEqual(name, 'grb')
+        self.assertEqual(found.edge('bottom'), face.edge('top'))
+
+    def test_collection_changes(self) -> None:
+        'The edge index is rebuilt when the cubes of a collection change'
+
+        collection = gradient.RGBCubeCollection({'rgb': self.cube})
+        face = self.cube.faces.faces[0][0]
+        with self.assertRaises(ValueError):
+            gradient.find_face_with_edge(collection, 'rgb', face, 'ts')
+        index = collection.edge_index
+
+        collection.cubes['grb'] = gradient.RGBCube.from_ranges('g', 'r', 'b')
+
+        self.assertEqual(gradient.find_face_with_edge(collection, 'rgb', face, 'ts')[1], 'grb')
+        self.assertIsNot(collection.edge_index, index)
+        self.assertIs(collection.edge_index, collection.edge_index)
+
+    def test_faces_changes(self) -> None:
+        'The edge index of a cube (and its collection) is rebuilt when its faces are replaced'
+
+        cube = gradient.RGBCube.from_ranges('r', 'g', 'b')
+        collection = gradient.RGBCubeCollection({'cube': cube})
+        index, collection_index = cube.edge_index, collection.edge_index
+
+        other = gradient.RGBCube.from_ranges('g', 'r', 'b')
+        cube.faces = other.faces
+
+        self.assertIsNot(cube.edge_index, index)
+        self.assertEqual(cube.edge_index, other.edge_index)
+        self.assertIsNot(collection.edge_index, collection_index)
+        self.assertEqual(
+            collection.edge_index, {edge: [('cube', face)] for edge, face in other.edge_index.items()}
+        )
+
+
+class TestLayout(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cubes = {
+            'rgb': gradient.RGBCube.from_ranges('r', 'g', 'b'),
+            'grb': gradient.RGBCube.from_ranges('g', 'r', 'b'),
+            'bgr': gradient.RGBCube.from_ranges('b', 'g', 'r'),
+        }
+
+    def test_str_width(self) -> None:
+        'Widths are measured without rendering, and match the rendered width'
+
+        faces = self.cubes['rgb'].faces
+        for cell_width in (3, 6, 15):
+            with self.subTest(cell_width=cell_width):
+                lines = faces.iter_s(0, 1, cell_width)
+                rendered = max(len(gradient.ANSI_COLOURS.sub('', line)) for line in lines)
+                self.assertEqual(faces.str_width(cell_width), rendered)
+
+    def test_rendered_once(self) -> None:
+        'Face lines are cached'
+
+        face = self.cubes['rgb'].faces.faces[0][0]
+        self.assertIs(face.iter_s(0, 1, 6), face.iter_s(0, 1, 6))
+
+    def test_as_str(self) -> None:
+        'Faces are joined line by line'
+
+        faces = self.cubes['rgb'].faces
+        self.assertEqual(faces.as_str(), ''.join(f'{line}\n' for line in faces.iter_s()))
+
+    def test_print_groups(self) -> None:
+        'Cubes are grouped to fit the terminal width, and each group is written in a single call'
+
+        collection = gradient.RGBCubeCollection(self.cubes)
+        width = self.cubes['rgb'].faces.str_width(6)
+        collection.width = width * 2
+
+        self.assertEqual([[name for name, _, _ in g] for g in collection.groups()], [['rgb', 'grb'], ['bgr']])
+
+        s = CountingStringIO()
+        collection.print(file=s)
+        self.assertEqual(s.writes, 2)
+        self.assertTrue(s.getvalue().startswith(f'{"rgb":<{width}s}  {"grb":<{width}s}  \n'))
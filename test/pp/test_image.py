@@ -0,0 +1,155 @@
+import io
+import random
+import unittest
+from unittest import mock
+
+from laser_prynter.colour import image
+from laser_prynter.term import ColourDepth
+
+RED, BLUE = bytes((255, 0, 0)), bytes((0, 0, 255))
+
+
+class TestHeader(unittest.TestCase):
+    def test_ppm(self) -> None:
+        'PPM headers can have comments, and the stream is left at the pixel data'
+
+        f = io.BytesIO(b'P6\n# a comment\n2 1\n255\n' + RED + BLUE)
+
+        self.assertEqual(image.read_header(f), image.ImageHeader(2, 1, 3, 255))
+        self.assertEqual(f.read(), RED + BLUE)
+
+    def test_pam(self) -> None:
+        'PAM headers give the number of channels'
+
+        f = io.BytesIO(
+            b'P7\nWIDTH 2\nHEIGHT 1\nDEPTH 4\nMAXVAL 255\nTUPLTYPE RGB_ALPHA\nENDHDR\n'
+        )
+
+        self.assertEqual(image.read_header(f), image.ImageHeader(2, 1, 4, 255))
+
+    def test_end_of_stream(self) -> None:
+        'There is no header at the end of a stream'
+
+        self.assertIsNone(image.read_header(io.BytesIO(b'')))
+
+    def test_unsupported(self) -> None:
+        'Only binary netpbm images are supported'
+
+        with self.assertRaises(ValueError):
+            image.read_header(io.BytesIO(b'P3 1 1 255 0 0 0'))
+
+
+    def test_invalid_maxval(self) -> None:
+        'The maximum sample value must be 1-65535'
+
+        headers = (
+            b'P6 1 1 0\n',
+            b'P5 1 1 65536\n',
+            b'P7\nWIDTH 1\nHEIGHT 1\nDEPTH 3\nMAXVAL 0\nENDHDR\n',
+        )
+        for header in headers:
+            with self.subTest(header=header), self.assertRaisesRegex(ValueError, 'maxval'):
+                image.read_header(io.BytesIO(header))
+
+
+class TestRows(unittest.TestCase):
+    def test_channels(self) -> None:
+        'Greyscale & alpha samples are converted to RGB'
+
+        for header, data, expected in (
+            (image.ImageHeader(2, 1, 1, 255), bytes((0, 200)), bytes((0, 0, 0, 200, 200, 200))),
+            (image.ImageHeader(1, 1, 2, 255), bytes((7, 255)), bytes((7, 7, 7))),
+            (image.ImageHeader(1, 1, 4, 255), bytes((1, 2, 3, 0)), bytes((1, 2, 3))),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(list(image.iter_rows(io.BytesIO(data), header)), [expected])
+
+    def test_maxval(self) -> None:
+        'Samples are scaled to 8 bits'
+
+        for header, data in (
+            (image.ImageHeader(1, 1, 3, 15), bytes((15, 0, 5))),
+            (image.ImageHeader(1, 1, 3, 65535), bytes((255, 255, 0, 0, 85, 85))),
+        ):
+            with self.subTest(maxval=header.maxval):
+                self.assertEqual(list(image.iter_rows(io.BytesIO(data), header)), [bytes((255, 0, 85))])
+
+    def test_truncated(self) -> None:
+        'An error is raised when the image data ends early'
+
+        with self.assertRaises(ValueError):
+            list(image.iter_rows(io.BytesIO(RED), image.ImageHeader(2, 1)))
+
+
+class TestRender(unittest.TestCase):
+    def test_truecolour(self) -> None:
+        'Each cell has the top pixel as the foreground, and the bottom pixel as the background'
+
+        lines = list(image.render_rows([RED + BLUE, BLUE + BLUE], 2, depth=ColourDepth.TRUECOLOUR))
+
+        self.assertEqual(lines, [
+            '\x1b[38;2;255;0;0m\x1b[48;2;0;0;255m▀\x1b[38;2;0;0;255m▀\x1b[0m',
+        ])
+
+    def test_repeated_colours(self) -> None:
+        'Colours are only set when they change'
+
+        lines = list(image.render_rows([RED * 3, RED * 3], 3, depth=ColourDepth.ANSI256))
+
+        self.assertEqual(lines, ['\x1b[38;5;196m\x1b[48;5;196m▀▀▀\x1b[0m'])
+
+    def test_odd_height(self) -> None:
+        'The bottom half of the last line of an odd-height image is blank'
+
+        f = io.BytesIO(b'P6 1 3 255\n' + RED + RED + BLUE)
+
+        self.assertEqual(list(image.render(f, depth=ColourDepth.ANSI256)), [
+            '\x1b[38;5;196m\x1b[48;5;196m▀\x1b[0m',
+            '\x1b[38;5;21m▀\x1b[0m',
+        ])
+
+    def test_no_colour(self) -> None:
+        'With no colour, only the half-blocks are drawn'
+
+        lines = list(image.render_rows([RED + BLUE] * 2, 2, depth=ColourDepth.NONE))
+
+        self.assertEqual(lines, ['▀▀'])
+
+    def test_scaled(self) -> None:
+        'Images wider than the number of columns are scaled down, keeping the aspect ratio'
+
+        rows = [(RED + BLUE) * 4] * 8
+        lines = list(image.render_rows(rows, 8, columns=4, depth=ColourDepth.ANSI256))
+
+        self.assertEqual(lines, ['\x1b[38;5;196m\x1b[48;5;196m▀▀▀▀\x1b[0m'] * 2)
+
+    @unittest.skipUnless(image.HAS_NUMPY, 'numpy is not installed')
+    def test_without_numpy(self) -> None:
+        'The pure-python fallback renders the same lines as numpy'
+
+        rng = random.Random(0)
+        colours = [bytes((rng.randrange(256), rng.randrange(256), rng.randrange(256))) for _ in range(4)]
+        rows = [b''.join(rng.choice(colours) for _ in range(30)) for _ in range(7)]
+        for depth in (ColourDepth.TRUECOLOUR, ColourDepth.ANSI256):
+            with self.subTest(depth=depth):
+                expected = list(image.render_rows(rows, 30, columns=20, depth=depth))
+                with mock.patch.object(image, 'HAS_NUMPY', False):
+                    self.assertEqual(list(image.render_rows(rows, 30, columns=20, depth=depth)), expected)
+
+    def test_raw(self) -> None:
+        'Raw RGB pixels are rendered with a given size'
+
+        f = io.BytesIO(RED + BLUE)
+
+        self.assertEqual(len(list(image.render(f, size=(1, 2), depth=ColourDepth.ANSI256))), 1)
+
+    def test_frames(self) -> None:
+        'Each image in a stream is a frame'
+
+        f = io.BytesIO(b'P6 1 2 255\n' + RED + BLUE + b'P6 1 2 255\n' + BLUE + RED)
+        frames = list(image.render_frames(f, depth=ColourDepth.ANSI256))
+
+        self.assertEqual(frames, [
+            '\x1b[H\x1b[38;5;196m\x1b[48;5;21m▀\x1b[0m',
+            '\x1b[H\x1b[38;5;21m\x1b[48;5;196m▀\x1b[0m',
+        ])
@@ -0,0 +1,46 @@
+import json
+import logging
+import unittest
+from typing import Any
+from unittest import mock
+
+from laser_prynter import log, pp
+
+
+class TestLogFormatter(unittest.TestCase):
+    def _format(self, formatter: log.LogFormatter, *args: object) -> Any:
+        record = logging.LogRecord('test', logging.INFO, __file__, 1, 'msg', args, None)
+        return json.loads(formatter.format(record))
+
+    def test_format(self) -> None:
+        'Log messages are formatted as JSON, with the kwargs as the event'
+
+        d = self._format(log.LogFormatter(), {'k': 'v'})
+
+        self.assertEqual((d['level'], d['msg'], d['event']), ('INFO', 'msg', {'k': 'v'}))
+
+    def test_limits(self) -> None:
+        'The size of each log message is limited'
+
+        formatter = log.LogFormatter(limits=pp.Limits(max_items=2, max_str_len=5))
+        d = self._format(formatter, {'items': list(range(100)), 's': 'x' * 100})
+
+        self.assertEqual(d['event'], {'items': [0, 1, '… 98 more items'], 's': 'xxxxx… 95 more chars'})
+
+    def test_cycles(self) -> None:
+        'Values with cycles can be logged'
+
+        items: list = [1]
+        items.append(items)
+        d = self._format(log.LogFormatter(), {'items': items})
+
+        self.assertEqual(d['event'], {'items': [1, {'$ref': '#/items'}]})
+
+    def test_no_walk(self) -> None:
+        'Values without cycles are serialised directly when there are no limits'
+
+        with mock.patch.object(log, 'truncate') as truncate:
+            d = self._format(log.LogFormatter(), {'items': [1, [2]]})
+
+        truncate.assert_not_called()
+        self.assertEqual(d['event'], {'items': [1, [2]]})
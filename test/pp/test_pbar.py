@@ -0,0 +1,392 @@
+import asyncio
+import io
+import multiprocessing
+import signal
+import sys
+import tempfile
+import threading
+import unittest
+from collections.abc import AsyncIterator
+from unittest import mock
+
+from laser_prynter import pbar, term
+
+
+class PBarTestCase(unittest.TestCase):
+    'Captures everything written to the terminal, as if STDERR were a terminal'
+
+    def setUp(self) -> None:
+        self.writes: list[str] = []
+        for patcher in (
+            mock.patch.object(pbar, '_print_to_terminal', self.writes.append),
+            mock.patch.object(pbar, '_is_headless', return_value=False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TestPBar(PBarTestCase):
+    def test_update_is_rate_limited(self) -> None:
+        'Updates within the same frame only increment the count'
+
+        with pbar.PBar(10_000, fps=1) as bar:
+            n_writes = len(self.writes)
+            for _ in range(10_000):
+                bar.update()
+            self.assertEqual(len(self.writes), n_writes)
+        self.assertEqual(bar.i, 10_000)
+        self.assertEqual(bar.x_pos, bar.w)
+
+    def test_update_unlimited(self) -> None:
+        'With fps=0, every update is repainted in a single write'
+
+        with pbar.PBar(10, fps=0) as bar:
+            n_writes = len(self.writes)
+            for _ in range(10):
+                bar.update()
+            self.assertEqual(len(self.writes), n_writes + 10)
+
+    def test_partial_cell(self) -> None:
+        'The end of the bar is drawn with sub-cell resolution, using eighth blocks'
+
+        # one step per eighth of a cell
+        with pbar.PBar(pbar._get_terminal_size()[0] * 8, fps=0) as bar:
+            bar.update(3)
+            self.assertIn(f'\x1b[{bar._bar_line};1H{bar._partial_cells[1]}▍', self.writes[-1])
+            bar.update(5)
+            self.assertIn(f'\x1b[{bar._bar_line};1H{bar._cells[1]}', self.writes[-1])
+            self.assertEqual((bar.x_pos, bar._eighths), (1, 0))
+
+    def test_colour_depth(self) -> None:
+        'The bar colours are downgraded to the colour depth of the terminal'
+
+        for depth, pattern in (
+            (term.ColourDepth.TRUECOLOUR, r'^\x1b\[48;2;\d+;\d+;\d+m $'),
+            (term.ColourDepth.ANSI256, r'^\x1b\[48;5;\d+m $'),
+            (term.ColourDepth.ANSI16, r'^\x1b\[(4|10)[0-7]m $'),
+        ):
+            with self.subTest(depth=depth), mock.patch.object(term, 'env_colour_depth', return_value=depth):
+                self.assertRegex(pbar.PBar(10)._cells[1], pattern)
+
+    def test_shared_cells(self) -> None:
+        'Bars with the same gradient & width share the gradient and the cell escapes'
+
+        a, b = pbar.PBar(10), pbar.PBar(20)
+        self.assertIs(a.g, b.g)
+        self.assertIs(a._cells, b._cells)
+
+        cells = a._cells
+        a._resize(a.w + 1, a.h)
+        self.assertIsNot(a._cells, cells)
+        a._resize(a.w - 1, a.h)
+        self.assertIs(a._cells, cells)
+
+    def test_no_colour(self) -> None:
+        'With no colour, the bar is drawn with block characters, and the info line is plain text'
+
+        no_colour = mock.patch.object(term, 'env_colour_depth', return_value=term.ColourDepth.NONE)
+        with no_colour, pbar.PBar(10, fps=0) as bar:
+            bar.update(10)
+        self.assertIn('█' * bar.w, ''.join(self.writes))
+        self.assertNotIn('\x1b[48;', ''.join(self.writes))
+        info = bar._info()
+        for sgr in ('\x1b[1;32m', '\x1b[92m', '\x1b[93m', '\x1b[1m', '\x1b[0m'):
+            self.assertNotIn(sgr, info)
+
+    def test_threaded(self) -> None:
+        'In threaded mode, update only increments the counter, and a thread repaints the bar'
+
+        with pbar.PBar(100, fps=1000, threaded=True) as bar:
+            n_writes = len(self.writes)
+            for _ in range(100):
+                bar.update()
+            bar._stop.wait(0.05)
+            self.assertGreater(len(self.writes), n_writes)
+            self.assertIsNotNone(bar._thread)
+        self.assertIsNone(bar._thread)
+        self.assertEqual(bar.i, 100)
+
+
+class TestThreadCounter(unittest.TestCase):
+    def test_add_from_threads(self) -> None:
+        'Increments from many threads are all counted'
+
+        counter = pbar.ThreadCounter()
+
+        def work() -> None:
+            for _ in range(1000):
+                counter.add()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(counter.value, 8000)
+
+    def test_reused_thread_ident(self) -> None:
+        'Increments from threads that have finished are kept, even if their ident is reused'
+
+        counter = pbar.ThreadCounter()
+        for _ in range(8):
+            t = threading.Thread(target=counter.add, args=(10,))
+            t.start()
+            t.join()
+
+        self.assertEqual(counter.value, 80)
+
+    def test_abstract(self) -> None:
+        'Counters must implement both add and per_worker'
+
+        class AddOnly(pbar.SharedCounter):
+            def add(self, n: int = 1) -> None:
+                pass
+
+        with self.assertRaises(TypeError):
+            AddOnly()  # type: ignore[abstract]
+
+def _work(n: int) -> int:
+    pbar.worker_update(n)
+    return n
+
+
+class TestProcessCounter(PBarTestCase):
+    def test_pool(self) -> None:
+        'Workers in a process pool update the parent bar through shared memory'
+
+        bar = pbar.PBar(10, counter=pbar.ProcessCounter(), worker_rates=True)
+        pool = multiprocessing.Pool(2, initializer=pbar.init_worker, initargs=(bar.counter,))
+        with bar, pool:
+            self.assertEqual(sum(pool.map(_work, [1] * 10)), 10)
+
+        assert bar.counter is not None
+        self.assertEqual(bar.i, 10)
+        self.assertEqual(sum(bar.counter.per_worker().values()), 10)
+        self.assertIn('w0:', self.writes[-2])
+
+    def test_no_free_slots(self) -> None:
+        counter = pbar.ProcessCounter(max_workers=0)
+        with self.assertRaises(ValueError):
+            counter.add()
+
+
+class TestMultiPBar(PBarTestCase):
+    def test_layout(self) -> None:
+        'Each bar is drawn on its own line, with its info line above it'
+
+        bars = pbar.MultiPBar([10, 20, 30], fps=0)
+        h = bars.h
+
+        self.assertEqual(bars.reserved, 6)
+        self.assertEqual([b._bar_line for b in bars], [h - 4, h - 2, h])
+        self.assertEqual({b._scroll_bottom for b in bars}, {h - 6})
+
+    def test_update_draws_changed_cells(self) -> None:
+        'An update draws only the changed cells, for every bar, in a single write'
+
+        with pbar.MultiPBar([10, 10], fps=0) as (b1, b2):
+            n_writes = len(self.writes)
+            b1.update(5)
+
+            self.assertEqual(len(self.writes), n_writes + 1)
+            self.assertIn(f'\x1b[{b1._bar_line};1H', self.writes[-1])
+            self.assertNotIn(f'\x1b[{b2._bar_line};1H', self.writes[-1])
+
+            b1.update(5)
+            self.assertIn(f'\x1b[{b1._bar_line};{b1.w // 2 + 1}H', self.writes[-1])
+        self.assertEqual((b1.i, b2.i), (10, 0))
+
+
+class TestTrack(PBarTestCase):
+    def test_iter(self) -> None:
+        'Iterating over a PBar yields each step, and updates the bar'
+
+        bar = pbar.PBar(5)
+        self.assertEqual(list(bar), [0, 1, 2, 3, 4])
+        self.assertEqual(bar.i, 5)
+
+    def test_track(self) -> None:
+        'The total is taken from the length of the iterable, and bytes are counted'
+
+        items = [b'ab', b'cde', b'f']
+        self.assertEqual(list(pbar.track(items, fps=0)), items)
+        self.assertIn('[\x1b[1;32m3\x1b[0m/3]', self.writes[-2])
+
+    def test_track_unknown_total(self) -> None:
+        'An iterable with no length is drawn as a spinner'
+
+        self.assertEqual(list(pbar.track(iter(range(3)), fps=0)), [0, 1, 2])
+        self.assertIn('[\x1b[1;32m3\x1b[0m]', self.writes[-2])
+
+    def test_atrack(self) -> None:
+        'An async iterable is tracked the same way'
+
+        async def agen() -> AsyncIterator[int]:
+            for i in range(3):
+                yield i
+
+        async def collect() -> list[int]:
+            return [i async for i in pbar.atrack(agen(), total=3, fps=0)]
+
+        self.assertEqual(asyncio.run(collect()), [0, 1, 2])
+        self.assertIn('[\x1b[1;32m3\x1b[0m/3]', self.writes[-2])
+
+    def test_track_empty(self) -> None:
+        'An empty iterable is drawn as a complete bar'
+
+        self.assertEqual(list(pbar.track([], fps=0)), [])
+        self.assertIn('[\x1b[1;32m0\x1b[0m/0] \x1b[1;97m100.0%', ''.join(self.writes))
+
+    def test_atrack_empty(self) -> None:
+        'An empty async iterable with a length is drawn as a complete bar'
+
+        class Empty:
+            def __len__(self) -> int:
+                return 0
+
+            async def __aiter__(self) -> AsyncIterator[int]:
+                return
+                yield
+
+        async def collect() -> list[int]:
+            return [i async for i in pbar.atrack(Empty(), fps=0)]
+
+        self.assertEqual(asyncio.run(collect()), [])
+        self.assertIn('[\x1b[1;32m0\x1b[0m/0] \x1b[1;97m100.0%', ''.join(self.writes))
+
+
+class TestEWMA(unittest.TestCase):
+    def test_sample(self) -> None:
+        'The first sample is the rate, and later samples are smoothed'
+
+        ewma = pbar.EWMA(alpha=0.5)
+        ewma.reset(0, 0.0)
+
+        self.assertEqual(ewma.sample(10, 1.0), 10.0)
+        self.assertEqual(ewma.sample(40, 2.0), 20.0)
+        self.assertEqual(ewma.sample(40, 2.0), 20.0)  # no time has passed
+
+    def test_format_rate(self) -> None:
+        self.assertEqual(pbar._format_rate(12_345.6, 'it'), '12.3 kit/s')
+        self.assertEqual(pbar._format_rate(512, 'B'), '512.0 B/s')
+        self.assertEqual(pbar._format_rate(3 * 1024**2, 'B'), '3.0 MiB/s')
+
+
+class TestCopy(PBarTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.data = bytes(range(256)) * 1000
+
+    def test_copy_files(self) -> None:
+        'Regular files are copied (with sendfile), from the current position of src'
+
+        with tempfile.TemporaryFile() as src, tempfile.TemporaryFile() as dst:
+            src.write(self.data)
+            src.seek(1000)
+            self.assertEqual(pbar.copy(src, dst, bufsize=4096, fps=0), len(self.data) - 1000)
+
+            self.assertEqual(src.tell(), len(self.data))
+            dst.seek(0)
+            self.assertEqual(dst.read(), self.data[1000:])
+        self.assertIn('/249.0 KiB]', self.writes[-2])
+
+    def test_copy_streams(self) -> None:
+        'Streams are copied through a reusable buffer, with an unknown total'
+
+        dst = io.BytesIO()
+        self.assertEqual(pbar.copy(io.BytesIO(self.data), dst, bufsize=4096, fps=0), len(self.data))
+        self.assertEqual(dst.getvalue(), self.data)
+        self.assertIn('[\x1b[1;32m250.0 KiB\x1b[0m]', self.writes[-2])
+
+    def test_copy_empty_file(self) -> None:
+        'An empty file is copied, and drawn as a complete bar'
+
+        with tempfile.TemporaryFile() as src, tempfile.TemporaryFile() as dst:
+            self.assertEqual(pbar.copy(src, dst, fps=0), 0)
+            dst.seek(0)
+            self.assertEqual(dst.read(), b'')
+        self.assertIn('\x1b[1;97m100.0%', ''.join(self.writes))
+
+    def test_wrap_file(self) -> None:
+        'Reads from a wrapped file update the bar, with the total taken from the file size'
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(self.data)
+            f.flush()
+            with pbar.wrap_file(open(f.name, 'rb'), fps=0) as wrapped:
+                self.assertEqual(wrapped.bar.t, len(self.data))
+                self.assertEqual(wrapped.read(1000), self.data[:1000])
+                self.assertEqual(wrapped.bar.i, 1000)
+                self.assertEqual(wrapped.read(), self.data[1000:])
+                self.assertEqual(wrapped.bar.i, len(self.data))
+
+    def test_wrap_empty_file(self) -> None:
+        'Reading an empty wrapped file draws a complete bar'
+
+        with tempfile.NamedTemporaryFile() as f, pbar.wrap_file(open(f.name, 'rb'), fps=0) as wrapped:
+            self.assertEqual(wrapped.bar.t, 0)
+            self.assertEqual(wrapped.read(), b'')
+        self.assertIn('\x1b[1;97m100.0%', ''.join(self.writes))
+
+
+class TestHeadless(unittest.TestCase):
+    def setUp(self) -> None:
+        self.writes: list[str] = []
+        patcher = mock.patch.object(pbar, '_print_to_terminal', self.writes.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.logger = mock.Mock()
+
+    def test_redirected(self) -> None:
+        'Headless mode is used when STDERR is not a terminal'
+
+        with mock.patch.object(sys, 'stderr', io.StringIO()):
+            self.assertTrue(pbar.PBar(10).headless)
+
+    def test_records(self) -> None:
+        'Progress is logged as structured records, with no escapes or signal handlers'
+
+        handler = signal.getsignal(signal.SIGINT)
+        with pbar.PBar(10, headless=True, log_interval=3600, logger=self.logger) as bar:
+            self.assertIs(signal.getsignal(signal.SIGINT), handler)
+            for _ in range(10):
+                bar.update()
+
+        self.assertEqual(self.writes, [])
+        (start_msg, start), (end_msg, end) = [c.args for c in self.logger.info.call_args_list]
+        self.assertEqual((start_msg, start['n'], start['total']), ('progress', 0, 10))
+        self.assertEqual((end_msg, end['n'], end['pct']), ('done', 10, 100))
+
+    def test_track_empty(self) -> None:
+        'An empty iterable is logged as complete'
+
+        self.assertEqual(list(pbar.track([], headless=True, logger=self.logger)), [])
+        end = self.logger.info.call_args_list[-1].args[1]
+        self.assertEqual((end['n'], end['total'], end['pct']), (0, 0, 100))
+
+    def test_atrack_empty(self) -> None:
+        'An empty async iterable is logged as complete'
+
+        async def agen() -> AsyncIterator[int]:
+            return
+            yield
+
+        async def collect() -> list[int]:
+            return [i async for i in pbar.atrack(agen(), total=0, headless=True, logger=self.logger)]
+
+        self.assertEqual(asyncio.run(collect()), [])
+        end = self.logger.info.call_args_list[-1].args[1]
+        self.assertEqual((end['n'], end['total'], end['pct']), (0, 0, 100))
+
+    def test_thread(self) -> None:
+        'A bar can be used from a thread other than the main thread'
+
+        def work() -> None:
+            with pbar.PBar(10, headless=False) as bar:
+                bar.update(10)
+
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+        self.assertIn('[\x1b[1;32m10\x1b[0m/10]', self.writes[-2])
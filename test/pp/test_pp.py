@@ -1,10 +1,18 @@
+import copy
+import os
+import shutil
+import tempfile
 import unittest
 from collections import namedtuple
 from dataclasses import dataclass
 from datetime import datetime
-from io import StringIO
+from io import BytesIO, StringIO
+from typing import Any
+from unittest import mock
 
-from laser_prynter import pp
+from pygments.formatters import Terminal256Formatter, TerminalFormatter, TerminalTrueColorFormatter
+
+from laser_prynter import pp, term
 
 class TestJSONDefault(unittest.TestCase):
     def test_str(self) -> None:
@@ -168,3 +176,342 @@ class TestNormalise(unittest.TestCase):
             ]
         })
 
+    def test_cycles(self) -> None:
+        'Cycles are replaced with a reference to the container they loop back to'
+
+        d: dict = {'a': {'b/c': []}}
+        d['a']['b/c'].append(d['a'])
+        d['self'] = d
+
+        self.assertEqual(pp._normalise(d), {
+            'a': {'b/c': [{'$ref': '#/a'}]},
+            'self': {'$ref': '#'},
+        })
+
+    def test_object_cycles(self) -> None:
+        'Objects that refer to themselves can be printed'
+
+        class Node:
+            def __init__(self) -> None:
+                self.parent = self
+
+        s = StringIO()
+        pp.ppd({'node': Node()}, indent=None, style=None, file=s)
+
+        self.assertEqual(s.getvalue(), '{"node": {"parent": {"$ref": "#/node"}}}\n')
+
+    def test_no_cycles(self) -> None:
+        'Objects without cycles are printed without the cycle-safe walk'
+
+        s = StringIO()
+        with mock.patch.object(pp, '_Encoder') as encoder:
+            pp.ppd({'a': [1, {'b': 2}]}, indent=None, style=None, file=s)
+            pp.ppdiff({'a': [1]}, {'a': [2]}, style=None, file=s)
+
+        encoder.assert_not_called()
+        self.assertEqual(s.getvalue(), '{"a": [1, {"b": 2}]}\n~ .a[0]: 1 → 2\n')
+
+    def test_shared(self) -> None:
+        'Objects that appear more than once are not cycles, and are copied separately by default'
+
+        Testr = namedtuple('Testr', ('a', 'b'))
+        shared = Testr(1, [2])
+
+        result = pp._normalise({'x': shared, 'y': [shared, shared]})
+
+        self.assertEqual(result, {'x': {'a': 1, 'b': [2]}, 'y': [{'a': 1, 'b': [2]}] * 2})
+        self.assertIsNot(result['x'], result['y'][0])
+        result['x']['b'].append(3)
+        self.assertEqual(result['y'][0], {'a': 1, 'b': [2]})
+
+    def test_share(self) -> None:
+        'With share, objects that appear more than once are only converted once'
+
+        shared = {'a': [1]}
+
+        result = pp.truncate({'x': shared, 'y': [shared]}, pp.Limits(), share=True)
+
+        self.assertIs(result['x'], result['y'][0])
+        self.assertIsNot(pp.truncate(shared, pp.Limits(max_items=5), share=True), shared)
+
+    def test_non_ascii(self) -> None:
+        'Non-ASCII characters are printed as-is, with or without limits'
+
+        cases: list[dict[str, Any]] = [{}, {'max_items': 5}]
+        for kwargs in cases:
+            with self.subTest(**kwargs):
+                s = StringIO()
+                pp.ppd({'café': '漢字'}, indent=None, style=None, file=s, **kwargs)
+                self.assertEqual(s.getvalue(), '{"café": "漢字"}\n')
+
+
+class TestColourDepth(unittest.TestCase):
+
+    def test_formatter(self) -> None:
+        'The formatter matches the colour depth, and is reused'
+
+        self.assertIsInstance(pp._formatter('dracula', term.ColourDepth.TRUECOLOUR), TerminalTrueColorFormatter)
+        self.assertIsInstance(pp._formatter('dracula', term.ColourDepth.ANSI256), Terminal256Formatter)
+        self.assertIsInstance(pp._formatter('dracula', term.ColourDepth.ANSI16), TerminalFormatter)
+        self.assertIs(pp._formatter('dracula', term.ColourDepth.ANSI256), pp._formatter('dracula', term.ColourDepth.ANSI256))
+
+    def test_ppd_truecolour(self) -> None:
+        'A terminal with 24-bit colour support is printed to with 24-bit colour'
+
+        s = StringIO()
+        with mock.patch.object(term, 'colour_depth', return_value=term.ColourDepth.TRUECOLOUR):
+            pp.ppd({'a': 'b'}, indent=None, file=s)
+
+        self.assertIn('\x1b[38;2;', s.getvalue())
+
+    def test_ps_no_colour(self) -> None:
+        'Strings are not coloured when colour is disabled'
+
+        with mock.patch.object(term, 'env_colour_depth', return_value=term.ColourDepth.NONE):
+            self.assertEqual(pp.ps('a', 'red'), 'a')
+
+
+class TestPJ(unittest.TestCase):
+    LINE = '{"timestamp": "2024-12-09T15:05:43.904417+10:00", "msg": "a \\"quoted\\" msg", "event": {"n": [1, -2.5e3, null, true]}}'
+
+    def test_matches_pygments(self) -> None:
+        'JSON strings are coloured exactly as pygments would colour them'
+
+        for depth in (term.ColourDepth.TRUECOLOUR, term.ColourDepth.ANSI256):
+            with self.subTest(depth=depth):
+                expected = pp.highlight(self.LINE, pp.JsonLexer(), pp._formatter('dracula', depth)).strip()
+                self.assertEqual(pp.pj(self.LINE, 'dracula', depth), expected)
+
+    def test_no_colour(self) -> None:
+        'JSON strings are returned as-is when colour is disabled'
+
+        self.assertEqual(pp.pj(self.LINE, depth=term.ColourDepth.NONE), self.LINE)
+
+    def test_ppj_as_is(self) -> None:
+        'JSON strings are printed as-is, unless they are re-indented'
+
+        s = StringIO()
+        with mock.patch.object(term, 'colour_depth', return_value=term.ColourDepth.NONE):
+            pp.ppj('{"a":1}\n', file=s)
+            pp.ppj('{"a":1}', indent=2, file=s)
+
+        self.assertEqual(s.getvalue(), '{"a":1}\n{\n  "a": 1\n}\n')
+
+
+class TestColourise(unittest.TestCase):
+    LINES = b''.join(b'{"i": %d}\n' % i for i in range(100))
+
+    def setUp(self) -> None:
+        self.path = os.path.join(tempfile.mkdtemp(), 'log.jsonl')
+        with open(self.path, 'wb') as f:
+            f.write(self.LINES)
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.path))
+
+    def test_stream(self) -> None:
+        'Lines from non-file streams are coloured, and a missing final newline is added'
+
+        s = StringIO()
+        pp.colourise([BytesIO(b'{"a": 1}\n\nnot json\n[2]')], s, depth=term.ColourDepth.NONE)
+
+        self.assertEqual(s.getvalue(), '{"a": 1}\n\nnot json\n[2]\n')
+
+    def test_indent(self) -> None:
+        'Lines of valid JSON are re-indented'
+
+        s = StringIO()
+        pp.colourise([BytesIO(b'{"a": 1}\nnot json\n')], s, depth=term.ColourDepth.NONE, indent=1)
+
+        self.assertEqual(s.getvalue(), '{\n "a": 1\n}\nnot json\n')
+
+    def test_indent_non_ascii(self) -> None:
+        'Non-ASCII characters are kept as-is when lines are re-indented'
+
+        s = StringIO()
+        pp.colourise([BytesIO('{"a": "é✓"}\n'.encode())], s, depth=term.ColourDepth.NONE, indent=1)
+
+        self.assertEqual(s.getvalue(), '{\n "a": "é✓"\n}\n')
+
+    def test_not_json(self) -> None:
+        "Lines that aren't valid JSON are left as-is, and an unterminated string stops at the line end"
+
+        s = StringIO()
+        lines = b'nullify\nabc123\nnot json\n{"a": "x\n{"b": 1}\n'
+        pp.colourise([BytesIO(lines)], s, depth=term.ColourDepth.TRUECOLOUR)
+
+        *plain, coloured = s.getvalue().splitlines()
+        self.assertEqual(plain, ['nullify', 'abc123', 'not json', '{"a": "x'])
+        self.assertEqual(coloured, pp.pj('{"b": 1}', depth=term.ColourDepth.TRUECOLOUR))
+        self.assertNotEqual(coloured, '{"b": 1}')
+        self.assertEqual(pp.pj('"x\n"y"', depth=term.ColourDepth.TRUECOLOUR).split('\n')[0], '"x')
+
+    def test_mmap_chunks(self) -> None:
+        'Files are memory-mapped, and split into chunks of whole lines'
+
+        with open(self.path, 'rb') as f:
+            chunks = list(pp._chunks(f, 64))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk.endswith(b'\n') for chunk in chunks))
+        self.assertEqual(b''.join(chunks), self.LINES)
+
+    def test_workers(self) -> None:
+        'Chunks coloured by a process pool are written in order'
+
+        expected, s = StringIO(), StringIO()
+        with open(self.path, 'rb') as f:
+            pp.colourise([f], expected, depth=term.ColourDepth.ANSI256)
+        with open(self.path, 'rb') as f:
+            pp.colourise([f], s, depth=term.ColourDepth.ANSI256, workers=2, chunk_size=64)
+
+        self.assertEqual(s.getvalue(), expected.getvalue())
+        self.assertEqual(len(s.getvalue().splitlines()), 100)
+
+
+class TestDiff(unittest.TestCase):
+    def test_nested(self) -> None:
+        'Changes are found in nested dicts, lists & namedtuples, with their path'
+
+        Testr = namedtuple('Testr', ('a', 'b'))
+        old = {'a': {'b': 1, 'c': [1, 2, 3]}, 't': Testr(1, 2), 'gone': True}
+        new = {'a': {'b': 2, 'c': [1, 3]}, 't': Testr(1, 3), 'new': None}
+
+        self.assertEqual(list(pp.diff(old, new)), [
+            pp.Change('~', ('a', 'b'), 1, 2),
+            pp.Change('-', ('a', 'c', 1), 2, None),
+            pp.Change('~', ('t', 'b'), 2, 3),
+            pp.Change('-', ('gone',), True, None),
+            pp.Change('+', ('new',), None, None),
+        ])
+
+    def test_types(self) -> None:
+        'Values of different types are changed, even when equal'
+
+        self.assertEqual(list(pp.diff({'a': 1}, {'a': True})), [pp.Change('~', ('a',), 1, True)])
+
+    def test_identical_subtrees(self) -> None:
+        'The same object is never walked or compared'
+
+        class Unequal:
+            def __eq__(self, other: object) -> bool:
+                raise AssertionError('compared')
+
+        shared = {'x': [Unequal()]}
+        self.assertEqual(list(pp.diff({'s': shared, 'n': 1}, {'s': shared, 'n': 2})), [
+            pp.Change('~', ('n',), 1, 2),
+        ])
+
+    def test_equal_subtrees(self) -> None:
+        'Equal subtrees of a copy are skipped, so only the path to a change is walked'
+
+        old: dict[str, Any] = {f'k{i}': {'x': list(range(10)), 'y': {'z': i}} for i in range(100)}
+        new = copy.deepcopy(old)
+        new['k5']['y']['z'] = -1
+
+        with mock.patch.object(pp, '_children', wraps=pp._children) as children:
+            self.assertEqual(list(pp.diff(old, new)), [pp.Change('~', ('k5', 'y', 'z'), 5, -1)])
+        self.assertLessEqual(children.call_count, 8)
+
+    def test_ppdiff(self) -> None:
+        'Only the changes are printed, one per line with a jq-style path'
+
+        s = StringIO()
+        pp.ppdiff({'a': [1, 2], 'b c': 'x'}, {'a': [1, 2, {'d': 3}], 'b c': 'y'}, style=None, file=s)
+
+        self.assertEqual(s.getvalue(), '+ .a[2]: {"d": 3}\n~ ["b c"]: "x" → "y"\n')
+
+    def test_ppdiff_non_ascii(self) -> None:
+        'Non-ASCII characters in paths and values are printed as-is'
+
+        s = StringIO()
+        pp.ppdiff({'é ✓': 'a'}, {'é ✓': 'ü'}, style=None, file=s)
+
+        self.assertEqual(s.getvalue(), '~ ["é ✓"]: "a" → "ü"\n')
+
+    def test_no_changes(self) -> None:
+        'Nothing is printed when there are no changes'
+
+        s = StringIO()
+        pp.ppdiff({'a': [1]}, {'a': [1]}, file=s)
+
+        self.assertEqual(s.getvalue(), '')
+
+    def test_cycles(self) -> None:
+        'Objects with cycles are compared without recursing forever'
+
+        a: list = [1]
+        a.append(a)
+        b: list = [2]
+        b.append(b)
+
+        self.assertEqual(list(pp.diff(a, b)), [pp.Change('~', (0,), 1, 2)])
+
+    def test_tuples(self) -> None:
+        'Tuples are compared as a whole'
+
+        self.assertEqual(list(pp.diff((1, 2), (1, 3))), [pp.Change('~', (), (1, 2), (1, 3))])
+        self.assertEqual(
+            list(pp.diff({'a': (1, 2)}, {'a': (1, 3)})), [pp.Change('~', ('a',), (1, 2), (1, 3))],
+        )
+        self.assertEqual(list(pp.diff((1, 2), (1, 2))), [])
+
+
+class TestLimits(unittest.TestCase):
+    def _ppd(self, obj: object, **kwargs: Any) -> str:
+        s = StringIO()
+        pp.ppd(obj, indent=None, style=None, file=s, **kwargs)
+        return s.getvalue().strip()
+
+    def test_max_items(self) -> None:
+        'Only the first items of each container are printed'
+
+        self.assertEqual(
+            self._ppd({'a': list(range(12_347)), 'b': 2, 'c': 3}, max_items=2),
+            '{"a": [0, 1, "… 12,345 more items"], "b": 2, "…": "1 more item"}',
+        )
+
+    def test_max_depth(self) -> None:
+        'Containers nested deeper than the max depth are replaced by their size'
+
+        self.assertEqual(self._ppd({'a': {'b': [1]}, 'c': [1, 2]}, max_depth=1), '{"a": "… 1 item", "c": "… 2 items"}')
+
+    def test_max_str_len(self) -> None:
+        'Long strings are truncated'
+
+        self.assertEqual(self._ppd(['abcdef', 'abc'], max_str_len=3), '["abc… 3 more chars", "abc"]')
+
+    def test_markers(self) -> None:
+        'Markers for elided content are never truncated'
+
+        self.assertEqual(
+            self._ppd({'nest': {'a': 'x'}, 'l': [1, 2, 3]}, max_depth=1, max_str_len=1),
+            '{"nest": "… 1 item", "l": "… 3 items"}',
+        )
+        self.assertEqual(
+            self._ppd(['abc', 'def', 'ghi'], max_items=1, max_str_len=1), '["a… 2 more chars", "… 2 more items"]'
+        )
+
+    def test_max_bytes(self) -> None:
+        'The output is limited to about max_bytes, without walking the rest of the object'
+
+        class Unprintable:
+            @property
+            def __dict__(self) -> dict: # type: ignore[override]
+                raise AssertionError('walked')
+
+        out = self._ppd([str(i) * 10 for i in range(1000)] + [Unprintable()], max_bytes=100)
+
+        self.assertLess(len(out), 150)
+        self.assertTrue(out.endswith('more items"]'))
+
+    def test_objects(self) -> None:
+        'Namedtuples, dataclasses & other objects are converted while walking'
+
+        Testr = namedtuple('Testr', ('a', 'b'))
+        @dataclass
+        class A:
+            a: list
+
+        self.assertEqual(
+            self._ppd({1: Testr(1, 2), 'd': A([1, 2, 3]), 't': datetime(2021, 1, 1)}, max_items=2),
+            '{"1": {"a": 1, "b": 2}, "d": {"a": [1, 2, "… 1 more item"]}, "…": "1 more item"}',
+        )
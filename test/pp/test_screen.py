@@ -0,0 +1,109 @@
+import io
+import unittest
+from array import array
+
+from laser_prynter import screen
+from laser_prynter.colour import gradient
+from laser_prynter.term import ColourDepth
+
+
+def _lines(s: screen.Screen) -> list[str]:
+    'The characters on each line of the screen'
+    return [
+        ''.join(chr(ch) for ch in s.chars[y * s.w : (y + 1) * s.w] if ch != screen.CONTINUATION)
+        for y in range(s.h)
+    ]
+
+
+class TestScreen(unittest.TestCase):
+    def setUp(self) -> None:
+        self.file = io.StringIO()
+        self.s = screen.Screen(10, 2, file=self.file, depth=ColourDepth.ANSI256)
+
+    def test_first_flush(self) -> None:
+        'The first flush draws every cell, setting colours only when they change'
+
+        self.s.write(0, 0, 'hello', fg=screen.rgb(255, 0, 0))
+
+        self.assertEqual(
+            self.s.diff(),
+            '\x1b[1;1H\x1b[38;5;196mhello\x1b[39m     \x1b[2;1H          ',
+        )
+
+    def test_diff(self) -> None:
+        'Only the cells that changed are drawn, with the fewest cursor moves'
+
+        self.s.write(0, 0, 'hello')
+        self.s.diff()
+        self.s.write(0, 0, 'j')
+        self.s.set(4, 0, '!', bg=3)
+        self.s.set(2, 1, 'x')
+
+        self.assertEqual(self.s.diff(), '\x1b[1;1Hj\x1b[3C\x1b[48;5;3m!\x1b[2;3H\x1b[49mx')
+        self.assertEqual(self.s.diff(), '')
+
+    def test_flush(self) -> None:
+        'Flushing writes the diff in a single write'
+
+        self.s.write(0, 0, 'hi')
+        n = self.s.flush()
+
+        self.assertEqual(n, len(self.file.getvalue()))
+        self.assertEqual(self.s.flush(), 0)
+
+    def test_origin(self) -> None:
+        'Cursor moves are relative to the origin of the screen'
+
+        s = screen.Screen(2, 1, origin=(4, 10), file=self.file, depth=ColourDepth.NONE)
+
+        self.assertEqual(s.diff(), '\x1b[11;5H  ')
+
+    def test_no_colour(self) -> None:
+        'No colour escapes are written without colour'
+
+        s = screen.Screen(3, 1, file=self.file, depth=ColourDepth.NONE)
+        s.write(0, 0, 'abc', fg=1, bg=screen.rgb(1, 2, 3))
+
+        self.assertEqual(s.diff(), '\x1b[1;1Habc')
+
+    def test_wide(self) -> None:
+        'Wide characters take up 2 cells, and overwriting half of one blanks the other half'
+
+        self.assertEqual(self.s.write(0, 0, '漢字!'), 5)
+        self.assertEqual(_lines(self.s)[0], '漢字!     ')
+
+        self.s.set(1, 0, 'x')
+        self.assertEqual(_lines(self.s)[0], ' x字!     ')
+
+    def test_clipped(self) -> None:
+        'Cells outside of the screen are ignored'
+
+        self.s.write(8, 1, 'abc')
+        self.s.set(0, 5, 'z')
+        self.s.write(9, 0, '漢')
+
+        self.assertEqual(_lines(self.s), [' ' * 10, ' ' * 8 + 'ab'])
+
+    def test_resize(self) -> None:
+        'Cells that still fit are kept, and the next flush clears & redraws the screen'
+
+        self.s.write(0, 0, 'abcdefgh漢')
+        self.s.write(0, 1, 'ijk')
+        self.s.diff()
+        self.s.resize(9, 1)
+
+        self.assertEqual(_lines(self.s), ['abcdefgh '])
+        self.assertTrue(self.s.diff().startswith('\x1b[2J\x1b[1;1Habcdefgh '))
+
+
+class TestDrawFaces(unittest.TestCase):
+    def test_faces(self) -> None:
+        'Faces are drawn into a screen with the same layout as when printed'
+
+        faces = gradient.RGBCube.from_ranges('r', 'g', 'b').faces
+        lines = [gradient.ANSI_COLOURS.sub('', line) for line in faces.iter_s(1, 0, 6)]
+        s = screen.Screen(faces.str_width(6), len(lines), depth=ColourDepth.ANSI256)
+
+        self.assertEqual(faces.draw(s, padding_top=1, cell_width=6), len(lines))
+        self.assertEqual(_lines(s), [line.ljust(s.w) for line in lines])
+        self.assertEqual(s.bg[:6], array('i', [16] * 6))
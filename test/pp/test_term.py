@@ -0,0 +1,55 @@
+import io
+import os
+import unittest
+from unittest import mock
+
+from laser_prynter import term
+from laser_prynter.term import ColourDepth
+
+
+class TTY(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+class TestColourDepth(unittest.TestCase):
+    def _depth(self, **env: str) -> int:
+        term.env_colour_depth.cache_clear()
+        self.addCleanup(term.env_colour_depth.cache_clear)
+        with mock.patch.dict(os.environ, env, clear=True):
+            return term.colour_depth(TTY())
+
+    def test_env(self) -> None:
+        'The colour depth is detected from COLORTERM, then TERM'
+
+        for env, expected in (
+            ({'COLORTERM': 'truecolor', 'TERM': 'xterm-256color'}, ColourDepth.TRUECOLOUR),
+            ({'COLORTERM': '24bit'}, ColourDepth.TRUECOLOUR),
+            ({'TERM': 'xterm-direct'}, ColourDepth.TRUECOLOUR),
+            ({'TERM': 'xterm-256color'}, ColourDepth.ANSI256),
+            ({'TERM': 'linux'}, ColourDepth.ANSI16),
+            ({'TERM': 'dumb'}, ColourDepth.NONE),
+            ({}, ColourDepth.ANSI256),
+        ):
+            with self.subTest(env=env):
+                self.assertEqual(self._depth(**env), expected)
+
+    def test_no_color(self) -> None:
+        'NO_COLOR disables colour, regardless of the terminal'
+
+        self.assertEqual(self._depth(NO_COLOR='1', COLORTERM='truecolor'), ColourDepth.NONE)
+        self.assertEqual(self._depth(NO_COLOR='', COLORTERM='truecolor'), ColourDepth.TRUECOLOUR)
+
+    def test_redirected(self) -> None:
+        'There is no colour when output is not a terminal'
+
+        self._depth(COLORTERM='truecolor')
+        self.assertEqual(term.colour_depth(io.StringIO()), ColourDepth.NONE)
+        self.assertEqual(term.colour_depth(None), ColourDepth.TRUECOLOUR)
+
+    def test_cached(self) -> None:
+        'The environment is only probed once'
+
+        self._depth(COLORTERM='truecolor')
+        with mock.patch.dict(os.environ, {'NO_COLOR': '1'}):
+            self.assertEqual(term.colour_depth(TTY()), ColourDepth.TRUECOLOUR)
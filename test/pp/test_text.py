@@ -0,0 +1,43 @@
+import unittest
+
+from laser_prynter import text
+
+
+class TestWidth(unittest.TestCase):
+    def test_width(self) -> None:
+        'Escape sequences & combining marks take up no columns, and wide characters take up 2'
+
+        for s, expected in (
+            ('abc', 3),
+            ('x̄', 1),
+            ('漢字', 4),
+            ('👍', 2),
+            ('\x1b[1;38;5;196mred\x1b[0m', 3),
+            ('\x1b]8;;https://example.com\x1b\\link\x1b]8;;\x07', 4),
+        ):
+            with self.subTest(s=s):
+                self.assertEqual(text.width(s), expected)
+
+    def test_pad(self) -> None:
+        'Padding is by display width, and center splits the padding like str.center'
+
+        self.assertEqual(text.ljust('x̄', 3), 'x̄  ')
+        self.assertEqual(text.rjust('漢', 4, '.'), '..漢')
+        for s in ('a', 'ab', 'abc'):
+            for n in (5, 6):
+                with self.subTest(s=s, n=n):
+                    self.assertEqual(text.center(s, n), s.center(n))
+
+    def test_truncate(self) -> None:
+        'Strings are truncated by display width, keeping all escape sequences'
+
+        self.assertEqual(text.truncate('abcdef', 6), 'abcdef')
+        self.assertEqual(text.truncate('abcdef', 4), 'abc…')
+        self.assertEqual(text.truncate('漢字漢字', 5), '漢字…')
+        self.assertEqual(text.truncate('\x1b[1mabcdef\x1b[0m', 4), '\x1b[1mabc…\x1b[0m')
+
+    def test_tail(self) -> None:
+        'The end of a string, by display width'
+
+        self.assertEqual(text.tail('abcdef', 3), 'def')
+        self.assertEqual(text.tail('漢字漢字', 3), '字')